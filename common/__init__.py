@@ -0,0 +1 @@
+"""Helpers shared by the CrackDefend attacker, defender and dashboard"""
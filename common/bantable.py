@@ -0,0 +1,359 @@
+import fcntl
+import hashlib
+import math
+import mmap
+import os
+import struct
+import time
+
+USER = 1
+IP = 2
+KINDS = {USER: "user", IP: "ip"}
+
+MAGIC = b"CDBAN1\0\0"
+# magic, capacity, key size, generation (seqlock), live count, used slots, stale flag
+HEADER = struct.Struct("<8sIIQIII")
+HEADER_SIZE = 64
+# state, kind, key length, hash, expires_at
+SLOT = struct.Struct("<BBHxxxxQd")
+KEY_SIZE = 104
+SLOT_SIZE = SLOT.size + KEY_SIZE
+
+EMPTY, LIVE, DELETED = 0, 1, 2
+GEN_OFFSET = 16
+COUNTS_OFFSET = 24
+STALE_OFFSET = 32
+# generation, live count, used slots, stale flag
+STATE = struct.Struct("<QIII")
+MAX_LOAD = 0.7
+# Failed seqlock reads before a reader waits on the writers' lock instead
+MAX_SPINS = 100
+
+
+def _encode_key(key):
+    # Truncate on a character boundary so stored keys round-trip
+    return key.encode('utf-8')[:KEY_SIZE].decode('utf-8', 'ignore').encode('utf-8')
+
+
+def _key_hash(kind, key):
+    digest = hashlib.blake2b(bytes([kind]) + key, digest_size=8).digest()
+    return int.from_bytes(digest, 'little') or 1
+
+
+class BanTable:
+    """Memory-mapped open-addressing hash table of banned users and IPs.
+
+    The table lives in a small file under ``data/`` that every process maps
+    into memory. Lookups hash the key and probe a handful of fixed-size
+    slots directly in the mapping, so ``is_banned`` needs no file I/O and
+    no locks. Readers use a seqlock (an even/odd generation counter in the
+    header) to retry if they raced a writer; writers serialize with
+    ``flock``. A reader that keeps losing the race, or finds the odd
+    generation left by a writer that died mid-update, takes that lock
+    shared instead of spinning. When a writer has to grow the table it
+    writes a new file, swaps it in with ``os.replace`` and flags the old
+    mapping as stale, so readers reopen on their next lookup.
+    """
+
+    def __init__(self, path, writable=False):
+        self.path = path
+        self.writable = writable
+        self._fd = None
+        self._map = None
+        self._open()
+
+    # ---------- setup ----------
+
+    @staticmethod
+    def create(path, capacity=16384):
+        """Write an empty table file (capacity is rounded up to a power of two)"""
+        capacity = 1 << max(4, math.ceil(math.log2(capacity)))
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        with open(tmp_path, 'wb') as f:
+            header = HEADER.pack(MAGIC, capacity, KEY_SIZE, 0, 0, 0, 0)
+            f.write(header.ljust(HEADER_SIZE, b"\0"))
+            f.truncate(HEADER_SIZE + capacity * SLOT_SIZE)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def open_reader(cls, path):
+        """Map an existing table read-only; None if nobody has published one"""
+        if not os.path.exists(path):
+            return None
+        try:
+            return cls(path)
+        except (OSError, ValueError) as e:
+            print(f"[BANS] Could not open ban table {path}: {e}")
+            return None
+
+    @classmethod
+    def open_writer(cls, path, capacity=16384, seed=None):
+        """Map the table for writing, creating it (and calling seed) if missing"""
+        lock_fd = os.open(path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(lock_fd, fcntl.LOCK_EX)
+            created = not os.path.exists(path)
+            if created:
+                cls.create(path, capacity)
+        finally:
+            fcntl.flock(lock_fd, fcntl.LOCK_UN)
+            os.close(lock_fd)
+        table = cls(path, writable=True)
+        if created and seed:
+            seed(table)
+        return table
+
+    def _open(self):
+        self._close()
+        flags = os.O_RDWR if self.writable else os.O_RDONLY
+        self._fd = os.open(self.path, flags)
+        size = os.fstat(self._fd).st_size
+        access = mmap.ACCESS_WRITE if self.writable else mmap.ACCESS_READ
+        self._map = mmap.mmap(self._fd, size, access=access)
+        magic, capacity, key_size = HEADER.unpack_from(self._map, 0)[:3]
+        if magic != MAGIC or key_size != KEY_SIZE or size < HEADER_SIZE + capacity * SLOT_SIZE:
+            self._close()
+            raise ValueError(f"{self.path} is not a ban table")
+        self.capacity = capacity
+        self._mask = capacity - 1
+
+    def _close(self):
+        if self._map is not None:
+            self._map.close()
+        if self._fd is not None:
+            os.close(self._fd)
+        self._map = None
+        self._fd = None
+
+    def close(self):
+        self._close()
+
+    # ---------- reading ----------
+
+    def _header(self):
+        return HEADER.unpack_from(self._map, 0)
+
+    def _probe(self, kind, raw, key_hash):
+        """Slot index holding the key, or -(first free slot) - 1"""
+        mm = self._map
+        pos = key_hash & self._mask
+        free = None
+        for _ in range(self.capacity):
+            offset = HEADER_SIZE + pos * SLOT_SIZE
+            state, slot_kind, length, slot_hash, _ = SLOT.unpack_from(mm, offset)
+            if state == EMPTY:
+                return -(free if free is not None else pos) - 1
+            if state == DELETED:
+                if free is None:
+                    free = pos
+            elif slot_hash == key_hash and slot_kind == kind:
+                start = offset + SLOT.size
+                if mm[start:start + length] == raw:
+                    return pos
+            pos = (pos + 1) & self._mask
+        return -(free if free is not None else 0) - 1
+
+    def _read(self, fn):
+        """Run fn against a consistent view of the mapping (seqlock retry loop)"""
+        for _ in range(MAX_SPINS):
+            generation, _, _, stale = STATE.unpack_from(self._map, GEN_OFFSET)
+            if stale:
+                self._open()  # replaced by a resized table
+                continue
+            if not generation & 1:
+                result = fn()
+                if struct.unpack_from("<Q", self._map, GEN_OFFSET)[0] == generation:
+                    return result
+        return self._read_locked(fn)
+
+    def _read_locked(self, fn):
+        """Run fn while holding the writers' lock shared, so no update is in progress"""
+        fd = os.open(self.path + ".lock", os.O_RDONLY | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_SH)
+            if self._header()[6]:
+                self._open()
+            return fn()
+        finally:
+            os.close(fd)
+
+    def get(self, kind, key):
+        """Expiry timestamp for an entry (inf for permanent), or None"""
+        raw = _encode_key(key)
+        key_hash = _key_hash(kind, raw)
+
+        def lookup():
+            pos = self._probe(kind, raw, key_hash)
+            if pos < 0:
+                return None
+            return SLOT.unpack_from(self._map, HEADER_SIZE + pos * SLOT_SIZE)[4]
+
+        return self._read(lookup)
+
+    def is_banned(self, kind, key, now=None):
+        expires = self.get(kind, key)
+        return expires is not None and expires > (time.time() if now is None else now)
+
+    def is_user_banned(self, user, now=None):
+        return self.is_banned(USER, user, now)
+
+    def is_ip_banned(self, ip, now=None):
+        return self.is_banned(IP, ip, now)
+
+    def entries(self, now=None):
+        """All live bans as (kind, key, expires_at); scans the whole table"""
+        now = time.time() if now is None else now
+
+        def scan():
+            found = []
+            for pos in range(self.capacity):
+                offset = HEADER_SIZE + pos * SLOT_SIZE
+                state, kind, length, _, expires = SLOT.unpack_from(self._map, offset)
+                if state == LIVE and expires > now:
+                    start = offset + SLOT.size
+                    key = self._map[start:start + length].decode('utf-8', errors='replace')
+                    found.append((kind, key, expires))
+            return found
+
+        return self._read(scan)
+
+    def __len__(self):
+        """Number of stored entries, including ones that expired but were not purged yet"""
+        return self._read(lambda: self._header()[4])
+
+    # ---------- writing ----------
+
+    def _lock(self):
+        fd = os.open(self.path + ".lock", os.O_RDWR | os.O_CREAT, 0o644)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        # Another writer may have swapped in a larger table meanwhile
+        if self._header()[6]:
+            self._open()
+        # An odd generation here means a writer died mid-update
+        generation = struct.unpack_from("<Q", self._map, GEN_OFFSET)[0]
+        if generation & 1:
+            struct.pack_into("<Q", self._map, GEN_OFFSET, generation + 1)
+        return fd
+
+    def _unlock(self, fd):
+        fcntl.flock(fd, fcntl.LOCK_UN)
+        os.close(fd)
+
+    def _begin(self):
+        generation = struct.unpack_from("<Q", self._map, GEN_OFFSET)[0]
+        struct.pack_into("<Q", self._map, GEN_OFFSET, generation + 1)
+
+    def _end(self):
+        generation = struct.unpack_from("<Q", self._map, GEN_OFFSET)[0]
+        struct.pack_into("<Q", self._map, GEN_OFFSET, generation + 1)
+
+    def _set_counts(self, live, used):
+        struct.pack_into("<II", self._map, COUNTS_OFFSET, live, used)
+
+    def _write_slot(self, pos, state, kind, raw, key_hash, expires):
+        offset = HEADER_SIZE + pos * SLOT_SIZE
+        SLOT.pack_into(self._map, offset, state, kind, len(raw), key_hash, expires)
+        self._map[offset + SLOT.size:offset + SLOT.size + len(raw)] = raw
+
+    def ban(self, kind, key, expires_at=math.inf):
+        """Insert or update a ban; expires_at is a Unix timestamp (inf = permanent)"""
+        raw = _encode_key(key)
+        key_hash = _key_hash(kind, raw)
+        fd = self._lock()
+        try:
+            live, used = self._header()[4:6]
+            pos = self._probe(kind, raw, key_hash)
+            if pos < 0 and used + 1 > self.capacity * MAX_LOAD:
+                self._rebuild(extra=1)
+                live, used = self._header()[4:6]
+                pos = self._probe(kind, raw, key_hash)
+            self._begin()
+            if pos >= 0:
+                self._write_slot(pos, LIVE, kind, raw, key_hash, expires_at)
+            else:
+                pos = -pos - 1
+                state = SLOT.unpack_from(self._map, HEADER_SIZE + pos * SLOT_SIZE)[0]
+                self._write_slot(pos, LIVE, kind, raw, key_hash, expires_at)
+                self._set_counts(live + 1, used + (state == EMPTY))
+            self._end()
+        finally:
+            self._unlock(fd)
+
+    def unban(self, kind, key):
+        """Remove a ban; returns True if the key was present"""
+        raw = _encode_key(key)
+        key_hash = _key_hash(kind, raw)
+        fd = self._lock()
+        try:
+            pos = self._probe(kind, raw, key_hash)
+            if pos < 0:
+                return False
+            live, used = self._header()[4:6]
+            self._begin()
+            struct.pack_into("<B", self._map, HEADER_SIZE + pos * SLOT_SIZE, DELETED)
+            self._set_counts(live - 1, used)
+            self._end()
+            return True
+        finally:
+            self._unlock(fd)
+
+    def clear(self):
+        """Remove every entry"""
+        fd = self._lock()
+        try:
+            self._begin()
+            self._map[HEADER_SIZE:HEADER_SIZE + self.capacity * SLOT_SIZE] = bytes(self.capacity * SLOT_SIZE)
+            self._set_counts(0, 0)
+            self._end()
+        finally:
+            self._unlock(fd)
+
+    def purge_expired(self, now=None):
+        """Delete expired entries; returns the (kind, key) pairs removed"""
+        now = time.time() if now is None else now
+        expired = [(kind, key) for kind, key, expires in self.entries(now=-math.inf) if expires <= now]
+        for kind, key in expired:
+            self.unban(kind, key)
+        return expired
+
+    def _rebuild(self, extra=0):
+        """Rewrite live entries into a fresh file, doubling it if needed (lock held)"""
+        live = self.entries(now=-math.inf)
+        capacity = self.capacity
+        while len(live) + extra > capacity * MAX_LOAD / 2:
+            capacity *= 2
+        old_path = self.path
+        tmp_path = f"{old_path}.{os.getpid()}.new"
+        BanTable.create(tmp_path, capacity)
+        fresh = BanTable(tmp_path, writable=True)
+        for kind, key, expires in live:
+            raw = _encode_key(key)
+            key_hash = _key_hash(kind, raw)
+            pos = -fresh._probe(kind, raw, key_hash) - 1
+            fresh._write_slot(pos, LIVE, kind, raw, key_hash, expires)
+        fresh._set_counts(len(live), len(live))
+        fresh.close()
+        os.replace(tmp_path, old_path)
+        # Tell every process still mapping the old file to reopen
+        struct.pack_into("<I", self._map, STALE_OFFSET, 1)
+        self._open()
+
+
+def seed_from_legacy(table, defense_log, blocked_file, whitelist_file):
+    """Publish the bans recorded in the legacy text files as permanent user bans"""
+    blocked = set()
+    if os.path.exists(defense_log):
+        with open(defense_log) as f:
+            for line in f:
+                if ",BLOCKED," in line:
+                    blocked.add(line.split(",")[0])
+                elif ",UNBLOCKED," in line:
+                    blocked.discard(line.split(",")[0])
+    if os.path.exists(blocked_file):
+        with open(blocked_file) as f:
+            blocked.update(line.strip() for line in f if line.strip())
+    if os.path.exists(whitelist_file):
+        with open(whitelist_file) as f:
+            blocked.difference_update(line.strip() for line in f)
+    for user in blocked:
+        table.ban(USER, user)
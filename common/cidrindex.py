@@ -0,0 +1,148 @@
+import bisect
+import ipaddress
+import socket
+from array import array
+
+from common.geoip import ip_to_int
+
+BITS = {4: 32, 6: 128}
+FAMILIES = {4: socket.AF_INET, 6: socket.AF_INET6}
+
+
+def parse_networks(text):
+    """[(version, first address, prefix length)] for a CIDR, an address or a ``first-last`` range.
+
+    Host bits of a CIDR are ignored, as with ``ip_network(strict=False)``;
+    a range is split into the CIDRs that cover it exactly. Returns None
+    if the entry is not valid.
+    """
+    text = text.strip()
+    if "-" in text:
+        first, _, last = text.partition("-")
+        try:
+            networks = ipaddress.summarize_address_range(
+                ipaddress.ip_address(first.strip()), ipaddress.ip_address(last.strip()))
+            return [(n.version, int(n.network_address), n.prefixlen) for n in networks]
+        except (ValueError, TypeError):
+            return None
+    address, _, prefix = text.partition("/")
+    parsed = ip_to_int(address)
+    if parsed is None:
+        return None
+    version, number = parsed
+    bits = BITS[version]
+    if not prefix:
+        return [(version, number, bits)]
+    if not prefix.isdigit() or int(prefix) > bits:
+        return None
+    host = (1 << (bits - int(prefix))) - 1
+    return [(version, number & ~host, int(prefix))]
+
+
+class CIDRIndex:
+    """Longest-prefix match of addresses against many IPv4 and IPv6 networks.
+
+    Built once from (network, label) pairs, where a network is a CIDR, a
+    single address or a ``first-last`` range. The nested prefixes are
+    flattened into sorted, disjoint intervals that each point at the most
+    specific network covering them, so a lookup is one address parse and
+    one ``bisect`` however many networks are loaded. IPv4 tables are
+    compact ``array`` objects, IPv6 ones lists of ints, as in GeoIPDatabase.
+    A network given twice keeps its last label; invalid entries are
+    skipped and listed in ``invalid``.
+    """
+
+    def __init__(self, entries):
+        self.labels = []
+        self.invalid = []
+        label_ids = {}
+        networks = {4: {}, 6: {}}
+        for text, label in entries:
+            parsed = parse_networks(str(text))
+            if parsed is None:
+                self.invalid.append(text)
+                continue
+            if label not in label_ids:
+                label_ids[label] = len(self.labels)
+                self.labels.append(label)
+            for version, start, length in parsed:
+                networks[version][start, length] = label_ids[label]
+        self.count = len(networks[4]) + len(networks[6])
+        self._tables = {version: self._flatten(version, found) for version, found in networks.items()}
+
+    @staticmethod
+    def _flatten(version, networks):
+        """Sorted interval starts, each with the index of its most specific network (-1 for none)"""
+        bits = BITS[version]
+        # Sorting by (start, length) puts every network before the ones nested in it
+        ordered = sorted(networks.items())
+        if version == 4:
+            starts, entries = array('I'), array('i')
+            net_starts, net_lengths, net_labels = array('I'), array('B'), array('I')
+        else:
+            starts, entries = [], array('i')
+            net_starts, net_lengths, net_labels = [], array('B'), array('I')
+
+        def emit(start, entry):
+            if not entries or entries[-1] != entry:
+                starts.append(start)
+                entries.append(entry)
+
+        cursor = 0
+        # Networks containing the cursor, innermost last, as (last address, index)
+        stack = []
+        for index, ((start, length), label) in enumerate(ordered):
+            net_starts.append(start)
+            net_lengths.append(length)
+            net_labels.append(label)
+            while stack and stack[-1][0] < start:
+                last, entry = stack.pop()
+                if cursor <= last:
+                    emit(cursor, entry)
+                    cursor = last + 1
+            if cursor < start:
+                emit(cursor, stack[-1][1] if stack else -1)
+                cursor = start
+            stack.append((start + (1 << (bits - length)) - 1, index))
+        while stack:
+            last, entry = stack.pop()
+            if cursor <= last:
+                emit(cursor, entry)
+                cursor = last + 1
+        if cursor < 1 << bits:
+            emit(cursor, -1)
+        return starts, entries, net_starts, net_lengths, net_labels
+
+    def __len__(self):
+        return self.count
+
+    def _entry(self, ip):
+        parsed = ip_to_int(ip)
+        if parsed is None:
+            return None, -1
+        version, number = parsed
+        table = self._tables[version]
+        return table, table[1][bisect.bisect_right(table[0], number) - 1]
+
+    def __contains__(self, ip):
+        return self._entry(ip)[1] >= 0
+
+    def label(self, ip):
+        """Label of the most specific network containing ip, or None"""
+        table, entry = self._entry(ip)
+        return self.labels[table[4][entry]] if entry >= 0 else None
+
+    def lookup(self, ip):
+        """(network, label) of the most specific network containing ip, or None"""
+        table, entry = self._entry(ip)
+        if entry < 0:
+            return None
+        start, length = table[2][entry], table[3][entry]
+        version = 4 if table is self._tables[4] else 6
+        address = socket.inet_ntop(FAMILIES[version], start.to_bytes(BITS[version] // 8, 'big'))
+        return f"{address}/{length}", self.labels[table[4][entry]]
+
+    def stats(self):
+        v4, v6 = self._tables[4], self._tables[6]
+        return (f"{len(v4[2])} IPv4 and {len(v6[2])} IPv6 networks in "
+                f"{len(v4[0]) + len(v6[0])} intervals, {len(self.invalid)} invalid")
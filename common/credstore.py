@@ -0,0 +1,118 @@
+import time
+
+from common.logtail import LogTailer
+
+_MISSING = object()
+
+
+class CredentialStore:
+    """In-memory usernames, passwords and valid credentials that follow their files.
+
+    The lists are read once and then tailed: lines appended by the
+    dashboard (``/add_user``, ``/add_password``, ``/upload_list``) are
+    applied incrementally, while a truncated or replaced file rebuilds
+    just that list (an in-place rewrite that leaves a file longer looks
+    like an append, as with LogTailer). ``refresh`` looks at the files
+    at most every ``check_interval`` seconds, so callers can invoke it
+    before every attempt without touching the disk each time. A last
+    line without a newline is applied too, but only provisionally: it is
+    taken back on the next refresh and re-read with whatever was
+    appended to it, so the lists always match a fresh read of the files.
+    """
+
+    def __init__(self, usernames_file, passwords_file, valid_creds_file, check_interval=1.0):
+        self.check_interval = check_interval
+        self.usernames = []
+        self.passwords = []
+        self.valid_creds = {}
+        self.checked = 0.0
+        self.reloads = 0
+        # name -> (line, undo) for a last line applied before its newline arrived
+        self._pending = {}
+        self._tailers = {
+            "usernames": LogTailer(usernames_file, on_reset=lambda: self._clear("usernames")),
+            "passwords": LogTailer(passwords_file, on_reset=lambda: self._clear("passwords")),
+            "valid_creds": LogTailer(valid_creds_file, on_reset=lambda: self._clear("valid_creds")),
+        }
+        self.refresh(force=True)
+
+    def _clear(self, name):
+        getattr(self, name).clear()
+        self._pending.pop(name, None)
+        self.reloads += 1
+
+    def _apply_pending(self, name, line):
+        """Apply an unfinished last line, remembering how to take it back"""
+        line = line.strip()
+        if not line:
+            return
+        if name == "valid_creds":
+            if ":" not in line:
+                return
+            email, pwd = line.split(":", 1)
+            self._pending[name] = (line, (email, self.valid_creds.get(email, _MISSING)))
+            self.valid_creds[email] = pwd
+        else:
+            self._pending[name] = (line, None)
+            getattr(self, name).append(line)
+
+    def _retract(self, name):
+        """Take back the unfinished line applied by the last refresh; returns it or None"""
+        pending = self._pending.pop(name, None)
+        if pending is None:
+            return None
+        line, undo = pending
+        if name == "valid_creds":
+            email, previous = undo
+            if previous is _MISSING:
+                self.valid_creds.pop(email, None)
+            else:
+                self.valid_creds[email] = previous
+        else:
+            getattr(self, name).pop()
+        return line
+
+    def _apply(self, name, lines):
+        added = 0
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if name == "valid_creds":
+                if ":" not in line:
+                    continue
+                email, pwd = line.split(":", 1)
+                self.valid_creds[email] = pwd
+            else:
+                getattr(self, name).append(line)
+            added += 1
+        return added
+
+    def refresh(self, now=None, force=False):
+        """Apply changes made to the files since the last check; returns {name: lines added}"""
+        now = time.time() if now is None else now
+        if not force and now - self.checked < self.check_interval:
+            return {}
+        self.checked = now
+        changes = {}
+        for name, tailer in self._tailers.items():
+            retracted = self._retract(name)
+            rotations = tailer.rotations
+            lines = list(tailer.read_lines())
+            if tailer.rotations != rotations:
+                # Replaced by a new file: start that list over from its first line
+                self._clear(name)
+                tailer.rewind()
+                lines = list(tailer.read_lines())
+            added = self._apply(name, lines)
+            self._apply_pending(name, tailer.pending_line())
+            pending = self._pending.get(name)
+            if pending is not None and pending[0] != retracted:
+                added += 1
+            if added:
+                changes[name] = added
+        return changes
+
+    def close(self):
+        for tailer in self._tailers.values():
+            tailer.close()
@@ -0,0 +1,232 @@
+import json
+import os
+import threading
+import time
+
+from common.cidrindex import CIDRIndex
+from common.patterns import PatternMatcher
+
+# Keys of a JSON-lines feed record that hold an address, CIDR or range
+IP_KEYS = ("ip", "cidr", "network")
+
+
+def feed_files(paths):
+    """Feed files named by paths, with directories expanded to the files in them"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                full = os.path.join(path, name)
+                if not name.startswith(".") and os.path.isfile(full):
+                    yield full
+        elif os.path.isfile(path):
+            yield path
+
+
+def feed_signature(paths):
+    """{file: (mtime, size, inode)} for every feed file; changes whenever a feed does"""
+    signature = {}
+    for path in feed_files(paths):
+        try:
+            st = os.stat(path)
+        except FileNotFoundError:
+            continue
+        signature[path] = (st.st_mtime_ns, st.st_size, st.st_ino)
+    return signature
+
+
+def read_feed(path):
+    """Stream (kind, value) pairs from one feed, kind being "ip", "pattern" or "invalid".
+
+    ``.json`` is the original ``{"bad_ips": [...], "patterns": [...]}``
+    document. ``.jsonl`` has one object per line with an ``ip`` (or
+    ``cidr``/``network``) and/or a ``pattern`` key. Anything else is a
+    plain list with one address, CIDR or range per line, where ``#`` and
+    ``;`` start comments, as in the Spamhaus DROP and FireHOL lists.
+    """
+    if path.endswith(".json"):
+        with open(path, 'r') as f:
+            data = json.load(f)
+        for entry in data.get('bad_ips', []):
+            yield "ip", str(entry)
+        for pattern in data.get('patterns', []):
+            yield ("pattern" if isinstance(pattern, str) else "invalid"), pattern
+        return
+
+    with open(path, 'r', encoding='utf-8', errors='replace') as f:
+        if path.endswith(".jsonl"):
+            for line in f:
+                if not line.strip():
+                    continue
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    yield "invalid", line.strip()
+                    continue
+                if not isinstance(record, dict):
+                    yield "invalid", line.strip()
+                    continue
+                found = False
+                for key in IP_KEYS:
+                    if record.get(key):
+                        yield "ip", str(record[key])
+                        found = True
+                        break
+                if record.get("pattern") and isinstance(record["pattern"], str):
+                    yield "pattern", record["pattern"]
+                    found = True
+                if not found:
+                    yield "invalid", line.strip()
+        else:
+            for line in f:
+                entry = line.split("#", 1)[0].split(";", 1)[0].strip()
+                if entry:
+                    yield "ip", entry.split()[0]
+
+
+class FeedIndexes:
+    """One generation of loaded feeds and the indexes built from them; never modified.
+
+    ``bad_ips`` maps each address/CIDR/range entry to the feed it came
+    from, which is also its label in ``bad_networks``. ``feeds`` keeps
+    each feed's own (ips, patterns, invalid) lists so the next
+    generation can fall back on them if that feed fails to load.
+    """
+
+    def __init__(self, feeds=None, signature=None):
+        self.feeds = feeds or {}
+        self.signature = signature or {}
+        self.bad_ips = {}
+        patterns = {}
+        self.invalid = []
+        for path, (ips, feed_patterns, invalid) in self.feeds.items():
+            name = os.path.basename(path)
+            for entry in ips:
+                self.bad_ips[entry] = name
+            patterns.update(dict.fromkeys(feed_patterns))
+            self.invalid.extend((name, value) for value in invalid)
+        self.patterns = list(patterns)
+        self.bad_networks = CIDRIndex(self.bad_ips.items())
+        self.pattern_matcher = PatternMatcher(self.patterns)
+        self.build_time = 0.0
+
+
+class ThreatFeedLoader:
+    """Threat feeds that are re-indexed in the background when they change.
+
+    ``reload`` reads every feed into a new FeedIndexes and replaces
+    ``indexes`` with a single assignment, so a caller that takes
+    ``loader.indexes`` once keeps a consistent set of indexes, and
+    detection carries on with the old ones while a new set is built.
+    ``start`` runs ``reload`` every ``check_interval`` seconds on a
+    daemon thread; it only rebuilds when a feed's mtime, size or inode
+    changed. A feed that cannot be read or parsed (e.g. caught
+    mid-write) keeps its previous entries and signature, so it is
+    retried on the next check without a gap in detection.
+    """
+
+    def __init__(self, paths, check_interval=30.0, max_reported=5):
+        self.paths = list(paths)
+        self.check_interval = check_interval
+        self.max_reported = max_reported
+        self.indexes = FeedIndexes()
+        self.reloads = 0
+        # Signatures of feeds that failed to load, retried once they change again
+        self.failed = {}
+        self.running = False
+        self.wakeup = threading.Event()
+        self.thread = None
+
+    def build(self, signature, previous=None):
+        """Read every feed and index it as a new FeedIndexes"""
+        previous = previous or FeedIndexes()
+        started = time.perf_counter()
+        feeds = {}
+        signature = dict(signature)
+        for path in list(signature):
+            ips, patterns, invalid = [], [], []
+            try:
+                for kind, value in read_feed(path):
+                    if kind == "ip":
+                        ips.append(value)
+                    elif kind == "pattern":
+                        patterns.append(value)
+                    else:
+                        invalid.append(value)
+            except (OSError, ValueError, AttributeError) as e:
+                self.failed[path] = signature[path]
+                if path in previous.feeds:
+                    print(f"[THREAT_INTEL] Error loading feed {path}: {e}; keeping its previous entries")
+                    feeds[path] = previous.feeds[path]
+                    signature[path] = previous.signature[path]
+                else:
+                    print(f"[THREAT_INTEL] Error loading feed {path}: {e}")
+                    del signature[path]
+                continue
+            self.failed.pop(path, None)
+            feeds[path] = (ips, patterns, invalid)
+        indexes = FeedIndexes(feeds, signature)
+        indexes.build_time = time.perf_counter() - started
+        return indexes
+
+    def reload(self, force=False):
+        """Rebuild and swap in the indexes if any feed changed; returns the changes or None"""
+        signature = feed_signature(self.paths)
+        old = self.indexes
+        changed = [path for path in signature.keys() | old.signature.keys()
+                   if signature.get(path) != old.signature.get(path)
+                   and (path not in signature or signature[path] != self.failed.get(path))]
+        if not force and not changed:
+            return None
+        new = self.build(signature, old)
+        self.indexes = new
+        self.reloads += 1
+
+        changes = {
+            "bad_ips_added": len(new.bad_ips.keys() - old.bad_ips.keys()),
+            "bad_ips_removed": len(old.bad_ips.keys() - new.bad_ips.keys()),
+            "patterns_added": len(set(new.patterns) - set(old.patterns)),
+            "patterns_removed": len(set(old.patterns) - set(new.patterns)),
+            "build_time": new.build_time,
+        }
+        self.report(new, changes)
+        return changes
+
+    def report(self, indexes, changes):
+        invalid = len(indexes.invalid) + len(indexes.bad_networks.invalid)
+        for name, value in indexes.invalid[:self.max_reported]:
+            print(f"[THREAT_INTEL] Skipping invalid entry in {name}: {value!r}")
+        for entry in indexes.bad_networks.invalid[:self.max_reported]:
+            print(f"[THREAT_INTEL] Skipping invalid bad IP entry {entry!r}")
+        for pattern, error in indexes.pattern_matcher.invalid:
+            print(f"[THREAT_INTEL] Skipping invalid pattern {pattern!r}: {error}")
+        print(f"[THREAT_INTEL] Loaded {len(indexes.signature)} feed(s) in {changes['build_time']:.2f}s: "
+              f"bad IPs +{changes['bad_ips_added']}/-{changes['bad_ips_removed']} ({len(indexes.bad_ips)} total), "
+              f"patterns +{changes['patterns_added']}/-{changes['patterns_removed']} "
+              f"({len(indexes.patterns)} total), {invalid} invalid entries")
+        if indexes.bad_ips:
+            print(f"[THREAT_INTEL] {indexes.bad_networks.stats()}")
+        if indexes.patterns:
+            print(f"[THREAT_INTEL] {indexes.pattern_matcher.stats()}")
+
+    def start(self):
+        if self.thread is None:
+            self.running = True
+            self.thread = threading.Thread(target=self.reload_loop, daemon=True)
+            self.thread.start()
+
+    def reload_loop(self):
+        while self.running:
+            self.wakeup.wait(self.check_interval)
+            self.wakeup.clear()
+            if not self.running:
+                break
+            try:
+                self.reload()
+            except Exception as e:
+                print(f"[THREAT_INTEL] Error reloading feeds: {e}")
+
+    def close(self):
+        self.running = False
+        self.wakeup.set()
+        if self.thread is not None:
+            self.thread.join(5)
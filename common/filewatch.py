@@ -0,0 +1,110 @@
+import ctypes
+import ctypes.util
+import os
+import selectors
+import struct
+import time
+
+# <sys/inotify.h>
+IN_MODIFY = 0x002
+IN_MOVED_TO = 0x080
+IN_CREATE = 0x100
+IN_DELETE = 0x200
+IN_Q_OVERFLOW = 0x4000
+WATCH_MASK = IN_MODIFY | IN_MOVED_TO | IN_CREATE | IN_DELETE
+# wd, mask, cookie, name length
+EVENT = struct.Struct("iIII")
+
+
+def _inotify_fd(directory):
+    """Non-blocking inotify descriptor watching directory, or None if unsupported"""
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        init, add_watch = libc.inotify_init1, libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+    fd = init(os.O_NONBLOCK | os.O_CLOEXEC)
+    if fd < 0:
+        return None
+    if add_watch(fd, os.fsencode(directory), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+    return fd
+
+
+class FileWatcher:
+    """Block until a file is written, woken by inotify where the platform has it.
+
+    The file's directory is watched rather than the file itself, so the
+    watch survives the file being truncated, replaced or created later;
+    events for other files in the directory are ignored. Events queue up
+    in the kernel between calls, so a write that lands while the caller
+    is busy wakes the next ``wait`` immediately. Without inotify (not
+    Linux, or no libc), ``wait`` polls the file's inode, size and mtime
+    every ``poll_interval`` seconds instead.
+    """
+
+    def __init__(self, path, poll_interval=0.1, use_inotify=True):
+        self.path = path
+        self.name = os.fsencode(os.path.basename(path))
+        self.poll_interval = poll_interval
+        self.wakeups = 0
+        self.fd = _inotify_fd(os.path.dirname(os.path.abspath(path))) if use_inotify else None
+        self.selector = None
+        if self.fd is not None:
+            self.selector = selectors.DefaultSelector()
+            self.selector.register(self.fd, selectors.EVENT_READ)
+        self.signature = self._stat()
+
+    @property
+    def mode(self):
+        return "inotify" if self.fd is not None else "polling"
+
+    def _stat(self):
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return None
+        return st.st_ino, st.st_size, st.st_mtime_ns
+
+    def _read_events(self):
+        """Drain queued events; True if any concerned the watched file"""
+        hit = False
+        while True:
+            try:
+                data = os.read(self.fd, 64 * 1024)
+            except BlockingIOError:
+                return hit
+            pos = 0
+            while pos + EVENT.size <= len(data):
+                _, mask, _, length = EVENT.unpack_from(data, pos)
+                name = data[pos + EVENT.size:pos + EVENT.size + length].rstrip(b"\0")
+                if name == self.name or mask & IN_Q_OVERFLOW:
+                    hit = True
+                pos += EVENT.size + length
+
+    def wait(self, timeout):
+        """Wait up to timeout seconds for the file to change; True if it did"""
+        deadline = time.monotonic() + timeout
+        while True:
+            remaining = deadline - time.monotonic()
+            if self.fd is not None:
+                if self.selector.select(max(0, remaining)) and self._read_events():
+                    self.wakeups += 1
+                    return True
+            else:
+                signature = self._stat()
+                if signature != self.signature:
+                    self.signature = signature
+                    self.wakeups += 1
+                    return True
+                if remaining > 0:
+                    time.sleep(min(self.poll_interval, remaining))
+            if remaining <= 0:
+                return False
+
+    def close(self):
+        if self.fd is not None:
+            self.selector.close()
+            os.close(self.fd)
+            self.fd = None
@@ -0,0 +1,234 @@
+import argparse
+import bisect
+import csv
+import json
+import os
+import socket
+import struct
+from array import array
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "data")
+DEFAULT_CSV = os.path.join(DATA_DIR, "geoip.csv")
+DEFAULT_BIN = os.path.join(DATA_DIR, "geoip.bin")
+
+FIELDS = ("country_code", "country", "region", "city", "lat", "lon", "timezone")
+MAGIC = b"CDGEO1\0\0"
+
+UNKNOWN = {
+    "country_code": "Unknown",
+    "country": "Unknown",
+    "region": "Unknown",
+    "city": "Unknown",
+    "lat": 0,
+    "lon": 0,
+    "timezone": "Unknown"
+}
+
+
+def ip_to_int(ip):
+    """Return (version, integer) for an address string, or None if invalid"""
+    try:
+        return 4, int.from_bytes(socket.inet_pton(socket.AF_INET, ip), 'big')
+    except OSError:
+        pass
+    try:
+        return 6, int.from_bytes(socket.inet_pton(socket.AF_INET6, ip), 'big')
+    except OSError:
+        return None
+
+
+def _parse_bound(value):
+    value = value.strip()
+    if value.isdigit():
+        number = int(value)
+        return (4 if number < 1 << 32 else 6), number
+    return ip_to_int(value)
+
+
+class GeoIPDatabase:
+    """Offline IP range table answered with binary search.
+
+    Ranges are kept as sorted integer arrays (IPv4 in compact ``array``
+    objects, IPv6 as Python ints) pointing into a table of distinct location
+    records, so a lookup is one ``bisect`` and costs microseconds. Tables
+    can be loaded from a range CSV (``start,end,country_code[,country,
+    region,city,lat,lon,timezone]`` with dotted or integer addresses, as in
+    the DB-IP and IP2Location lite exports) or from the binary file written
+    by ``save_binary``.
+    """
+
+    def __init__(self):
+        self.records = []
+        self.v4_starts = array('I')
+        self.v4_ends = array('I')
+        self.v4_index = array('I')
+        self.v6_starts = []
+        self.v6_ends = []
+        self.v6_index = []
+
+    def __len__(self):
+        return len(self.v4_starts) + len(self.v6_starts)
+
+    @classmethod
+    def load(cls, path):
+        if path.endswith(".bin"):
+            return cls.load_binary(path)
+        return cls.load_csv(path)
+
+    @classmethod
+    def load_default(cls):
+        """Load the lab's bundled table, preferring the prebuilt binary"""
+        for path in (DEFAULT_BIN, DEFAULT_CSV):
+            if os.path.exists(path):
+                try:
+                    return cls.load(path)
+                except Exception as e:
+                    print(f"[GEO] Error loading {path}: {e}")
+        return cls()
+
+    @classmethod
+    def load_csv(cls, path):
+        db = cls()
+        record_ids = {}
+        v4, v6 = [], []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.reader(f):
+                if len(row) < 3 or row[0].startswith("#"):
+                    continue
+                start, end = _parse_bound(row[0]), _parse_bound(row[1])
+                if not start or not end or start[0] != end[0]:
+                    continue  # header line or malformed row
+
+                values = [field.strip() for field in row[2:2 + len(FIELDS)]]
+                values += [""] * (len(FIELDS) - len(values))
+                record = dict(zip(FIELDS, values))
+                record["country"] = record["country"] or record["country_code"]
+                for key in ("lat", "lon"):
+                    try:
+                        record[key] = float(record[key])
+                    except ValueError:
+                        record[key] = 0
+                for key in ("region", "city", "timezone"):
+                    record[key] = record[key] or "Unknown"
+
+                key = tuple(record[field] for field in FIELDS)
+                if key not in record_ids:
+                    record_ids[key] = len(db.records)
+                    db.records.append(record)
+                target = v4 if start[0] == 4 else v6
+                target.append((start[1], end[1], record_ids[key]))
+
+        v4.sort()
+        v6.sort()
+        for start, end, idx in v4:
+            db.v4_starts.append(start)
+            db.v4_ends.append(end)
+            db.v4_index.append(idx)
+        for start, end, idx in v6:
+            db.v6_starts.append(start)
+            db.v6_ends.append(end)
+            db.v6_index.append(idx)
+        return db
+
+    def save_binary(self, path):
+        """Write the table as a compact binary file for fast startup"""
+        records = json.dumps([[r[field] for field in FIELDS] for r in self.records]).encode('utf-8')
+        with open(path, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<III', len(records), len(self.v4_starts), len(self.v6_starts)))
+            f.write(records)
+            for values in (self.v4_starts, self.v4_ends, self.v4_index):
+                f.write(array('I', values).tobytes())
+            for start, end, idx in zip(self.v6_starts, self.v6_ends, self.v6_index):
+                f.write(start.to_bytes(16, 'big') + end.to_bytes(16, 'big') + struct.pack('<I', idx))
+
+    @classmethod
+    def load_binary(cls, path):
+        db = cls()
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:len(MAGIC)] != MAGIC:
+            raise ValueError(f"{path} is not a GeoIP binary table")
+        pos = len(MAGIC)
+        records_len, v4_count, v6_count = struct.unpack_from('<III', data, pos)
+        pos += 12
+        db.records = [dict(zip(FIELDS, values)) for values in json.loads(data[pos:pos + records_len])]
+        pos += records_len
+        for values in (db.v4_starts, db.v4_ends, db.v4_index):
+            values.frombytes(data[pos:pos + 4 * v4_count])
+            pos += 4 * v4_count
+        for _ in range(v6_count):
+            db.v6_starts.append(int.from_bytes(data[pos:pos + 16], 'big'))
+            db.v6_ends.append(int.from_bytes(data[pos + 16:pos + 32], 'big'))
+            db.v6_index.append(struct.unpack_from('<I', data, pos + 32)[0])
+            pos += 36
+        return db
+
+    def _find(self, version, number):
+        if version == 4:
+            starts, ends, index = self.v4_starts, self.v4_ends, self.v4_index
+        else:
+            starts, ends, index = self.v6_starts, self.v6_ends, self.v6_index
+        pos = bisect.bisect_right(starts, number) - 1
+        if pos >= 0 and number <= ends[pos]:
+            return self.records[index[pos]]
+        return None
+
+    def lookup(self, ip):
+        """Return the location record for ip, or None if it is not covered"""
+        parsed = ip_to_int(ip)
+        if parsed is None:
+            return None
+        return self._find(*parsed)
+
+    def lookup_many(self, ips):
+        """Resolve many addresses at once; returns {ip: record or None}.
+
+        Addresses are parsed once per distinct value, sorted, and matched
+        with bisects that only ever move forward through the ranges.
+        """
+        parsed = {ip: ip_to_int(ip) for ip in set(ips)}
+        results = {ip: None for ip, value in parsed.items() if value is None}
+
+        for version, starts, ends, index in (
+            (4, self.v4_starts, self.v4_ends, self.v4_index),
+            (6, self.v6_starts, self.v6_ends, self.v6_index)
+        ):
+            batch = sorted((value[1], ip) for ip, value in parsed.items() if value and value[0] == version)
+            pos = 0
+            for number, ip in batch:
+                pos = bisect.bisect_right(starts, number, pos)
+                if pos and number <= ends[pos - 1]:
+                    results[ip] = self.records[index[pos - 1]]
+                else:
+                    results[ip] = None
+        return results
+
+    def country_code(self, ip):
+        record = self.lookup(ip)
+        return record["country_code"] if record else "Unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="CrackDefend offline GeoIP table")
+    sub = parser.add_subparsers(dest="command", required=True)
+    build = sub.add_parser("build", help="compile a range CSV into the binary format")
+    build.add_argument("csv_path")
+    build.add_argument("bin_path", nargs="?", default=DEFAULT_BIN)
+    lookup = sub.add_parser("lookup", help="look up one or more addresses")
+    lookup.add_argument("ips", nargs="+")
+    lookup.add_argument("--db", default=None)
+    args = parser.parse_args()
+
+    if args.command == "build":
+        db = GeoIPDatabase.load_csv(args.csv_path)
+        db.save_binary(args.bin_path)
+        print(f"[GEO] Wrote {len(db)} ranges ({len(db.records)} locations) to {args.bin_path}")
+    else:
+        db = GeoIPDatabase.load(args.db) if args.db else GeoIPDatabase.load_default()
+        for ip, record in db.lookup_many(args.ips).items():
+            print(f"{ip}: {record or UNKNOWN}")
+
+
+if __name__ == "__main__":
+    main()
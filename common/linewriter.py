@@ -0,0 +1,107 @@
+import os
+import threading
+import time
+
+FSYNC_POLICIES = ("never", "batch", "interval")
+
+
+class GroupCommitLogWriter:
+    """Buffered appender for line-oriented logs such as attack_log.csv.
+
+    ``write_line`` only appends to an in-memory buffer. The buffer is
+    written out with a single ``os.write`` on an ``O_APPEND`` descriptor
+    once it holds ``flush_records`` lines, or by a background thread after
+    ``flush_interval`` seconds, whichever comes first. Buffers only ever
+    contain complete lines, so tailers never see a line split across two
+    writes. ``fsync`` is one of:
+
+    - ``never``: leave durability to the page cache (default)
+    - ``batch``: fsync after every flush
+    - ``interval``: fsync at most once every ``fsync_interval`` seconds
+    """
+
+    def __init__(self, path, flush_records=256, flush_interval=0.2,
+                 fsync="never", fsync_interval=1.0):
+        if fsync not in FSYNC_POLICIES:
+            raise ValueError(f"fsync must be one of {FSYNC_POLICIES}, not {fsync!r}")
+        self.path = path
+        self.flush_records = max(1, flush_records)
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.fsync_interval = fsync_interval
+        self.stats = {"lines": 0, "flushes": 0, "bytes": 0, "fsyncs": 0, "errors": 0}
+        self._fd = os.open(path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        self._buffer = []
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._last_fsync = time.time()
+        self._dirty = False
+        self._closed = threading.Event()
+        self._thread = None
+        if flush_interval and flush_interval > 0:
+            self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+            self._thread.start()
+
+    def write_line(self, line):
+        """Buffer one line (a trailing newline is added if missing)"""
+        if not line.endswith("\n"):
+            line += "\n"
+        with self._lock:
+            self._buffer.append(line)
+            self.stats["lines"] += 1
+            full = len(self._buffer) >= self.flush_records
+        if full:
+            self.flush()
+
+    def flush(self):
+        """Write every buffered line out now"""
+        # Taking the batch under the write lock keeps batches in order
+        with self._write_lock:
+            with self._lock:
+                lines, self._buffer = self._buffer, []
+            if lines:
+                self._write("".join(lines).encode("utf-8"))
+            if self._dirty and (self.fsync == "batch" or (
+                    self.fsync == "interval" and time.time() - self._last_fsync >= self.fsync_interval)):
+                self._sync()
+
+    def _write(self, data):
+        try:
+            view = memoryview(data)
+            while view:
+                written = os.write(self._fd, view)
+                view = view[written:]
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"[LOG] Error writing {self.path}: {e}")
+            return
+        self.stats["flushes"] += 1
+        self.stats["bytes"] += len(data)
+        self._dirty = True
+
+    def _sync(self):
+        try:
+            os.fsync(self._fd)
+            self.stats["fsyncs"] += 1
+        except OSError as e:
+            self.stats["errors"] += 1
+            print(f"[LOG] Error syncing {self.path}: {e}")
+        self._last_fsync = time.time()
+        self._dirty = False
+
+    def _run(self):
+        while not self._closed.wait(self.flush_interval):
+            self.flush()
+
+    def close(self):
+        """Flush what is left (and fsync unless the policy is never) and close the file"""
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        if self._thread is not None:
+            self._thread.join(5)
+        self.flush()
+        if self.fsync != "never" and self._dirty:
+            with self._write_lock:
+                self._sync()
+        os.close(self._fd)
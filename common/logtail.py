@@ -0,0 +1,113 @@
+import os
+
+
+class LogTailer:
+    """Follow an append-only log file from a remembered byte offset.
+
+    Only bytes appended since the previous call are read, so the cost of a
+    poll scales with the amount of new data rather than with the size of
+    the file. Truncation (e.g. ``/reset_stats`` rewriting the log) and
+    rotation (the path pointing at a new inode) are both detected.
+    Passing a saved ``offset``/``inode`` pair resumes where a previous
+    tailer stopped, provided the file is still the same one.
+    """
+
+    def __init__(self, path, on_reset=None, start_at_end=False, chunk_size=1 << 20,
+                 offset=0, inode=None):
+        self.path = path
+        self.on_reset = on_reset
+        self.start_at_end = start_at_end
+        self.chunk_size = chunk_size
+        self.offset = offset
+        self.inode = inode
+        self.resets = 0
+        self.rotations = 0
+        self._file = None
+        self._partial = b""
+
+    def _open(self, st, offset):
+        self._file = open(self.path, 'rb')
+        self.inode = st.st_ino
+        self.offset = offset
+        self._partial = b""
+
+    def _close(self):
+        if self._file:
+            self._file.close()
+        self._file = None
+
+    def _drain(self):
+        """Read every complete line between the current offset and EOF"""
+        self._file.seek(self.offset)
+        while True:
+            chunk = self._file.read(self.chunk_size)
+            if not chunk:
+                break
+            self.offset += len(chunk)
+            data = self._partial + chunk
+            cut = data.rfind(b"\n")
+            if cut < 0:
+                self._partial = data
+                continue
+            self._partial = data[cut + 1:]
+            for raw in data[:cut].split(b"\n"):
+                yield raw.decode('utf-8', errors='replace')
+
+    def read_lines(self):
+        """Yield complete lines appended since the last call.
+
+        A trailing line without a newline is held back until it is
+        finished. The generator must be consumed fully for the offset to
+        stay consistent.
+        """
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            # Rotated away and not recreated yet: finish the old file
+            if self._file:
+                yield from self._drain()
+            return
+
+        if self._file is None:
+            if self.start_at_end:
+                offset = st.st_size
+            elif self.inode == st.st_ino and self.offset <= st.st_size:
+                offset = self.offset
+            else:
+                offset = 0
+            self._open(st, offset)
+        elif st.st_ino != self.inode:
+            # Rotation: finish whatever was left in the old file first
+            yield from self._drain()
+            self._close()
+            self._open(st, 0)
+            self.rotations += 1
+        elif st.st_size < self.offset:
+            # Truncated in place, previous history is gone
+            self._close()
+            self._open(st, 0)
+            self.resets += 1
+            if self.on_reset:
+                self.on_reset()
+
+        yield from self._drain()
+
+    def pending_line(self):
+        """The trailing line held back for want of a newline, or "" if there is none"""
+        return self._partial.decode('utf-8', errors='replace')
+
+    def rewind(self):
+        """Start again from the beginning of the file on the next read"""
+        self._close()
+        self.start_at_end = False
+        self.offset = 0
+        self.inode = None
+        self._partial = b""
+
+    def position(self):
+        """Offset and inode of the last complete line, for resuming later"""
+        return self.offset - len(self._partial), self.inode
+
+    def close(self):
+        """Release the underlying file handle"""
+        self._close()
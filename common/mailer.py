@@ -0,0 +1,190 @@
+import json
+import os
+import smtplib
+import threading
+import time
+from collections import deque
+
+
+class PersistentSMTP:
+    """One SMTP session that is kept open and reused across messages"""
+
+    def __init__(self, host='localhost', port=1025, timeout=5, idle_check=30):
+        self.host = host
+        self.port = port
+        self.timeout = timeout
+        self.idle_check = idle_check
+        self.connects = 0
+        self._server = None
+        self._last_used = 0
+
+    def _connect(self):
+        self._server = smtplib.SMTP(self.host, self.port, timeout=self.timeout)
+        self.connects += 1
+
+    def _alive(self):
+        # Only probe a session that has been idle for a while
+        if time.time() - self._last_used < self.idle_check:
+            return True
+        try:
+            return self._server.noop()[0] == 250
+        except smtplib.SMTPException:
+            return False
+        except OSError:
+            return False
+
+    def sendmail(self, from_addr, to_addrs, message):
+        """Send over the open session, connecting first if needed"""
+        if self._server is None or not self._alive():
+            self.close()
+            self._connect()
+        try:
+            self._server.sendmail(from_addr, to_addrs, message)
+        except (smtplib.SMTPServerDisconnected, OSError):
+            self.close()
+            raise
+        self._last_used = time.time()
+
+    def close(self):
+        if self._server is not None:
+            try:
+                self._server.quit()
+            except Exception:
+                pass
+        self._server = None
+
+
+class MailOutbox:
+    """Background outbox that sends mail without blocking the caller.
+
+    Messages are queued in memory and delivered by a worker thread in
+    batches over a single ``PersistentSMTP`` session. Failed deliveries are
+    put back at the head of the queue and retried with exponential backoff.
+    When the queue is full, messages are appended to ``spool_path`` (or
+    dropped if no spool is configured) and replayed once the queue drains.
+    """
+
+    def __init__(self, host='localhost', port=1025, timeout=5, max_queue=1000,
+                 batch_size=50, spool_path=None, max_backoff=30, name="mail-outbox"):
+        self.smtp = PersistentSMTP(host, port, timeout)
+        self.max_queue = max_queue
+        self.batch_size = batch_size
+        self.spool_path = spool_path
+        self.max_backoff = max_backoff
+        self.stats = {"queued": 0, "sent": 0, "failed": 0, "spooled": 0, "dropped": 0}
+        self._queue = deque()
+        self._cond = threading.Condition()
+        self._running = True
+        self._backoff = 0
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._thread.start()
+
+    def send(self, msg):
+        """Queue an ``email.message.Message``; never blocks on SMTP"""
+        return self.enqueue(msg['From'], [msg['To']], msg.as_string())
+
+    def enqueue(self, from_addr, to_addrs, message):
+        item = (from_addr, list(to_addrs), message)
+        with self._cond:
+            if len(self._queue) < self.max_queue:
+                self._queue.append(item)
+                self.stats["queued"] += 1
+                self._cond.notify()
+                return True
+        self._overflow(item)
+        return False
+
+    def pending(self):
+        with self._cond:
+            return len(self._queue)
+
+    def _overflow(self, item):
+        if not self.spool_path:
+            self.stats["dropped"] += 1
+            return
+        try:
+            with open(self.spool_path, "a") as f:
+                f.write(json.dumps({"from": item[0], "to": item[1], "data": item[2]}) + "\n")
+            self.stats["spooled"] += 1
+        except OSError as e:
+            self.stats["dropped"] += 1
+            print(f"[MAIL] Could not spool message: {e}")
+
+    def _replay_spool(self):
+        """Move spooled messages back into the queue once there is room.
+
+        The spool is renamed to ``.replay`` before it is read. A ``.replay``
+        left behind by a replay that failed is resent first, and the spool
+        is only taken on a later call, so neither overwrites the other.
+        """
+        if not self.spool_path:
+            return
+        replay_path = self.spool_path + ".replay"
+        try:
+            if not os.path.exists(replay_path):
+                if not os.path.exists(self.spool_path):
+                    return
+                os.replace(self.spool_path, replay_path)
+            with open(replay_path) as f:
+                for line in f:
+                    try:
+                        entry = json.loads(line)
+                        item = (entry["from"], entry["to"], entry["data"])
+                    except (ValueError, KeyError, TypeError):
+                        continue
+                    self.enqueue(*item)
+            os.remove(replay_path)
+        except OSError as e:
+            print(f"[MAIL] Could not replay spool: {e}")
+
+    def _next_batch(self):
+        with self._cond:
+            while self._running and not self._queue:
+                self._cond.wait()
+            batch = []
+            while self._queue and len(batch) < self.batch_size:
+                batch.append(self._queue.popleft())
+            return batch
+
+    def _deliver(self, batch):
+        for i, (from_addr, to_addrs, message) in enumerate(batch):
+            try:
+                self.smtp.sendmail(from_addr, to_addrs, message)
+            except Exception as e:
+                self.stats["failed"] += 1
+                # Keep ordering: put the undelivered tail back at the front
+                with self._cond:
+                    self._queue.extendleft(reversed(batch[i:]))
+                self._backoff = min(self.max_backoff, max(0.5, self._backoff * 2))
+                print(f"[MAIL] Delivery failed ({e}), retrying in {self._backoff:.1f}s")
+                return False
+            self.stats["sent"] += 1
+        self._backoff = 0
+        return True
+
+    def _run(self):
+        while self._running:
+            batch = self._next_batch()
+            if not batch:
+                continue
+            if not self._deliver(batch):
+                with self._cond:
+                    self._cond.wait_for(lambda: not self._running, timeout=self._backoff)
+            elif not self.pending():
+                self._replay_spool()
+
+    def close(self, timeout=5):
+        """Try to deliver what is queued, spool the rest and stop the worker"""
+        deadline = time.time() + timeout
+        while self.pending() and self._thread.is_alive() and time.time() < deadline:
+            time.sleep(0.05)
+        with self._cond:
+            self._running = False
+            self._cond.notify_all()
+        self._thread.join(max(0, deadline - time.time()))
+        with self._cond:
+            leftover = list(self._queue)
+            self._queue.clear()
+        for item in leftover:
+            self._overflow(item)
+        self.smtp.close()
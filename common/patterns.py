@@ -0,0 +1,239 @@
+import re
+from collections import deque
+
+# Characters that make a pattern more than a plain substring search
+_META = set(".^$*+?{}[]()|")
+# A {n,m} repeat count
+_COUNTS = re.compile(r"\{\d*(,\d*)?\}")
+# Escapes that take an argument, and how many characters of it
+_ESCAPE_ARGS = {"x": 2, "u": 4, "U": 8}
+# The only non-ASCII characters re.IGNORECASE matches with ASCII ones
+_ASCII_FOLDS = str.maketrans({"\u0130": "i", "\u0131": "i", "\u017f": "s", "\u212a": "k"})
+
+
+def trim(pattern):
+    """Drop leading and trailing ``.*``, which never change whether re.search matches.
+
+    A ``.*`` followed by another quantifier (``.*?``, ``.*+``) is kept.
+    """
+    core = pattern
+    while core.startswith(".*") and core[2:3] not in ("?", "+", "{"):
+        core = core[2:]
+    while core.endswith(".*") and not core.endswith("\\.*"):
+        core = core[:-2]
+    return core
+
+
+def literal_of(pattern):
+    """The substring a pattern searches for, if it is just ``.*literal.*``, else None"""
+    core = trim(pattern)
+    chars = []
+    i = 0
+    while i < len(core):
+        char = core[i]
+        if char == "\\":
+            # Only escaped punctuation such as \. stands for itself
+            if i + 1 == len(core) or core[i + 1].isalnum() or core[i + 1] == "_":
+                return None
+            char = core[i + 1]
+            i += 1
+        elif char in _META:
+            return None
+        chars.append(char)
+        i += 1
+    literal = "".join(chars)
+    # Only ASCII literals, where lower() agrees with re.IGNORECASE
+    return literal.lower() if literal and literal.isascii() else None
+
+
+def _escape_end(core, i):
+    """Index just past the escape starting at core[i], including any argument"""
+    escaped = core[i + 1:i + 2]
+    end = i + 2
+    if escaped in _ESCAPE_ARGS:
+        end += _ESCAPE_ARGS[escaped]
+    elif escaped == "N" and core[end:end + 1] == "{":
+        close = core.find("}", end)
+        end = len(core) if close < 0 else close + 1
+    elif escaped.isdigit():
+        # Octal escape or group reference, at most three digits in all
+        while end < len(core) and end < i + 4 and core[end].isdigit():
+            end += 1
+    return min(end, len(core))
+
+
+def required_literals(pattern):
+    """Lowercase substrings, one per top-level alternative, that every match must contain.
+
+    Only top-level runs of plain characters count; groups, classes and
+    anything followed by a quantifier end a run, and the longest run of
+    each alternative wins. None if some alternative has no such run.
+    """
+    branches = []
+    runs = [[]]
+    depth = 0
+    i = 0
+    core = trim(pattern)
+    while i < len(core):
+        char = core[i]
+        run = runs[-1]
+        if char == "\\":
+            escaped = core[i + 1:i + 2]
+            if depth == 0 and escaped and not (escaped.isalnum() or escaped == "_"):
+                run.append(escaped)
+                i += 2
+            else:
+                # \x41, \d, \1 and the like end the run, arguments included
+                runs.append([])
+                i = _escape_end(core, i)
+            continue
+        if char == "[":
+            # Skip the class, allowing a leading ] or ^] inside it
+            i += 1
+            if core[i:i + 1] == "^":
+                i += 1
+            if core[i:i + 1] == "]":
+                i += 1
+            while i < len(core) and core[i] != "]":
+                i += 2 if core[i] == "\\" else 1
+            runs.append([])
+        elif depth == 0 and char == "|":
+            branches.append(runs)
+            runs = [[]]
+        elif char in "*?+{":
+            # The previous character may be optional or repeated
+            if run:
+                run.pop()
+            runs.append([])
+            counts = _COUNTS.match(core, i) if char == "{" else None
+            if counts:
+                i = counts.end() - 1
+        elif char == "(" or char == ")":
+            depth += 1 if char == "(" else -1
+            runs.append([])
+        elif char in ".^$" or depth:
+            runs.append([])
+        else:
+            run.append(char)
+        i += 1
+    branches.append(runs)
+    factors = [max(("".join(run) for run in runs), key=len) for runs in branches]
+    if not all(factor and factor.isascii() for factor in factors):
+        return None
+    return [factor.lower() for factor in factors]
+
+
+class AhoCorasick:
+    """Automaton reporting which of many literals occur in a text in one scan"""
+
+    def __init__(self, literals):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [set()]
+        for key, literal in literals:
+            state = 0
+            for char in literal:
+                if char not in self.goto[state]:
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(set())
+                    self.goto[state][char] = len(self.goto) - 1
+                state = self.goto[state][char]
+            self.out[state].add(key)
+        # Breadth-first failure links, merging the outputs of suffix states
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, child in self.goto[state].items():
+                queue.append(child)
+                fallback = self.fail[state]
+                while fallback and char not in self.goto[fallback]:
+                    fallback = self.fail[fallback]
+                self.fail[child] = self.goto[fallback].get(char, 0)
+                self.out[child] |= self.out[self.fail[child]]
+
+    def search(self, text):
+        """Keys of every literal found in text"""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+class PatternMatcher:
+    """Case-insensitive ``re.search`` of many patterns with one scan per text.
+
+    Patterns that only look for a substring (``.*script.*``) are matched
+    by an Aho-Corasick automaton, which in the same scan also finds a
+    literal every match of a regex pattern must contain (``select`` for
+    ``.*union.*select.*``, one per alternative for ``a|b``), so only
+    regexes whose literal occurs are run.
+    The few regexes without such a literal are searched every time, with
+    leading and trailing ``.*`` trimmed. Invalid patterns are skipped.
+    Build once per feed and reuse.
+    """
+
+    def __init__(self, patterns):
+        self.patterns = list(patterns)
+        self.invalid = []
+        self.compiled = {}
+        self.literal_count = 0
+        self.filtered = set()
+        self.unfiltered = []
+        keys = []
+        for index, pattern in enumerate(self.patterns):
+            try:
+                self.compiled[index] = re.compile(trim(pattern) or pattern, re.IGNORECASE)
+            except re.error as e:
+                self.invalid.append((pattern, str(e)))
+                continue
+            literal = literal_of(pattern)
+            if literal is not None:
+                keys.append((index, literal))
+                self.literal_count += 1
+                continue
+            # Whitespace and comments are not literal in verbose patterns
+            factors = None if self.compiled[index].flags & re.VERBOSE else required_literals(pattern)
+            if factors is not None:
+                keys.extend((index, factor) for factor in factors)
+                self.filtered.add(index)
+            else:
+                self.unfiltered.append(index)
+        self.automaton = AhoCorasick(keys) if keys else None
+
+    def __len__(self):
+        return len(self.patterns) - len(self.invalid)
+
+    def match_indexes(self, *texts):
+        """Sorted indexes of the patterns found in any of the texts"""
+        found = set()
+        compiled = self.compiled
+        for text in texts:
+            if self.automaton is not None:
+                exact = text.isascii()
+                # Outside ASCII lower() can find more than IGNORECASE would,
+                # so there literal hits are confirmed by the regex
+                folded = text.lower() if exact else text.translate(_ASCII_FOLDS).lower()
+                for index in self.automaton.search(folded):
+                    if index in found:
+                        continue
+                    if (exact and index not in self.filtered) or compiled[index].search(text):
+                        found.add(index)
+            for index in self.unfiltered:
+                if index not in found and compiled[index].search(text):
+                    found.add(index)
+        return sorted(found)
+
+    def matches(self, *texts):
+        """Patterns (as given) found in any of the texts, in feed order"""
+        return [self.patterns[index] for index in self.match_indexes(*texts)]
+
+    def stats(self):
+        return (f"{len(self)} patterns: {self.literal_count} literal, {len(self.filtered)} prefiltered, "
+                f"{len(self.unfiltered)} always searched, {len(self.invalid)} invalid")
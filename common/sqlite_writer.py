@@ -0,0 +1,155 @@
+import queue
+import sqlite3
+import threading
+import time
+
+
+class _Flush:
+    """Queue marker asking the writer thread to commit and acknowledge"""
+
+    def __init__(self):
+        self.done = threading.Event()
+
+
+_STOP = object()
+
+
+def enable_wal(conn):
+    """Switch a connection's database to WAL so readers never block the writer"""
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+
+
+class BatchedSQLiteWriter:
+    """Single long-lived SQLite writer fed through a bounded queue.
+
+    Callers hand over ``(sql, params)`` pairs with ``submit`` and return
+    immediately. A background thread drains the queue and group-commits
+    everything it finds with ``executemany``, so a burst of events costs one
+    transaction instead of one connection and fsync per row. When the queue
+    is full the row is dropped and counted rather than blocking the caller.
+    A batch that hits an ``OperationalError`` (e.g. "database is locked")
+    is retried with exponential backoff; any other error has the batch
+    written row by row, so only the rows that fail are dropped.
+    """
+
+    def __init__(self, db_path, max_queue=10000, batch_size=500, flush_interval=0.5,
+                 max_retries=5, retry_delay=0.1):
+        self.db_path = db_path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.max_retries = max_retries
+        self.retry_delay = retry_delay
+        self.stats = {"queued": 0, "written": 0, "batches": 0, "dropped": 0, "errors": 0, "retries": 0}
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = threading.Thread(target=self._run, name="sqlite-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, sql, params):
+        """Queue one row for writing; returns False if it had to be dropped"""
+        try:
+            self._queue.put_nowait((sql, params))
+        except queue.Full:
+            self.stats["dropped"] += 1
+            return False
+        self.stats["queued"] += 1
+        return True
+
+    def flush(self, timeout=5):
+        """Block until everything queued so far has been committed"""
+        if not self._thread.is_alive():
+            return False
+        marker = _Flush()
+        self._queue.put(marker)
+        return marker.done.wait(timeout)
+
+    def close(self, timeout=5):
+        """Commit pending rows and stop the writer thread"""
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+
+    def _write(self, conn, batch):
+        # Keep statement order while grouping consecutive identical SQL
+        start = 0
+        while start < len(batch):
+            sql = batch[start][0]
+            end = start
+            while end < len(batch) and batch[end][0] == sql:
+                end += 1
+            conn.executemany(sql, [params for _, params in batch[start:end]])
+            start = end
+        conn.commit()
+        self.stats["written"] += len(batch)
+        self.stats["batches"] += 1
+
+    def _write_batch(self, conn, batch):
+        """Write a batch, retrying transient errors and isolating rows that fail"""
+        for attempt in range(self.max_retries + 1):
+            try:
+                self._write(conn, batch)
+                return
+            except sqlite3.OperationalError as e:
+                conn.rollback()
+                if attempt == self.max_retries:
+                    self.stats["errors"] += 1
+                    self.stats["dropped"] += len(batch)
+                    print(f"[DATABASE] Dropping batch of {len(batch)} rows after {attempt} retries: {e}")
+                    return
+                self.stats["retries"] += 1
+                time.sleep(self.retry_delay * 2 ** attempt)
+            except sqlite3.Error as e:
+                conn.rollback()
+                self.stats["errors"] += 1
+                print(f"[DATABASE] Error writing batch of {len(batch)} rows, retrying row by row: {e}")
+                break
+
+        failed = 0
+        for row in batch:
+            try:
+                self._write(conn, [row])
+            except sqlite3.Error as e:
+                conn.rollback()
+                failed += 1
+                if failed == 1:
+                    print(f"[DATABASE] Dropping row {row[1]!r}: {e}")
+        if failed:
+            self.stats["dropped"] += failed
+            print(f"[DATABASE] Dropped {failed} of {len(batch)} rows")
+
+    def _run(self):
+        conn = sqlite3.connect(self.db_path, timeout=30)
+        try:
+            enable_wal(conn)
+        except sqlite3.Error as e:
+            print(f"[DATABASE] Could not enable WAL mode: {e}")
+
+        running = True
+        while running:
+            try:
+                item = self._queue.get(timeout=self.flush_interval)
+            except queue.Empty:
+                continue
+
+            batch = []
+            markers = []
+            while True:
+                if item is _STOP:
+                    running = False
+                elif isinstance(item, _Flush):
+                    markers.append(item)
+                else:
+                    batch.append(item)
+                if running and len(batch) >= self.batch_size:
+                    break
+                try:
+                    item = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+
+            if batch:
+                self._write_batch(conn, batch)
+            for marker in markers:
+                marker.done.set()
+
+        conn.close()
@@ -0,0 +1,114 @@
+from collections import OrderedDict
+
+
+class _Ring:
+    """Per-key ring of bucket counts"""
+
+    __slots__ = ("counts", "slots", "total", "newest", "last_seen")
+
+    def __init__(self, size):
+        self.counts = [0] * size
+        self.slots = [-1] * size
+        self.total = 0
+        self.newest = -1
+        self.last_seen = 0
+
+
+class SlidingWindowCounter:
+    """Count events per key over a sliding time window.
+
+    The window is split into ``buckets`` equal sub-intervals kept in a small
+    ring per key, so recording an event or reading a count costs O(buckets)
+    regardless of how many events were seen. Keys that have been idle for a
+    whole window are dropped by ``evict_idle``, which keeps memory bounded
+    by the number of currently active keys. ``max_keys`` caps the table by
+    dropping the least recently updated key, and ``on_evict`` is called
+    with every key that is dropped.
+    """
+
+    def __init__(self, window_seconds=60, buckets=12, max_keys=None, on_evict=None):
+        self.window = float(window_seconds)
+        self.buckets = max(1, int(buckets))
+        self.width = self.window / self.buckets
+        self.max_keys = max_keys
+        self.on_evict = on_evict
+        self.evictions = 0
+        self._rings = OrderedDict()
+
+    def _expire(self, ring, current):
+        """Zero every bucket that fell out of the window ending at ``current``"""
+        oldest = current - self.buckets
+        for i, slot in enumerate(ring.slots):
+            if slot <= oldest and ring.counts[i]:
+                ring.total -= ring.counts[i]
+                ring.counts[i] = 0
+
+    def add(self, key, timestamp, amount=1):
+        """Record ``amount`` events for ``key`` at ``timestamp``.
+
+        Returns the key's count within the window after the update. Events
+        older than the window relative to the newest one seen are ignored.
+        """
+        current = int(timestamp // self.width)
+        ring = self._rings.get(key)
+        if ring is None:
+            ring = self._rings[key] = _Ring(self.buckets)
+            if self.max_keys and len(self._rings) > self.max_keys:
+                old_key, _ = self._rings.popitem(last=False)
+                self.evictions += 1
+                if self.on_evict:
+                    self.on_evict(old_key)
+        else:
+            self._rings.move_to_end(key)
+
+        if current <= ring.newest - self.buckets:
+            return ring.total
+
+        if current > ring.newest:
+            ring.newest = current
+            self._expire(ring, current)
+
+        i = current % self.buckets
+        if ring.slots[i] != current:
+            ring.total -= ring.counts[i]
+            ring.counts[i] = 0
+            ring.slots[i] = current
+        ring.counts[i] += amount
+        ring.total += amount
+        ring.last_seen = max(ring.last_seen, timestamp)
+        return ring.total
+
+    def count(self, key, now):
+        """Number of events recorded for ``key`` within the window ending at ``now``"""
+        ring = self._rings.get(key)
+        if ring is None:
+            return 0
+        self._expire(ring, int(now // self.width))
+        return ring.total
+
+    def evict_idle(self, now):
+        """Drop keys with no events inside the window; returns the evicted keys"""
+        cutoff = now - self.window
+        evicted = []
+        while self._rings:
+            key, ring = next(iter(self._rings.items()))
+            if ring.last_seen > cutoff:
+                break
+            del self._rings[key]
+            evicted.append(key)
+            if self.on_evict:
+                self.on_evict(key)
+        self.evictions += len(evicted)
+        return evicted
+
+    def clear(self):
+        self._rings.clear()
+
+    def __contains__(self, key):
+        return key in self._rings
+
+    def __len__(self):
+        return len(self._rings)
+
+    def __iter__(self):
+        return iter(list(self._rings))
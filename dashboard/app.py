@@ -1,4 +1,6 @@
 import os
+import atexit
+import glob
 import subprocess
 import sys
 import time
@@ -6,13 +8,19 @@ import requests
 import json
 import threading
 from datetime import datetime, timedelta
-from flask import Flask, render_template, request, jsonify, send_file
+from flask import Flask, Response, render_template, request, jsonify, send_file, stream_with_context
 from flask_cors import CORS
-from collections import Counter, defaultdict
 import sqlite3
 import hashlib
 import secrets
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.geoip import GeoIPDatabase, UNKNOWN as UNKNOWN_LOCATION
+from stats_engine import AttackStatsEngine
+from event_stream import EventBroker
+from common.logtail import LogTailer
+from common.bantable import BanTable, USER, IP, KINDS, seed_from_legacy
+
 app = Flask(__name__)
 CORS(app)  # Enable CORS for API access
 
@@ -26,6 +34,19 @@ VALID_CREDS_FILE = os.path.join(DATA_DIR, "valid_creds.txt")
 BLOCKED_FILE = os.path.join(DATA_DIR, "blocked.txt")
 WHITELIST_FILE = os.path.join(DATA_DIR, "whitelist.txt")
 DATABASE_FILE = os.path.join(DATA_DIR, "dashboard.db")
+STATS_SNAPSHOT = os.path.join(DATA_DIR, "stats_snapshot.json")
+BAN_TABLE = os.path.join(DATA_DIR, "bans.tbl")
+# Attacker checkpoints (and their tried-pair filters) that --resume picks up
+SESSION_FILES = os.path.join(DATA_DIR, "cracksim-*.session*")
+
+# Offline GeoIP table shared with the defender
+geo_db = GeoIPDatabase.load_default()
+
+# Shared ban table, the defender keeps it current and manual actions write to it
+ban_table = BanTable.open_writer(
+    BAN_TABLE,
+    seed=lambda table: seed_from_legacy(table, DEFENSE_LOG, BLOCKED_FILE, WHITELIST_FILE)
+)
 
 # Global variables
 attack_speed = 1.0
@@ -46,6 +67,16 @@ real_time_data = {
 notifications = []
 max_notifications = 100
 
+# Push channel for /api/stream
+event_broker = EventBroker()
+
+# Snapshot fields pushed to clients as deltas
+STREAMED_STATS = (
+    "attacks", "success", "fail", "total_last_hour", "most_targeted_email",
+    "most_used_pwd", "most_aggressive_ip", "hourly_attempts", "per_ip"
+)
+last_streamed_stats = {}
+
 # Performance metrics
 performance_metrics = {
     "uptime": time.time(),
@@ -57,6 +88,8 @@ performance_metrics = {
 def init_database():
     """Initialize SQLite database for enhanced data storage"""
     conn = sqlite3.connect(DATABASE_FILE)
+    # WAL lets the dashboard read while the defender's writer commits
+    conn.execute("PRAGMA journal_mode=WAL")
     cursor = conn.cursor()
     
     # Create tables
@@ -133,6 +166,7 @@ def add_notification(message, type="info", title=None):
     if len(notifications) > max_notifications:
         notifications = notifications[:max_notifications]
     
+    event_broker.publish("notification", notification)
     return notification
 
 def update_real_time_metrics():
@@ -169,40 +203,18 @@ def update_real_time_metrics():
     threat_score = max(0, 100 - real_time_data["threats"]["detected"])
     real_time_data["security"]["score"] = int((cpu_score + memory_score + threat_score) / 3)
 
-def count_recent_attacks(hours=1):
-    """Count attacks in the last N hours"""
-    if not os.path.exists(ATTACK_LOG):
-        return 0
-    
-    cutoff_time = time.time() - (hours * 3600)
-    count = 0
-    
-    try:
-        with open(ATTACK_LOG, 'r') as f:
-            for line in f:
-                if line.startswith('#') or ',' not in line:
-                    continue
-                parts = line.strip().split(',')
-                if len(parts) >= 1:
-                    try:
-                        timestamp = int(parts[0])
-                        if timestamp > cutoff_time:
-                            count += 1
-                    except ValueError:
-                        continue
-    except Exception as e:
-        print(f"Error reading attack log: {e}")
-    
-    return count
+def count_recent_attacks():
+    """Count attacks in the last hour"""
+    return stats_engine.snapshot()["total_last_hour"]
 
-def launch_process(script_path, key):
+def launch_process(script_path, key, args=()):
     """Launch a subprocess for attack/defense modules"""
     if processes[key] and processes[key].poll() is None:
         return {"status": "already_running", "message": f"{key} is already running"}
     
     try:
         processes[key] = subprocess.Popen(
-            [sys.executable, script_path],
+            [sys.executable, script_path, *args],
             stdout=subprocess.PIPE, 
             stderr=subprocess.PIPE,
             cwd=os.path.dirname(script_path)
@@ -233,91 +245,21 @@ def stop_process(key):
     else:
         return {"status": "not_running", "message": f"{key} was not running"}
 
-def get_geoip(ip):
-    """Get geolocation information for an IP address"""
-    try:
-        # Use a more reliable GeoIP service
-        response = requests.get(
-            f"http://ip-api.com/json/{ip}?fields=status,country,countryCode,region,city,lat,lon,timezone",
-            timeout=3
-        )
-        data = response.json()
-        
-        if data.get("status") == "success":
-            return {
-                "country": data.get("country", "Unknown"),
-                "city": data.get("city", "Unknown"),
-                "region": data.get("region", "Unknown"),
-                "lat": data.get("lat", 0),
-                "lon": data.get("lon", 0),
-                "timezone": data.get("timezone", "Unknown")
-            }
-    except Exception as e:
-        print(f"GeoIP lookup failed for {ip}: {e}")
-    
+def geo_summary(record):
+    """Shape a GeoIP record the way the dashboard API reports it"""
+    record = record or UNKNOWN_LOCATION
     return {
-        "country": "Unknown",
-        "city": "Unknown", 
-        "region": "Unknown",
-        "lat": 0,
-        "lon": 0,
-        "timezone": "Unknown"
+        "country": record["country"],
+        "city": record["city"],
+        "region": record["region"],
+        "lat": record["lat"],
+        "lon": record["lon"],
+        "timezone": record["timezone"]
     }
 
-def analyze_attack_patterns():
-    """Analyze attack patterns for threat intelligence"""
-    patterns = {
-        "top_sources": Counter(),
-        "attack_types": Counter(),
-        "time_distribution": defaultdict(int),
-        "success_rate": {"total": 0, "successful": 0},
-        "geographic_distribution": Counter()
-    }
-    
-    if not os.path.exists(ATTACK_LOG):
-        return patterns
-    
-    try:
-        with open(ATTACK_LOG, 'r') as f:
-            for line in f:
-                if line.startswith('#') or ',' not in line:
-                    continue
-                
-                parts = line.strip().split(',')
-                if len(parts) >= 5:
-                    timestamp, user, password, ip, status = parts[:5]
-                    
-                    try:
-                        ts = int(timestamp)
-                        hour = datetime.fromtimestamp(ts).hour
-                        
-                        patterns["top_sources"][ip] += 1
-                        patterns["time_distribution"][hour] += 1
-                        patterns["success_rate"]["total"] += 1
-                        
-                        if status == "SUCCESS":
-                            patterns["success_rate"]["successful"] += 1
-                        
-                        # Determine attack type based on password patterns
-                        if password.isdigit():
-                            patterns["attack_types"]["Numeric Brute Force"] += 1
-                        elif password.lower() in ['password', 'admin', '123456']:
-                            patterns["attack_types"]["Common Password"] += 1
-                        elif len(password) > 12:
-                            patterns["attack_types"]["Complex Password"] += 1
-                        else:
-                            patterns["attack_types"]["Dictionary Attack"] += 1
-                        
-                        # Get geographic info (cached to avoid too many API calls)
-                        geo_info = get_geoip(ip)
-                        patterns["geographic_distribution"][geo_info["country"]] += 1
-                        
-                    except ValueError:
-                        continue
-    except Exception as e:
-        print(f"Error analyzing attack patterns: {e}")
-    
-    return patterns
+def get_geoip(ip):
+    """Get geolocation information for an IP address"""
+    return geo_summary(geo_db.lookup(ip))
 
 # Background thread for real-time updates
 def background_updater():
@@ -325,6 +267,7 @@ def background_updater():
     while True:
         try:
             update_real_time_metrics()
+            event_broker.publish("metrics", real_time_data)
             
             # Check for alerts
             if real_time_data["system"]["cpu"] > 90:
@@ -346,6 +289,39 @@ def background_updater():
             print(f"Background updater error: {e}")
             time.sleep(10)
 
+def stream_attacks(attempts, snapshot):
+    """Push new attempts and changed stats fields to stream clients"""
+    event_broker.publish("attack", {"count": len(attempts), "attempts": attempts[-20:]})
+    delta = {key: snapshot[key] for key in STREAMED_STATS if last_streamed_stats.get(key) != snapshot[key]}
+    if delta:
+        last_streamed_stats.update(delta)
+        event_broker.publish("stats", delta)
+
+def watch_defense_log():
+    """Push block/unblock changes from defense_log.csv as they are written"""
+    tailer = LogTailer(DEFENSE_LOG, start_at_end=True)
+    while True:
+        try:
+            for line in tailer.read_lines():
+                parts = line.strip().split(",")
+                if len(parts) == 3 and parts[1] in ("BLOCKED", "UNBLOCKED"):
+                    event_broker.publish("ban", {
+                        "target": parts[0],
+                        "action": parts[1],
+                        "timestamp": parts[2]
+                    })
+        except Exception as e:
+            print(f"Defense log watcher error: {e}")
+        time.sleep(0.5)
+
+# Incremental attack log aggregates behind /stats
+stats_engine = AttackStatsEngine(ATTACK_LOG, STATS_SNAPSHOT, geo_db)
+stats_engine.listeners.append(stream_attacks)
+stats_engine.start()
+atexit.register(stats_engine.save)
+
+threading.Thread(target=watch_defense_log, daemon=True).start()
+
 # Start background thread
 threading.Thread(target=background_updater, daemon=True).start()
 
@@ -400,6 +376,21 @@ def get_real_time_data():
         }
     })
 
+@app.route('/api/stream')
+def event_stream():
+    """Server-Sent Events feed of attacks, bans, notifications and metrics"""
+    cursor = request.headers.get('Last-Event-ID') or request.args.get('lastEventId')
+    try:
+        cursor = int(cursor) if cursor else None
+    except ValueError:
+        cursor = None
+    
+    return Response(
+        stream_with_context(event_broker.stream(cursor)),
+        mimetype='text/event-stream',
+        headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'}
+    )
+
 @app.route('/api/notifications')
 def get_notifications():
     """Get all notifications"""
@@ -428,7 +419,8 @@ def clear_notifications():
 def start_module(module):
     """Start attack or defense module"""
     if module == "attacker":
-        result = launch_process("../offensive/cracksim.py", "attacker")
+        # Pick up where the last stop left off instead of restarting the dictionary
+        result = launch_process("../offensive/cracksim.py", "attacker", ["--resume"])
     elif module == "defender":
         result = launch_process("../defensive/defendmonitor.py", "defender")
     else:
@@ -463,64 +455,6 @@ def get_module_status():
 @app.route('/stats')
 def api_stats():
     """Get comprehensive statistics"""
-    total = success = fail = 0
-    blocked_users = set()
-    recent = []
-    per_user = Counter()
-    per_ip = Counter()
-    per_pwd = Counter()
-    per_hour = defaultdict(int)
-    now = int(time.time())
-    attempts_last_hour = 0
-    
-    # Process attack log
-    if os.path.exists(ATTACK_LOG):
-        with open(ATTACK_LOG) as f:
-            for line in f:
-                if "," not in line or line.startswith('#'):
-                    continue
-                parts = line.strip().split(",")
-                if len(parts) < 5:
-                    continue
-                
-                ts, user, pwd, ip, status = parts
-                try:
-                    ts = int(ts)
-                except ValueError:
-                    continue
-                
-                total += 1
-                per_user[user] += 1
-                per_ip[ip] += 1
-                per_pwd[pwd] += 1
-                per_hour[time.strftime("%H", time.localtime(ts))] += 1
-                
-                if now - ts < 3600:
-                    attempts_last_hour += 1
-                
-                recent.append({
-                    "time": time.strftime("%H:%M:%S", time.localtime(ts)),
-                    "user": user,
-                    "ip": ip,
-                    "pwd": pwd,
-                    "status": status,
-                    "timestamp": ts
-                })
-                
-                if status == "SUCCESS":
-                    success += 1
-                elif status == "FAIL":
-                    fail += 1
-    
-    # Process defense log
-    if os.path.exists(DEFENSE_LOG):
-        with open(DEFENSE_LOG) as f:
-            for line in f:
-                if ",BLOCKED," in line:
-                    blocked_users.add(line.split(",")[0])
-                elif ",UNBLOCKED," in line:
-                    blocked_users.discard(line.split(",")[0])
-    
     # Get email statistics
     try:
         resp = requests.get("http://localhost:8025/api/v2/messages", timeout=2)
@@ -528,81 +462,39 @@ def api_stats():
     except Exception:
         emails_sent = 0
     
-    # Calculate derived statistics
-    most_targeted_email = per_user.most_common(1)[0][0] if per_user else "N/A"
-    most_used_pwd = per_pwd.most_common(1)[0][0] if per_pwd else "N/A"
-    most_aggressive_ip = per_ip.most_common(1)[0][0] if per_ip else "N/A"
+    # Attack log aggregates are maintained in the background
+    stats = dict(stats_engine.snapshot())
+    most_aggressive_ip = stats["most_aggressive_ip"]
     
     # Get geolocation for most aggressive IP
     geo_info = get_geoip(most_aggressive_ip) if most_aggressive_ip != "N/A" else {}
     
-    # Format hourly data
-    per_hour_sorted = [per_hour.get(f"{h:02}", 0) for h in range(24)]
-    
-    # Get attack patterns
-    patterns = analyze_attack_patterns()
-    
-    return jsonify({
-        "attacks": total,
-        "success": success,
-        "fail": fail,
-        "blocked": len(blocked_users),
+    stats.update({
+        "blocked": len(ban_table),
         "emails_sent": emails_sent,
-        "recent": recent[::-1][:20],  # Most recent first, limit to 20
-        "most_targeted_email": most_targeted_email,
-        "most_used_pwd": most_used_pwd,
-        "most_aggressive_ip": most_aggressive_ip,
         "geoip": geo_info,
-        "total_last_hour": attempts_last_hour,
-        "hourly_attempts": per_hour_sorted,
-        "per_ip": per_ip.most_common(10) if per_ip else [["No Data", 1]],
-        "per_user": per_user.most_common(10) if per_user else [["No Data", 1]],
-        "per_pwd": per_pwd.most_common(10) if per_pwd else [["No Data", 1]],
-        "attack_patterns": {
-            "top_sources": patterns["top_sources"].most_common(5),
-            "attack_types": dict(patterns["attack_types"]),
-            "time_distribution": dict(patterns["time_distribution"]),
-            "success_rate": patterns["success_rate"],
-            "geographic_distribution": patterns["geographic_distribution"].most_common(10)
-        },
         "real_time_metrics": real_time_data
     })
+    return jsonify(stats)
 
 @app.route('/api/threat-map')
 def get_threat_map():
     """Get geographic threat data for world map"""
     threats = []
     
-    if os.path.exists(ATTACK_LOG):
-        recent_ips = set()
-        cutoff_time = time.time() - 3600  # Last hour
-        
-        with open(ATTACK_LOG) as f:
-            for line in f:
-                if "," not in line or line.startswith('#'):
-                    continue
-                parts = line.strip().split(",")
-                if len(parts) >= 5:
-                    try:
-                        ts = int(parts[0])
-                        if ts > cutoff_time:
-                            recent_ips.add(parts[3])  # IP address
-                    except ValueError:
-                        continue
-        
-        # Get geolocation for recent IPs
-        for ip in list(recent_ips)[:20]:  # Limit to avoid API rate limits
-            geo_info = get_geoip(ip)
-            if geo_info["lat"] != 0 or geo_info["lon"] != 0:
-                threats.append({
-                    "ip": ip,
-                    "lat": geo_info["lat"],
-                    "lng": geo_info["lon"],
-                    "country": geo_info["country"],
-                    "city": geo_info["city"],
-                    "severity": 1 + (hash(ip) % 3),  # Random severity 1-3
-                    "timestamp": int(time.time())
-                })
+    # Get geolocation for IPs seen in the last hour
+    for ip in stats_engine.active_ips()[:20]:  # Limit the number of map markers
+        geo_info = get_geoip(ip)
+        if geo_info["lat"] != 0 or geo_info["lon"] != 0:
+            threats.append({
+                "ip": ip,
+                "lat": geo_info["lat"],
+                "lng": geo_info["lon"],
+                "country": geo_info["country"],
+                "city": geo_info["city"],
+                "severity": 1 + (hash(ip) % 3),  # Random severity 1-3
+                "timestamp": int(time.time())
+            })
     
     return jsonify({"threats": threats})
 
@@ -659,29 +551,18 @@ def passwords():
 @app.route('/blocked')
 def api_blocked():
     """Get list of blocked users/IPs"""
-    blocked = set()
-    
-    # Check defense log
-    if os.path.exists(DEFENSE_LOG):
-        with open(DEFENSE_LOG) as f:
-            for line in f:
-                if ",BLOCKED," in line:
-                    blocked.add(line.split(",")[0])
-                elif ",UNBLOCKED," in line:
-                    blocked.discard(line.split(",")[0])
-    
-    # Check blocked file
-    if os.path.exists(BLOCKED_FILE):
-        with open(BLOCKED_FILE) as f:
-            for line in f:
-                if line.strip():
-                    blocked.add(line.strip())
-    
-    return jsonify({"blocked": list(blocked), "count": len(blocked)})
-
-@app.route('/whitelist')
-def api_whitelist():
-    """Get list of whitelisted users/IPs"""
+    entries = ban_table.entries()
+    blocked = [key for _, key, _ in entries]
+    details = [{
+        "target": key,
+        "type": KINDS[kind],
+        "expires": None if expires == float('inf') else int(expires)
+    } for kind, key, expires in entries]
+    
+    return jsonify({"blocked": blocked, "details": details, "count": len(blocked)})
+
+def load_whitelist():
+    """Whitelisted users/IPs from whitelist.txt"""
     whitelist = set()
     
     if os.path.exists(WHITELIST_FILE):
@@ -689,7 +570,12 @@ def api_whitelist():
             for line in f:
                 if line.strip():
                     whitelist.add(line.strip())
-    
+    return whitelist
+
+@app.route('/whitelist')
+def api_whitelist():
+    """Get list of whitelisted users/IPs"""
+    whitelist = load_whitelist()
     return jsonify({"whitelist": list(whitelist), "count": len(whitelist)})
 
 @app.route('/unblock')
@@ -699,6 +585,9 @@ def api_unblock():
     if not user:
         return jsonify({"error": "User parameter required"}), 400
     
+    ban_table.unban(USER, user)
+    ban_table.unban(IP, user)
+    
     # Log unblock action
     with open(DEFENSE_LOG, "a") as f:
         f.write(f"{user},UNBLOCKED,{int(time.time())}\n")
@@ -722,6 +611,13 @@ def block_user():
     if not user:
         return jsonify({"error": "User required"}), 400
     
+    # Whitelisted users are never blocked, as everywhere else
+    if user in load_whitelist():
+        return jsonify({"error": f"User {user} is whitelisted"}), 409
+    
+    # Manual blocks are permanent until unblocked
+    ban_table.ban(USER, user)
+    
     # Log block action
     with open(DEFENSE_LOG, "a") as f:
         f.write(f"{user},BLOCKED,{int(time.time())}\n")
@@ -745,6 +641,10 @@ def whitelist_user():
     with open(WHITELIST_FILE, "a") as f:
         f.write(user + "\n")
     
+    # Whitelisting lifts any current ban on the user or IP
+    ban_table.unban(USER, user)
+    ban_table.unban(IP, user)
+    
     add_notification(f"User {user} has been whitelisted", "success", "User Management")
     return jsonify({"status": "whitelisted", "user": user})
 
@@ -845,6 +745,24 @@ def reset_stats():
         with open(DEFENSE_LOG, "w") as f:
             f.write("# Format: username,action,timestamp\n")
         
+        # Drop bans that came from the cleared logs, keeping the ones in blocked.txt
+        # with the expiry they had (the seed alone would make them permanent)
+        expiries = {user: expires for kind, user, expires in ban_table.entries(now=float("-inf"))
+                    if kind == USER}
+        ban_table.clear()
+        seed_from_legacy(ban_table, DEFENSE_LOG, BLOCKED_FILE, WHITELIST_FILE)
+        for _, user, _ in ban_table.entries(now=float("-inf")):
+            if user in expiries:
+                ban_table.ban(USER, user, expiries[user])
+        
+        # The next attacker start begins the dictionary again instead of resuming
+        for path in glob.glob(SESSION_FILES):
+            os.remove(path)
+        
+        stats_engine.reset()
+        last_streamed_stats.clear()
+        event_broker.publish("resync", {"reason": "stats reset"})
+        
         # Clear notifications
         global notifications
         notifications = []
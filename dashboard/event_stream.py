@@ -0,0 +1,80 @@
+import json
+import threading
+import time
+from collections import deque
+
+
+class EventBroker:
+    """In-process fan-out of dashboard events to Server-Sent Events clients.
+
+    Published events get a monotonically increasing id and are kept in a
+    bounded ring, so a client reconnecting with ``Last-Event-ID`` receives
+    exactly what it missed. A client whose cursor has already fallen out of
+    the ring (or predates a server restart) is told to ``resync`` and
+    reload its full state once.
+    """
+
+    def __init__(self, history=1000, keepalive=15):
+        self.keepalive = keepalive
+        self.history = deque(maxlen=history)
+        self.last_id = 0
+        self.clients = 0
+        self.cond = threading.Condition()
+
+    def publish(self, event, data):
+        """Record an event and wake every waiting stream"""
+        with self.cond:
+            self.last_id += 1
+            self.history.append((self.last_id, event, json.dumps(data, default=str)))
+            self.cond.notify_all()
+        return self.last_id
+
+    def _since(self, cursor):
+        """Events newer than cursor, or None if the client must resync"""
+        if cursor > self.last_id:
+            return None
+        if self.history and cursor < self.history[0][0] - 1:
+            return None
+        return [item for item in self.history if item[0] > cursor]
+
+    @staticmethod
+    def format(event_id, event, data):
+        return f"id: {event_id}\nevent: {event}\ndata: {data}\n\n"
+
+    def stream(self, last_event_id=None):
+        """Generator yielding SSE frames, starting after last_event_id"""
+        with self.cond:
+            cursor = self.last_id
+            self.clients += 1
+        try:
+            yield "retry: 3000\n\n"
+            if last_event_id is not None:
+                with self.cond:
+                    pending = self._since(last_event_id)
+                if pending is None:
+                    yield self.format(cursor, "resync", json.dumps({"reason": "cursor expired"}))
+                else:
+                    for item in pending:
+                        yield self.format(*item)
+                        cursor = item[0]
+            else:
+                yield self.format(cursor, "hello", json.dumps({"cursor": cursor, "time": int(time.time())}))
+
+            while True:
+                with self.cond:
+                    if self.last_id <= cursor:
+                        self.cond.wait(self.keepalive)
+                    pending = self._since(cursor)
+                if pending is None:
+                    # Fell behind by more than the ring holds
+                    cursor = self.last_id
+                    yield self.format(cursor, "resync", json.dumps({"reason": "client too slow"}))
+                elif pending:
+                    for item in pending:
+                        yield self.format(*item)
+                    cursor = pending[-1][0]
+                else:
+                    yield ": keepalive\n\n"
+        finally:
+            with self.cond:
+                self.clients -= 1
@@ -14,8 +14,8 @@ class CyberSecurityDashboard {
       severity: 'all',
       status: 'all'
     };
-    this.websocket = null;
-    this.updateInterval = null;
+    this.eventSource = null;
+    this.lastEventId = null;
     this.animationFrameId = null;
     
     this.init();
@@ -47,49 +47,45 @@ class CyberSecurityDashboard {
   // ==================== REAL-TIME DATA MANAGEMENT ====================
   
   async startRealTimeUpdates() {
-    // Simulate WebSocket connection for real-time data
-    this.websocket = {
-      connected: true,
-      send: (data) => console.log('📡 Sending:', data),
-      close: () => console.log('🔌 WebSocket closed')
+    // Server-Sent Events: the server pushes changes as they happen
+    if (this.eventSource) return;
+
+    const url = this.lastEventId
+      ? `/api/stream?lastEventId=${encodeURIComponent(this.lastEventId)}`
+      : '/api/stream';
+    this.eventSource = new EventSource(url);
+
+    const on = (event, handler) => {
+      this.eventSource.addEventListener(event, (e) => {
+        if (e.lastEventId) this.lastEventId = e.lastEventId;
+        handler(JSON.parse(e.data));
+      });
     };
 
-    // Update data every 5 seconds
-    this.updateInterval = setInterval(() => {
-      this.updateRealTimeData();
-    }, 5000);
+    on('metrics', (data) => this.updateRealTimeData(data));
+    on('stats', (delta) => this.updateStats(delta));
+    on('attack', (batch) => this.addAttackRows(batch.attempts));
+    on('ban', (ban) => this.handleBanEvent(ban));
+    on('notification', (n) => this.showNotification(n.message, n.type, n.title));
+    on('resync', () => this.loadInitialData());
+    on('hello', () => console.log('📡 Event stream connected'));
+
+    this.eventSource.onerror = () => {
+      // EventSource reconnects on its own and resends Last-Event-ID
+      console.warn('🔌 Event stream interrupted, reconnecting...');
+    };
+  }
 
-    // Initial data load
-    this.updateRealTimeData();
+  stopRealTimeUpdates() {
+    if (this.eventSource) {
+      this.eventSource.close();
+      this.eventSource = null;
+    }
   }
 
-  updateRealTimeData() {
+  updateRealTimeData(newData) {
+    if (!newData) return;
     const timestamp = new Date().toISOString();
-    
-    // Generate realistic cybersecurity metrics
-    const newData = {
-      timestamp,
-      threats: {
-        blocked: Math.floor(Math.random() * 50) + 150,
-        detected: Math.floor(Math.random() * 30) + 80,
-        quarantined: Math.floor(Math.random() * 20) + 45
-      },
-      network: {
-        bandwidth: Math.floor(Math.random() * 100) + 200,
-        connections: Math.floor(Math.random() * 500) + 1200,
-        latency: Math.floor(Math.random() * 50) + 10
-      },
-      system: {
-        cpu: Math.floor(Math.random() * 40) + 30,
-        memory: Math.floor(Math.random() * 30) + 50,
-        disk: Math.floor(Math.random() * 20) + 60
-      },
-      security: {
-        score: Math.floor(Math.random() * 20) + 80,
-        vulnerabilities: Math.floor(Math.random() * 10) + 5,
-        patches: Math.floor(Math.random() * 5) + 15
-      }
-    };
 
     this.realTimeData.set(timestamp, newData);
     this.updateDashboardElements(newData);
@@ -97,6 +93,71 @@ class CyberSecurityDashboard {
     this.checkAlerts(newData);
   }
 
+  updateStats(stats) {
+    const fields = {
+      'stat-attacks': stats.attacks,
+      'stat-success': stats.success,
+      'stat-blocked': stats.blocked,
+      'stat-emails': stats.emails_sent,
+      'stat-last-hour': stats.total_last_hour
+    };
+    Object.entries(fields).forEach(([id, value]) => {
+      if (value !== undefined) this.animateValue(id, value, 300);
+    });
+
+    const labels = {
+      'stat-most-email': stats.most_targeted_email,
+      'stat-most-pwd': stats.most_used_pwd,
+      'stat-most-ip': stats.most_aggressive_ip
+    };
+    Object.entries(labels).forEach(([id, value]) => {
+      const element = document.getElementById(id);
+      if (element && value !== undefined) element.textContent = value;
+    });
+
+    if (stats.geoip && stats.geoip.country) {
+      const geo = document.getElementById('stat-most-ip-geo');
+      if (geo) geo.textContent = `${stats.geoip.country}, ${stats.geoip.city}`;
+    }
+  }
+
+  addAttackRows(attempts, replace = false) {
+    const tbody = document.getElementById('attack-table');
+    if (!tbody || !attempts) return;
+    if (replace) tbody.innerHTML = '';
+
+    // Newest first, keep the table at 20 rows
+    attempts.slice().reverse().forEach((row) => {
+      const tr = document.createElement('tr');
+      [row.time, row.user, row.ip, row.pwd || '', row.status].forEach((value) => {
+        const td = document.createElement('td');
+        td.textContent = value;
+        tr.appendChild(td);
+      });
+      tbody.insertBefore(tr, tbody.firstChild);
+    });
+    while (tbody.children.length > 20) {
+      tbody.removeChild(tbody.lastChild);
+    }
+  }
+
+  handleBanEvent(ban) {
+    const list = document.getElementById('blocked-list');
+    if (!list) return;
+
+    const existing = Array.from(list.children).find((li) => li.dataset.target === ban.target);
+    if (ban.action === 'UNBLOCKED') {
+      if (existing) existing.remove();
+    } else if (!existing) {
+      const li = document.createElement('li');
+      li.dataset.target = ban.target;
+      li.textContent = ban.target;
+      list.appendChild(li);
+    }
+    const counter = document.getElementById('stat-blocked');
+    if (counter) counter.textContent = list.children.length.toLocaleString();
+  }
+
   updateDashboardElements(data) {
     // Update stat cards with smooth animations
     this.animateValue('threats-blocked', data.threats.blocked);
@@ -1188,8 +1249,7 @@ class CyberSecurityDashboard {
 
   refreshDashboard() {
     this.showNotification('Refreshing dashboard...', 'info');
-    this.updateRealTimeData();
-    this.showNotification('Dashboard refreshed', 'success');
+    this.loadInitialData();
   }
 
   toggleSettings() {
@@ -1366,13 +1426,27 @@ class CyberSecurityDashboard {
   // ==================== UTILITY METHODS ====================
   
   async loadInitialData() {
-    // Simulate loading initial data
-    return new Promise((resolve) => {
-      setTimeout(() => {
-        this.showNotification('Initial data loaded', 'success');
-        resolve();
-      }, 1000);
-    });
+    // One full load; everything after this arrives over the event stream
+    try {
+      const [stats, realTime, blocked] = await Promise.all([
+        fetch('/stats').then((r) => r.json()),
+        fetch('/api/real-time-data').then((r) => r.json()),
+        fetch('/blocked').then((r) => r.json())
+      ]);
+
+      this.updateStats(stats);
+      this.addAttackRows((stats.recent || []).slice().reverse(), true);
+      this.updateRealTimeData(realTime.data);
+
+      const list = document.getElementById('blocked-list');
+      if (list) {
+        list.innerHTML = '';
+        blocked.blocked.forEach((target) => this.handleBanEvent({ target, action: 'BLOCKED' }));
+      }
+      this.showNotification('Initial data loaded', 'success');
+    } catch (error) {
+      console.error('❌ Initial data load failed:', error);
+    }
   }
 
   setupEventListeners() {
@@ -1406,27 +1480,17 @@ class CyberSecurityDashboard {
   }
 
   pauseUpdates() {
-    if (this.updateInterval) {
-      clearInterval(this.updateInterval);
-      this.updateInterval = null;
-    }
+    this.stopRealTimeUpdates();
   }
 
   resumeUpdates() {
-    if (!this.updateInterval) {
-      this.startRealTimeUpdates();
-    }
+    // Reconnect with our cursor so nothing missed while hidden is lost
+    this.startRealTimeUpdates();
   }
 
   cleanup() {
-    // Clean up intervals and connections
-    if (this.updateInterval) {
-      clearInterval(this.updateInterval);
-    }
-    
-    if (this.websocket && this.websocket.close) {
-      this.websocket.close();
-    }
+    // Clean up connections
+    this.stopRealTimeUpdates();
     
     if (this.animationFrameId) {
       cancelAnimationFrame(this.animationFrameId);
@@ -1460,13 +1524,8 @@ class CyberSecurityDashboard {
   }
 
   setUpdateInterval(interval) {
-    if (this.updateInterval) {
-      clearInterval(this.updateInterval);
-    }
-    
-    this.updateInterval = setInterval(() => {
-      this.updateRealTimeData();
-    }, interval);
+    // Updates are pushed by the server over /api/stream; nothing to poll
+    console.log(`Update interval ${interval}ms ignored, using event stream`);
   }
 }
 
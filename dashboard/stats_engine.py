@@ -0,0 +1,321 @@
+import json
+import os
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from datetime import datetime
+
+from common.logtail import LogTailer
+
+SNAPSHOT_VERSION = 1
+
+
+def classify_password(password):
+    """Attack type heuristic used by the attack pattern breakdown"""
+    if password.isdigit():
+        return "Numeric Brute Force"
+    elif password.lower() in ['password', 'admin', '123456']:
+        return "Common Password"
+    elif len(password) > 12:
+        return "Complex Password"
+    return "Dictionary Attack"
+
+
+class TopCounts:
+    """The n largest counts of a Counter whose counts only ever grow.
+
+    Updated on every increment instead of sorting the whole Counter: a
+    key can only enter the top n by overtaking the smallest count in it,
+    so most increments cost a single comparison.
+    """
+
+    def __init__(self, n=10, counter=None):
+        self.n = n
+        self.top = dict(counter.most_common(n)) if counter else {}
+        self._floor = min(self.top.values()) if len(self.top) >= n else 0
+
+    def update(self, key, count):
+        top = self.top
+        if key in top:
+            top[key] = count
+        elif len(top) < self.n:
+            top[key] = count
+        elif count > self._floor:
+            del top[min(top, key=top.get)]
+            top[key] = count
+        else:
+            return
+        if len(top) >= self.n:
+            self._floor = min(top.values())
+
+    def most_common(self, n=None):
+        return sorted(self.top.items(), key=lambda item: item[1], reverse=True)[:n]
+
+    def __bool__(self):
+        return bool(self.top)
+
+
+class AttackStatsEngine:
+    """Incrementally maintained aggregates over attack_log.csv.
+
+    A background thread tails the log once and folds each new line into
+    counters, hourly buckets, a per-minute ring covering the last hour and
+    a short ring of recent attempts. A ready-made snapshot is rebuilt after
+    each batch of new lines, so readers such as ``/stats`` only copy a
+    dict. State and the tail position are persisted so a restarted
+    dashboard resumes where it left off instead of re-reading the log.
+    Callables in ``listeners`` receive each batch of new attempts together
+    with the snapshot that includes them.
+    """
+
+    def __init__(self, log_path, snapshot_path, geo_db, poll_interval=0.5,
+                 persist_interval=30, recent_size=20, recent_ip_limit=10000):
+        self.log_path = log_path
+        self.snapshot_path = snapshot_path
+        self.geo_db = geo_db
+        self.poll_interval = poll_interval
+        self.persist_interval = persist_interval
+        self.recent_size = recent_size
+        self.recent_ip_limit = recent_ip_limit
+        self.lock = threading.RLock()
+        self.listeners = []
+        self._minute_cutoff = 0
+        self._last_persist = time.time()
+        self._clear()
+        self.tailer = LogTailer(log_path, on_reset=self._clear)
+        self._load()
+        self._publish()
+
+    def _clear(self):
+        self.total = 0
+        self.success = 0
+        self.fail = 0
+        self.per_user = Counter()
+        self.per_ip = Counter()
+        self.per_pwd = Counter()
+        self._track_top()
+        self.per_country = Counter()
+        self.attack_types = Counter()
+        self.hourly = [0] * 24
+        self.minutes = OrderedDict()
+        self.recent = deque(maxlen=self.recent_size)
+        self.recent_ips = OrderedDict()
+        self._dirty = True
+
+    def _track_top(self):
+        self.top_users = TopCounts(10, self.per_user)
+        self.top_ips = TopCounts(10, self.per_ip)
+        self.top_pwds = TopCounts(10, self.per_pwd)
+
+    # ---------- ingestion ----------
+
+    def ingest(self, line):
+        """Fold one log line into the aggregates; returns the parsed attempt"""
+        if "," not in line or line.startswith('#'):
+            return None
+        parts = line.strip().split(",")
+        if len(parts) != 5:
+            return None
+        ts, user, pwd, ip, status = parts
+        try:
+            ts = int(ts)
+        except ValueError:
+            return None
+
+        local = time.localtime(ts)
+        self.total += 1
+        self.per_user[user] += 1
+        self.per_ip[ip] += 1
+        self.per_pwd[pwd] += 1
+        self.top_users.update(user, self.per_user[user])
+        self.top_ips.update(ip, self.per_ip[ip])
+        self.top_pwds.update(pwd, self.per_pwd[pwd])
+        self.hourly[local.tm_hour] += 1
+        self.attack_types[classify_password(pwd)] += 1
+        record = self.geo_db.lookup(ip)
+        self.per_country[record["country"] if record else "Unknown"] += 1
+
+        # Only attempts from the last hour feed the rolling views
+        minute = ts // 60
+        if minute > self._minute_cutoff:
+            self.minutes[minute] = self.minutes.get(minute, 0) + 1
+            self.recent_ips[ip] = ts
+            self.recent_ips.move_to_end(ip)
+            if len(self.recent_ips) > self.recent_ip_limit:
+                self.recent_ips.popitem(last=False)
+
+        if status == "SUCCESS":
+            self.success += 1
+        elif status == "FAIL":
+            self.fail += 1
+
+        attempt = {
+            "time": time.strftime("%H:%M:%S", local),
+            "user": user,
+            "ip": ip,
+            "pwd": pwd,
+            "status": status,
+            "timestamp": ts
+        }
+        self.recent.append(attempt)
+        self._dirty = True
+        return attempt
+
+    def poll(self):
+        """Ingest whatever was appended since the last poll"""
+        new_attempts = []
+        with self.lock:
+            self._minute_cutoff = int(time.time()) // 60 - 60
+            for line in self.tailer.read_lines():
+                attempt = self.ingest(line)
+                if attempt:
+                    new_attempts.append(attempt)
+                    # Keep the published view moving during a long catch-up
+                    if len(new_attempts) % 100000 == 0:
+                        self._publish()
+            self._prune(time.time())
+            if self._dirty:
+                self._publish()
+        if new_attempts:
+            for listener in self.listeners:
+                listener(new_attempts, self._snapshot)
+        return new_attempts
+
+    def _prune(self, now):
+        cutoff_minute = int(now) // 60 - 60
+        for minute in [minute for minute in self.minutes if minute <= cutoff_minute]:
+            del self.minutes[minute]
+            self._dirty = True
+        cutoff = now - 3600
+        while self.recent_ips and next(iter(self.recent_ips.values())) <= cutoff:
+            self.recent_ips.popitem(last=False)
+
+    def reset(self):
+        """Drop all aggregates after the log was reset"""
+        with self.lock:
+            self._clear()
+            self.tailer.rewind()
+            self._publish()
+
+    # ---------- reading ----------
+
+    def last_hour_count(self):
+        return sum(self.minutes.values())
+
+    def _publish(self):
+        """Swap in a fresh snapshot; readers never wait on ingestion"""
+        self._snapshot = self._build_snapshot()
+        self._active_ips = list(self.recent_ips)[-50:][::-1]
+        self._dirty = False
+
+    def active_ips(self):
+        """Most recent source IPs seen within the last hour, newest first"""
+        return self._active_ips
+
+    def _build_snapshot(self):
+        return {
+            "attacks": self.total,
+            "success": self.success,
+            "fail": self.fail,
+            "recent": list(self.recent)[::-1],
+            "most_targeted_email": self.top_users.most_common(1)[0][0] if self.top_users else "N/A",
+            "most_used_pwd": self.top_pwds.most_common(1)[0][0] if self.top_pwds else "N/A",
+            "most_aggressive_ip": self.top_ips.most_common(1)[0][0] if self.top_ips else "N/A",
+            "total_last_hour": self.last_hour_count(),
+            "hourly_attempts": list(self.hourly),
+            "per_ip": self.top_ips.most_common(10) if self.top_ips else [["No Data", 1]],
+            "per_user": self.top_users.most_common(10) if self.top_users else [["No Data", 1]],
+            "per_pwd": self.top_pwds.most_common(10) if self.top_pwds else [["No Data", 1]],
+            "attack_patterns": {
+                "top_sources": self.top_ips.most_common(5),
+                "attack_types": dict(self.attack_types),
+                "time_distribution": {hour: count for hour, count in enumerate(self.hourly) if count},
+                "success_rate": {"total": self.total, "successful": self.success},
+                "geographic_distribution": self.per_country.most_common(10)
+            }
+        }
+
+    def snapshot(self):
+        """Latest aggregate snapshot; cheap regardless of log size"""
+        return self._snapshot
+
+    # ---------- persistence ----------
+
+    def save(self):
+        """Persist aggregates and tail position so restarts are warm"""
+        with self.lock:
+            offset, inode = self.tailer.position()
+            state = {
+                "version": SNAPSHOT_VERSION,
+                "saved_at": datetime.now().isoformat(),
+                "offset": offset,
+                "inode": inode,
+                "total": self.total,
+                "success": self.success,
+                "fail": self.fail,
+                "per_user": self.per_user,
+                "per_ip": self.per_ip,
+                "per_pwd": self.per_pwd,
+                "per_country": self.per_country,
+                "attack_types": self.attack_types,
+                "hourly": self.hourly,
+                "minutes": list(self.minutes.items()),
+                "recent": list(self.recent),
+                "recent_ips": list(self.recent_ips.items())
+            }
+        tmp_path = self.snapshot_path + ".tmp"
+        try:
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.snapshot_path)
+        except OSError as e:
+            print(f"[STATS] Error saving snapshot: {e}")
+        self._last_persist = time.time()
+
+    def _load(self):
+        if not os.path.exists(self.snapshot_path):
+            return
+        try:
+            with open(self.snapshot_path) as f:
+                state = json.load(f)
+            st = os.stat(self.log_path)
+        except (OSError, ValueError) as e:
+            print(f"[STATS] Ignoring snapshot: {e}")
+            return
+        # Only trust the snapshot if it describes the same, not truncated, file
+        if state.get("version") != SNAPSHOT_VERSION or state.get("inode") != st.st_ino \
+                or state.get("offset", 0) > st.st_size:
+            return
+
+        self.total = state["total"]
+        self.success = state["success"]
+        self.fail = state["fail"]
+        self.per_user = Counter(state["per_user"])
+        self.per_ip = Counter(state["per_ip"])
+        self.per_pwd = Counter(state["per_pwd"])
+        self._track_top()
+        self.per_country = Counter(state["per_country"])
+        self.attack_types = Counter(state["attack_types"])
+        self.hourly = state["hourly"]
+        self.minutes = OrderedDict((int(minute), count) for minute, count in state["minutes"])
+        self.recent.extend(state["recent"])
+        self.recent_ips = OrderedDict(state["recent_ips"])
+        self.tailer = LogTailer(self.log_path, on_reset=self._clear,
+                                offset=state["offset"], inode=state["inode"])
+        print(f"[STATS] Resumed from snapshot at offset {state['offset']}")
+
+    # ---------- background loop ----------
+
+    def run(self):
+        while True:
+            try:
+                self.poll()
+                if time.time() - self._last_persist >= self.persist_interval:
+                    self.save()
+            except Exception as e:
+                print(f"[STATS] Error updating aggregates: {e}")
+            time.sleep(self.poll_interval)
+
+    def start(self):
+        threading.Thread(target=self.run, name="stats-engine", daemon=True).start()
+        return self
@@ -1,17 +1,26 @@
 import time
 import os
-import smtplib
 import json
 import sqlite3
 import threading
 import hashlib
-import requests
 from datetime import datetime, timedelta
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
-from collections import defaultdict, Counter
-import ipaddress
-import re
+from collections import defaultdict, deque, Counter, OrderedDict
+import signal
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.logtail import LogTailer
+from common.window import SlidingWindowCounter
+from common.sqlite_writer import BatchedSQLiteWriter, enable_wal
+from common.mailer import MailOutbox
+from common.geoip import GeoIPDatabase
+from common.bantable import BanTable, USER, IP, seed_from_legacy
+from common.cidrindex import CIDRIndex
+from common.feeds import ThreatFeedLoader
+from common.filewatch import FileWatcher
 
 # Configuration
 LOG_FILE = "../data/attack_log.csv"
@@ -20,18 +29,36 @@ BLOCKED_FILE = "../data/blocked.txt"
 WHITELIST_FILE = "../data/whitelist.txt"
 DATABASE_FILE = "../data/dashboard.db"
 CONFIG_FILE = "../data/defense_config.json"
+BAN_TABLE = "../data/bans.tbl"
 
 # Enhanced thresholds and settings
 DEFAULT_CONFIG = {
     "ban_threshold": 5,
+    "failure_window": 60,  # ban_threshold failures within this many seconds
+    "window_buckets": 12,
+    "recent_attempts_kept": 50,
+    "max_tracked_keys": 100000,
+    "db_queue_size": 10000,
+    "db_batch_size": 500,
+    "db_flush_interval": 0.5,
+    "notification_digest_window": 30,  # seconds to coalesce non-critical emails
+    "notification_max_pending": 1000,
     "unblock_time": 2 * 60,  # 2 minutes
-    "monitoring_interval": 5,
+    "ban_table_capacity": 16384,
+    "monitoring_interval": 5,  # housekeeping period, and the longest idle wait
+    "event_driven": True,  # wake as soon as the attack log is written
+    "event_debounce": 0.01,  # seconds of quiet that end a burst of writes
+    "event_max_latency": 0.05,  # never hold a burst back longer than this
+    "event_poll_interval": 0.1,  # stat() period where inotify is unavailable
     "email_notifications": True,
     "adaptive_thresholds": True,
     "geo_blocking": False,
     "honeypot_detection": True,
     "rate_limiting": True,
+    "rate_limit_block": 300,  # seconds an IP stays rate limited after exceeding the limit
     "threat_intelligence": True,
+    "threat_feeds": ["../data/threat_intelligence.json", "../data/threat_feeds"],  # files or directories of feeds
+    "threat_feed_check_interval": 30,  # seconds between feed mtime checks
     "auto_whitelist_trusted": True,
     "escalation_levels": {
         "low": {"threshold": 3, "action": "log"},
@@ -53,44 +80,59 @@ DEFAULT_CONFIG = {
 class ThreatIntelligence:
     """Advanced threat intelligence and pattern recognition"""
     
-    def __init__(self):
-        self.known_bad_ips = set()
-        self.suspicious_patterns = []
+    def __init__(self, config=None):
+        config = config or DEFAULT_CONFIG
         self.attack_signatures = {}
+        self.feeds = ThreatFeedLoader(
+            config.get('threat_feeds', DEFAULT_CONFIG['threat_feeds']),
+            config.get('threat_feed_check_interval', 30)
+        )
         self.load_threat_feeds()
     
     def load_threat_feeds(self):
         """Load threat intelligence from various sources"""
         try:
-            # Load local threat intelligence
-            threat_file = "../data/threat_intelligence.json"
-            if os.path.exists(threat_file):
-                with open(threat_file, 'r') as f:
-                    data = json.load(f)
-                    self.known_bad_ips.update(data.get('bad_ips', []))
-                    self.suspicious_patterns.extend(data.get('patterns', []))
+            self.feeds.reload(force=True)
         except Exception as e:
             print(f"[THREAT_INTEL] Error loading threat feeds: {e}")
     
+    def start(self):
+        """Pick up feed changes in the background from now on"""
+        self.feeds.start()
+    
+    def close(self):
+        self.feeds.close()
+    
+    @property
+    def known_bad_ips(self):
+        return self.feeds.indexes.bad_ips
+    
+    @property
+    def suspicious_patterns(self):
+        return self.feeds.indexes.patterns
+    
     def is_known_bad_ip(self, ip):
-        """Check if IP is in known bad IP list"""
-        return ip in self.known_bad_ips
+        """Check if IP is a known bad address or inside a known bad range"""
+        return ip in self.feeds.indexes.bad_networks
     
     def analyze_attack_pattern(self, user, password, ip):
         """Analyze attack patterns for threat classification"""
         threat_score = 0
         indicators = []
         
-        # Check for suspicious patterns in username/password
-        for pattern in self.suspicious_patterns:
-            if re.search(pattern, user, re.IGNORECASE) or re.search(pattern, password, re.IGNORECASE):
-                threat_score += 10
-                indicators.append(f"Suspicious pattern detected: {pattern}")
+        # One consistent set of indexes even if the feeds are swapped meanwhile
+        indexes = self.feeds.indexes
+        
+        # Check for suspicious patterns in username/password, all in one scan each
+        for pattern in indexes.pattern_matcher.matches(user, password):
+            threat_score += 10
+            indicators.append(f"Suspicious pattern detected: {pattern}")
         
         # Check for known bad IP
-        if self.is_known_bad_ip(ip):
+        bad_network = indexes.bad_networks.lookup(ip)
+        if bad_network:
             threat_score += 20
-            indicators.append("Known malicious IP")
+            indicators.append(f"Known malicious IP ({bad_network[0]} from {bad_network[1]})")
         
         # Check for common attack patterns
         if user.lower() in ['admin', 'root', 'administrator']:
@@ -123,30 +165,12 @@ class GeoIPAnalyzer:
     
     def __init__(self, config):
         self.config = config
-        self.geo_cache = {}
+        self.geo_db = GeoIPDatabase.load_default()
         self.blocked_countries = set(config.get('blocked_countries', []))
     
     def get_country(self, ip):
-        """Get country for IP address with caching"""
-        if ip in self.geo_cache:
-            return self.geo_cache[ip]
-        
-        try:
-            response = requests.get(
-                f"http://ip-api.com/json/{ip}?fields=status,country,countryCode",
-                timeout=3
-            )
-            data = response.json()
-            
-            if data.get("status") == "success":
-                country = data.get("countryCode", "Unknown")
-                self.geo_cache[ip] = country
-                return country
-        except Exception as e:
-            print(f"[GEO] Error getting country for {ip}: {e}")
-        
-        self.geo_cache[ip] = "Unknown"
-        return "Unknown"
+        """Get country for IP address from the offline range table"""
+        return self.geo_db.country_code(ip)
     
     def is_blocked_country(self, ip):
         """Check if IP is from a blocked country"""
@@ -157,50 +181,277 @@ class GeoIPAnalyzer:
         return country in self.blocked_countries
 
 class RateLimiter:
-    """Advanced rate limiting with sliding window"""
+    """Per-IP rate limiting with the generic cell rate algorithm (GCRA).
+
+    Each key keeps a "theoretical arrival time": a request is allowed
+    while it is at most ``window - window / max_requests`` seconds ahead
+    of now, and every allowed request pushes it on by
+    ``window / max_requests``. That admits ``max_requests`` in a burst,
+    then one more per interval, with an O(1) check. Exceeding the limit
+    blocks the key until ``block_seconds`` from then; requests during
+    the block are refused without extending it, and the first one after
+    it starts from a full allowance again, as the old window did. A key
+    whose arrival time and block have both passed is indistinguishable
+    from a new one, so ``evict_idle`` can drop it, and ``max_keys`` drops
+    the least recently seen keys first.
+    """
     
-    def __init__(self):
-        self.requests = defaultdict(list)
-        self.blocked_until = {}
+    def __init__(self, max_keys=None, block_seconds=300):
+        self.max_keys = max_keys
+        self.block_seconds = block_seconds
+        # ip -> (theoretical arrival time, blocked until or 0)
+        self.tat = OrderedDict()
+        self.checks = 0
+        self.hits = 0
+        self.evictions = 0
     
-    def is_rate_limited(self, ip, max_requests=10, window_seconds=60):
-        """Check if IP is rate limited"""
-        now = time.time()
+    def is_rate_limited(self, ip, max_requests=10, window_seconds=60, now=None):
+        """Check if IP is rate limited, counting this call as a request if it is not"""
+        now = time.time() if now is None else now
+        self.checks += 1
+        interval = window_seconds / max_requests
+        tolerance = window_seconds - interval
         
-        # Check if IP is currently blocked
-        if ip in self.blocked_until and now < self.blocked_until[ip]:
-            return True
-        
-        # Clean old requests
-        cutoff = now - window_seconds
-        self.requests[ip] = [req_time for req_time in self.requests[ip] if req_time > cutoff]
+        state = self.tat.get(ip)
+        if state is None:
+            tat = now
+            if self.max_keys and len(self.tat) >= self.max_keys:
+                self.tat.popitem(last=False)
+                self.evictions += 1
+        else:
+            self.tat.move_to_end(ip)
+            tat, blocked_until = state
+            if blocked_until:
+                if now < blocked_until:
+                    self.hits += 1
+                    return True
+                tat = now
+            tat = max(tat, now)
         
-        # Check rate limit
-        if len(self.requests[ip]) >= max_requests:
-            # Block for 5 minutes
-            self.blocked_until[ip] = now + 300
+        if tat - now > tolerance:
+            self.tat[ip] = (tat, now + self.block_seconds)
+            self.hits += 1
             return True
         
-        # Add current request
-        self.requests[ip].append(now)
+        self.tat[ip] = (tat + interval, 0)
         return False
+    
+    def evict_idle(self, now, budget=10000):
+        """Forget keys whose allowance is full again; returns how many.
+        
+        Keys are kept in order of last request, not of arrival time, so
+        up to ``budget`` keys from the least recently seen end are
+        examined per call and the ones still limited move to the back
+        (a long block must not shield the idle keys behind it).
+        """
+        evicted = 0
+        for _ in range(min(budget, len(self.tat))):
+            ip, (tat, blocked_until) = next(iter(self.tat.items()))
+            if tat > now or blocked_until > now:
+                self.tat.move_to_end(ip)
+            else:
+                del self.tat[ip]
+                evicted += 1
+        self.evictions += evicted
+        return evicted
+    
+    def __len__(self):
+        return len(self.tat)
+    
+    def stats(self):
+        return {"keys": len(self.tat), "checks": self.checks, "hits": self.hits, "evictions": self.evictions}
+
+def build_alert_email(to_addr, subject, body, priority="normal", threat_data=None, timestamp=None):
+    """Compose a CrackDefend alert email with threat intelligence"""
+    msg = MIMEMultipart()
+    msg['Subject'] = f"[CrackDefend] {subject}"
+    msg['From'] = 'defense@crackdefend.local'
+    msg['To'] = to_addr
+    msg['X-Priority'] = '1' if priority == "high" else '3'
+    
+    # Create enhanced email body
+    enhanced_body = f"""
+CrackDefend Security Alert
+========================
+
+{body}
+
+Timestamp: {datetime.fromtimestamp(timestamp or time.time()).strftime('%Y-%m-%d %H:%M:%S')}
+Priority: {priority.upper()}
+
+"""
+    
+    if threat_data:
+        enhanced_body += f"""
+Threat Analysis:
+- Threat Score: {threat_data.get('threat_score', 'N/A')}
+- Classification: {threat_data.get('classification', 'N/A')}
+- Indicators: {', '.join(threat_data.get('indicators', []))}
+
+"""
+    
+    enhanced_body += """
+This is an automated message from CrackDefend Defense Monitor.
+For more information, check the dashboard at http://localhost:5000
+
+Best regards,
+CrackDefend Security Team
+"""
+    
+    msg.attach(MIMEText(enhanced_body, 'plain'))
+    return msg
+
+class NotificationPipeline:
+    """Off-thread email delivery with per-recipient digests"""
+    
+    def __init__(self, config):
+        self.digest_window = config.get('notification_digest_window', 30)
+        self.max_pending = config.get('notification_max_pending', 1000)
+        # Separate pooled sessions so urgent mail never waits behind digests
+        self.urgent = MailOutbox('localhost', 1025, timeout=5, name="urgent-mail")
+        self.digest = MailOutbox('localhost', 1025, timeout=5, name="digest-mail")
+        self.pending = defaultdict(list)
+        self.counters = {"queued": 0, "urgent": 0, "digests": 0, "coalesced": 0, "dropped": 0}
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = True
+        self.thread = threading.Thread(target=self.digest_loop, name="digest-flusher", daemon=True)
+        self.thread.start()
+    
+    def notify(self, to_addr, subject, body, priority="normal", threat_data=None, immediate=False):
+        """Send immediately or hold for the recipient's next digest"""
+        if immediate:
+            self.urgent.send(build_alert_email(to_addr, subject, body, priority, threat_data))
+            self.counters["urgent"] += 1
+            return
+        
+        with self.lock:
+            if len(self.pending[to_addr]) >= self.max_pending:
+                self.counters["dropped"] += 1
+                return
+            self.pending[to_addr].append({
+                "timestamp": time.time(),
+                "subject": subject,
+                "body": body,
+                "priority": priority,
+                "threat_data": threat_data
+            })
+            self.counters["queued"] += 1
+    
+    def build_digest(self, to_addr, entries):
+        """Fold several notifications for one recipient into a single email"""
+        kinds = Counter(entry["subject"].split(":")[0] for entry in entries)
+        priority = "high" if any(entry["priority"] == "high" for entry in entries) else "normal"
+        summary = ", ".join(f"{count} x {kind}" for kind, count in kinds.most_common())
+        
+        lines = []
+        for entry in entries:
+            score = entry["threat_data"].get('threat_score', 'N/A') if entry["threat_data"] else 'N/A'
+            when = datetime.fromtimestamp(entry["timestamp"]).strftime('%H:%M:%S')
+            lines.append(f"- [{when}] {entry['subject']} (priority {entry['priority']}, threat score {score})")
+        
+        body = f"{len(entries)} defense events in the last {self.digest_window}s: {summary}\n\n" + "\n".join(lines)
+        return build_alert_email(to_addr, f"Digest: {len(entries)} defense events", body, priority)
+    
+    def flush(self):
+        """Send everything pending as one email per recipient"""
+        with self.lock:
+            pending, self.pending = self.pending, defaultdict(list)
+        
+        for to_addr, entries in pending.items():
+            if len(entries) == 1:
+                entry = entries[0]
+                msg = build_alert_email(
+                    to_addr, entry["subject"], entry["body"],
+                    entry["priority"], entry["threat_data"], entry["timestamp"]
+                )
+            else:
+                msg = self.build_digest(to_addr, entries)
+                self.counters["digests"] += 1
+                self.counters["coalesced"] += len(entries) - 1
+            self.digest.send(msg)
+            print(f"[EMAIL] Queued {len(entries)} notification(s) for {to_addr}")
+    
+    def digest_loop(self):
+        while self.running:
+            self.wakeup.wait(self.digest_window)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                print(f"[EMAIL] Error flushing digests: {e}")
+    
+    def stats(self):
+        """Counters for queued, sent and dropped notifications"""
+        stats = dict(self.counters)
+        stats["sent"] = self.urgent.stats["sent"] + self.digest.stats["sent"]
+        stats["failed"] = self.urgent.stats["failed"] + self.digest.stats["failed"]
+        stats["dropped"] += self.urgent.stats["dropped"] + self.digest.stats["dropped"]
+        stats["in_flight"] = self.urgent.pending() + self.digest.pending()
+        return stats
+    
+    def close(self):
+        """Flush pending digests and drain both outboxes"""
+        self.running = False
+        self.wakeup.set()
+        self.thread.join(5)
+        self.flush()
+        self.urgent.close()
+        self.digest.close()
 
 class EnhancedDefenseMonitor:
     """Enhanced defense monitoring system with advanced threat detection"""
     
     def __init__(self):
         self.config = self.load_config()
-        self.threat_intel = ThreatIntelligence()
+        self.trusted_networks = CIDRIndex(
+            (network, "trusted_networks") for network in self.config.get('trusted_networks', []))
+        for network in self.trusted_networks.invalid:
+            print(f"[CONFIG] Ignoring invalid trusted network {network!r}")
+        self.threat_intel = ThreatIntelligence(self.config)
         self.geo_analyzer = GeoIPAnalyzer(self.config)
-        self.rate_limiter = RateLimiter()
+        self.rate_limiter = RateLimiter(
+            self.config.get('max_tracked_keys'),
+            self.config.get('rate_limit_block', 300)
+        )
+        self.notifier = NotificationPipeline(self.config)
         self.banned_users = {}
         self.banned_ips = {}
+        
+        # Shared ban table that cracksim and the dashboard read directly
+        self.ban_table = BanTable.open_writer(
+            BAN_TABLE,
+            self.config.get('ban_table_capacity', 16384),
+            seed=lambda table: seed_from_legacy(table, DEFENSE_LOG, BLOCKED_FILE, WHITELIST_FILE)
+        )
         self.attack_stats = defaultdict(int)
-        self.honeypot_hits = defaultdict(int)
         self.running = True
         
-        # Initialize database
+        # Sliding-window failure state, fed only with newly appended lines
+        window = self.config.get('failure_window', 60)
+        buckets = self.config.get('window_buckets', 12)
+        max_keys = self.config.get('max_tracked_keys')
+        self.user_window = SlidingWindowCounter(window, buckets, max_keys, on_evict=self.forget_user)
+        self.ip_window = SlidingWindowCounter(window, buckets, max_keys, on_evict=self.forget_ip)
+        # Honeypot hits count any status, so they are bounded on their own
+        self.honeypot_hits = SlidingWindowCounter(window, buckets, max_keys)
+        self.user_recent = {}
+        self.ip_recent = {}
+        self.log_tailer = LogTailer(LOG_FILE, on_reset=self.reset_attempt_state)
+        self.log_watcher = None
+        if self.config.get('event_driven', True):
+            self.log_watcher = FileWatcher(LOG_FILE, self.config.get('event_poll_interval', 0.1))
+            print(f"[MONITOR] Waking on attack log writes ({self.log_watcher.mode})")
+        self.last_housekeeping = 0.0
+        
+        # Initialize database and the batched event writer
         self.init_database()
+        self.event_writer = BatchedSQLiteWriter(
+            DATABASE_FILE,
+            max_queue=self.config.get('db_queue_size', 10000),
+            batch_size=self.config.get('db_batch_size', 500),
+            flush_interval=self.config.get('db_flush_interval', 0.5)
+        )
         
         # Start background threads
         self.start_background_tasks()
@@ -232,6 +483,7 @@ class EnhancedDefenseMonitor:
         """Initialize SQLite database for enhanced logging"""
         try:
             conn = sqlite3.connect(DATABASE_FILE)
+            enable_wal(conn)
             cursor = conn.cursor()
             
             cursor.execute('''
@@ -268,136 +520,112 @@ class EnhancedDefenseMonitor:
             print(f"[DATABASE] Error initializing database: {e}")
     
     def log_defense_event(self, event_type, target, source_ip, action, threat_analysis=None):
-        """Log defense event to database"""
-        try:
-            conn = sqlite3.connect(DATABASE_FILE)
-            cursor = conn.cursor()
-            
-            threat_score = threat_analysis.get('threat_score', 0) if threat_analysis else 0
-            classification = threat_analysis.get('classification', 'UNKNOWN') if threat_analysis else 'UNKNOWN'
-            indicators = json.dumps(threat_analysis.get('indicators', [])) if threat_analysis else '[]'
-            
-            cursor.execute('''
-                INSERT INTO defense_events 
-                (timestamp, event_type, target, source_ip, action_taken, threat_score, classification, indicators)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (
-                int(time.time()), event_type, target, source_ip, action,
-                threat_score, classification, indicators
-            ))
-            
-            conn.commit()
-            conn.close()
-        except Exception as e:
-            print(f"[DATABASE] Error logging defense event: {e}")
+        """Queue defense event for the batched database writer"""
+        threat_score = threat_analysis.get('threat_score', 0) if threat_analysis else 0
+        classification = threat_analysis.get('classification', 'UNKNOWN') if threat_analysis else 'UNKNOWN'
+        indicators = json.dumps(threat_analysis.get('indicators', [])) if threat_analysis else '[]'
+        
+        queued = self.event_writer.submit('''
+            INSERT INTO defense_events 
+            (timestamp, event_type, target, source_ip, action_taken, threat_score, classification, indicators)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            int(time.time()), event_type, target, source_ip, action,
+            threat_score, classification, indicators
+        ))
+        if not queued:
+            print(f"[DATABASE] Event queue full, dropped {event_type} for {target}")
     
-    def send_enhanced_email(self, to_addr, subject, body, priority="normal", threat_data=None):
-        """Send enhanced email notifications with threat intelligence"""
+    def send_enhanced_email(self, to_addr, subject, body, priority="normal", threat_data=None, immediate=False):
+        """Queue enhanced email notification; coalesced into digests unless immediate"""
         if not self.config.get('email_notifications', True):
             return
         
         try:
-            msg = MIMEMultipart()
-            msg['Subject'] = f"[CrackDefend] {subject}"
-            msg['From'] = 'defense@crackdefend.local'
-            msg['To'] = to_addr
-            msg['X-Priority'] = '1' if priority == "high" else '3'
-            
-            # Create enhanced email body
-            enhanced_body = f"""
-CrackDefend Security Alert
-========================
-
-{body}
-
-Timestamp: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}
-Priority: {priority.upper()}
-
-"""
-            
-            if threat_data:
-                enhanced_body += f"""
-Threat Analysis:
-- Threat Score: {threat_data.get('threat_score', 'N/A')}
-- Classification: {threat_data.get('classification', 'N/A')}
-- Indicators: {', '.join(threat_data.get('indicators', []))}
-
-"""
-            
-            enhanced_body += """
-This is an automated message from CrackDefend Defense Monitor.
-For more information, check the dashboard at http://localhost:5000
-
-Best regards,
-CrackDefend Security Team
-"""
-            
-            msg.attach(MIMEText(enhanced_body, 'plain'))
-            
-            with smtplib.SMTP('localhost', 1025, timeout=5) as server:
-                server.sendmail(msg['From'], [msg['To']], msg.as_string())
-                
-            print(f"[EMAIL] Sent notification: {subject}")
-            
+            self.notifier.notify(to_addr, subject, body, priority, threat_data, immediate)
         except Exception as e:
-            print(f"[EMAIL] Error sending notification: {e}")
+            print(f"[EMAIL] Error queueing notification: {e}")
+    
+    def reset_attempt_state(self):
+        """Forget ingested attempts after the attack log was truncated"""
+        print("[ANALYSIS] Attack log truncated, resetting attempt state")
+        self.user_window.clear()
+        self.ip_window.clear()
+        self.user_recent.clear()
+        self.ip_recent.clear()
+        self.honeypot_hits.clear()
+    
+    def forget_user(self, user):
+        """Drop per-user details once the user falls out of the failure window"""
+        self.user_recent.pop(user, None)
+    
+    def forget_ip(self, ip):
+        """Drop per-IP details once the IP falls out of the failure window"""
+        self.ip_recent.pop(ip, None)
+    
+    def recent_attempts(self, recent, key, now):
+        """Return the retained attempts for key that are still inside the window"""
+        cutoff = now - self.config.get('failure_window', 60)
+        return [attempt for attempt in recent.get(key, ()) if attempt['timestamp'] >= cutoff]
     
     def load_failed_attempts(self):
-        """Load and analyze failed login attempts"""
-        fails = defaultdict(list)
-        ip_fails = defaultdict(list)
+        """Ingest newly appended login attempts into the sliding-window state.
         
-        if not os.path.exists(LOG_FILE):
-            return fails, ip_fails
+        Returns the users and IPs that received new failures this cycle.
+        """
+        touched_users = set()
+        touched_ips = set()
+        kept = self.config.get('recent_attempts_kept', 50)
         
         try:
-            with open(LOG_FILE) as f:
-                for line in f:
-                    if not line.strip() or line.strip().startswith("#"):
-                        continue
-                    
-                    parts = line.strip().split(",")
-                    if len(parts) != 5:
-                        continue
-                    
-                    ts, user, pwd, ip, status = parts
-                    
-                    try:
-                        timestamp = int(ts)
-                    except ValueError:
-                        continue
-                    
-                    if status == "FAIL":
-                        fails[user].append({
-                            'timestamp': timestamp,
-                            'password': pwd,
-                            'ip': ip
-                        })
-                        ip_fails[ip].append({
-                            'timestamp': timestamp,
-                            'user': user,
-                            'password': pwd
-                        })
+            for line in self.log_tailer.read_lines():
+                line = line.strip()
+                if not line or line.startswith("#"):
+                    continue
+                
+                parts = line.split(",")
+                if len(parts) != 5:
+                    continue
+                
+                ts, user, pwd, ip, status = parts
+                
+                try:
+                    timestamp = int(ts)
+                except ValueError:
+                    continue
+                
+                if status == "FAIL":
+                    self.user_window.add(user, timestamp)
+                    self.ip_window.add(ip, timestamp)
+                    if user not in self.user_recent:
+                        self.user_recent[user] = deque(maxlen=kept)
+                    self.user_recent[user].append({
+                        'timestamp': timestamp,
+                        'password': pwd,
+                        'ip': ip
+                    })
+                    if ip not in self.ip_recent:
+                        self.ip_recent[ip] = deque(maxlen=kept)
+                    self.ip_recent[ip].append({
+                        'timestamp': timestamp,
+                        'user': user,
+                        'password': pwd
+                    })
+                    touched_users.add(user)
+                    touched_ips.add(ip)
+                
+                # Check for honeypot hits
+                if user.lower() in self.config.get('honeypot_users', []):
+                    self.honeypot_hits.add(ip, timestamp)
                     
-                    # Check for honeypot hits
-                    if user.lower() in self.config.get('honeypot_users', []):
-                        self.honeypot_hits[ip] += 1
-                        
         except Exception as e:
             print(f"[ANALYSIS] Error loading failed attempts: {e}")
         
-        return fails, ip_fails
+        return touched_users, touched_ips
     
     def is_trusted_network(self, ip):
         """Check if IP is from a trusted network"""
-        try:
-            ip_obj = ipaddress.ip_address(ip)
-            for network in self.config.get('trusted_networks', []):
-                if ip_obj in ipaddress.ip_network(network):
-                    return True
-        except Exception:
-            pass
-        return False
+        return ip in self.trusted_networks
     
     def analyze_attack_velocity(self, attempts):
         """Analyze attack velocity and patterns"""
@@ -445,10 +673,23 @@ CrackDefend Security Team
         # This could be enhanced with machine learning
         return base_threshold
     
+    def is_whitelisted(self, target):
+        """Check whitelist.txt (only consulted when a ban is about to happen)"""
+        if not os.path.exists(WHITELIST_FILE):
+            return False
+        with open(WHITELIST_FILE) as f:
+            return any(line.strip() == target for line in f)
+    
     def ban_user(self, user, reason="Brute force attack", threat_analysis=None):
         """Ban user with enhanced logging and notifications"""
+        if self.is_whitelisted(user):
+            print(f"[BAN] Skipping whitelisted user {user}")
+            return
         print(f"[BAN] User {user} blocked - Reason: {reason}")
         
+        # Publish to the shared ban table first so attempts stop immediately
+        self.ban_table.ban(USER, user, time.time() + self.config['unblock_time'])
+        
         # Log to traditional defense log
         with open(DEFENSE_LOG, "a") as f:
             f.write(f"{user},BLOCKED,{int(time.time())}\n")
@@ -478,8 +719,14 @@ CrackDefend Security Team
     
     def ban_ip(self, ip, reason="Malicious activity", threat_analysis=None):
         """Ban IP address with enhanced logging"""
+        if self.is_whitelisted(ip):
+            print(f"[BAN] Skipping whitelisted IP {ip}")
+            return
         print(f"[BAN] IP {ip} blocked - Reason: {reason}")
         
+        # IP bans last 3x longer than user bans
+        self.ban_table.ban(IP, ip, time.time() + self.config['unblock_time'] * 3)
+        
         # Log to database
         self.log_defense_event("IP_BLOCKED", ip, ip, "BLOCKED", threat_analysis)
         
@@ -502,6 +749,7 @@ CrackDefend Security Team
     def unblock_user(self, user):
         """Unblock user with logging"""
         print(f"[UNBLOCK] User {user} unblocked")
+        self.ban_table.unban(USER, user)
         
         # Log to defense log
         with open(DEFENSE_LOG, "a") as f:
@@ -527,6 +775,7 @@ CrackDefend Security Team
     def unblock_ip(self, ip):
         """Unblock IP address"""
         print(f"[UNBLOCK] IP {ip} unblocked")
+        self.ban_table.unban(IP, ip)
         
         # Log to database
         self.log_defense_event("IP_UNBLOCKED", ip, ip, "UNBLOCKED")
@@ -581,7 +830,8 @@ Threat Indicators:
 Please investigate immediately and take appropriate action.
 """,
             "high",
-            threat_analysis
+            threat_analysis,
+            immediate=(level == "CRITICAL")
         )
         
         # Update statistics
@@ -595,9 +845,17 @@ Please investigate immediately and take appropriate action.
             "statistics": dict(self.attack_stats),
             "active_bans": {
                 "users": len(self.banned_users),
-                "ips": len(self.banned_ips)
+                "ips": len(self.banned_ips),
+                "shared_table": len(self.ban_table)
+            },
+            "tracked_attackers": {
+                "users": len(self.user_window),
+                "ips": len(self.ip_window)
             },
-            "honeypot_activity": dict(self.honeypot_hits),
+            "rate_limiter": self.rate_limiter.stats(),
+            "honeypot_activity": {ip: self.honeypot_hits.count(ip, time.time()) for ip in self.honeypot_hits},
+            "database_writer": dict(self.event_writer.stats),
+            "notifications": self.notifier.stats(),
             "top_attacking_ips": [],
             "threat_summary": {
                 "total_events": sum(self.attack_stats.values()),
@@ -628,6 +886,9 @@ Please investigate immediately and take appropriate action.
                     print(f"[REPORT] Error generating report: {e}")
         
         threading.Thread(target=report_generator, daemon=True).start()
+        
+        # Re-index threat feeds in the background whenever they change
+        self.threat_intel.start()
     
     def cleanup_old_reports(self):
         """Clean up old report files"""
@@ -651,12 +912,13 @@ Please investigate immediately and take appropriate action.
         
         while self.running:
             try:
-                # Load failed attempts
+                # Ingest new failures, only touched keys need re-evaluation
+                now = time.time()
                 user_fails, ip_fails = self.load_failed_attempts()
                 
                 # Process user-based attacks
-                for user, attempts in user_fails.items():
-                    if user in self.banned_users:
+                for user in user_fails:
+                    if self.ban_table.is_user_banned(user, now):
                         continue
                     
                     # Calculate adaptive threshold
@@ -665,7 +927,9 @@ Please investigate immediately and take appropriate action.
                         self.config['ban_threshold']
                     )
                     
-                    if len(attempts) >= threshold:
+                    failures = self.user_window.count(user, now)
+                    attempts = self.recent_attempts(self.user_recent, user, now)
+                    if failures >= threshold and attempts:
                         # Analyze the most recent attempt for threat intelligence
                         latest_attempt = max(attempts, key=lambda x: x['timestamp'])
                         
@@ -682,12 +946,12 @@ Please investigate immediately and take appropriate action.
                         # Check for escalation
                         if not self.check_escalation_needed(threat_analysis, user, latest_attempt['ip']):
                             # Standard ban
-                            reason = f"Brute force attack ({len(attempts)} attempts)"
+                            reason = f"Brute force attack ({failures} attempts in {self.config.get('failure_window', 60)}s)"
                             self.ban_user(user, reason, threat_analysis)
                 
                 # Process IP-based attacks
-                for ip, attempts in ip_fails.items():
-                    if ip in self.banned_ips or self.is_trusted_network(ip):
+                for ip in ip_fails:
+                    if self.ban_table.is_ip_banned(ip, now) or self.is_trusted_network(ip):
                         continue
                     
                     # Check rate limiting
@@ -705,6 +969,7 @@ Please investigate immediately and take appropriate action.
                         continue
                     
                     # Check for distributed attacks from single IP
+                    attempts = self.recent_attempts(self.ip_recent, ip, now)
                     unique_users = len(set(attempt['user'] for attempt in attempts))
                     if unique_users >= 5:  # Attacking multiple users
                         threat_analysis = {
@@ -716,7 +981,7 @@ Please investigate immediately and take appropriate action.
                         continue
                     
                     # Check honeypot hits
-                    if self.honeypot_hits[ip] >= 1:
+                    if self.honeypot_hits.count(ip, now) >= 1:
                         threat_analysis = {
                             "threat_score": 30,
                             "classification": "CRITICAL",
@@ -724,26 +989,43 @@ Please investigate immediately and take appropriate action.
                         }
                         self.ban_ip(ip, "Honeypot interaction", threat_analysis)
                 
-                # Process unblocking
+                # Unblocking and eviction only need to run every monitoring_interval
                 current_time = time.time()
-                unblock_time = self.config['unblock_time']
+                if current_time - self.last_housekeeping >= self.config['monitoring_interval']:
+                    self.last_housekeeping = current_time
+                    
+                    unblock_time = self.config['unblock_time']
                 
-                # Unblock users
-                for user in list(self.banned_users.keys()):
-                    if current_time - self.banned_users[user] > unblock_time:
-                        self.unblock_user(user)
+                    # Unblock users
+                    for user in list(self.banned_users.keys()):
+                        if current_time - self.banned_users[user] > unblock_time:
+                            self.unblock_user(user)
                 
-                # Unblock IPs (longer timeout for IPs)
-                ip_unblock_time = unblock_time * 3  # 3x longer for IPs
-                for ip in list(self.banned_ips.keys()):
-                    if current_time - self.banned_ips[ip] > ip_unblock_time:
-                        self.unblock_ip(ip)
+                    # Unblock IPs (longer timeout for IPs)
+                    ip_unblock_time = unblock_time * 3  # 3x longer for IPs
+                    for ip in list(self.banned_ips.keys()):
+                        if current_time - self.banned_ips[ip] > ip_unblock_time:
+                            self.unblock_ip(ip)
+                
+                    # Drop table entries whose expiry passed (e.g. from a previous run),
+                    # recording the unblock in the logs and blocked.txt as well
+                    for kind, key in self.ban_table.purge_expired(current_time):
+                        if kind == USER:
+                            self.unblock_user(key)
+                        else:
+                            self.unblock_ip(key)
+                
+                    # Drop keys that have been quiet for a whole window
+                    self.user_window.evict_idle(current_time)
+                    self.ip_window.evict_idle(current_time)
+                    self.honeypot_hits.evict_idle(current_time)
+                    self.rate_limiter.evict_idle(current_time)
                 
                 # Update statistics
                 self.attack_stats['monitoring_cycles'] += 1
                 
-                # Sleep until next monitoring cycle
-                time.sleep(self.config['monitoring_interval'])
+                # Sleep until the attack log changes or the next monitoring cycle
+                self.wait_for_attempts()
                 
             except KeyboardInterrupt:
                 print("\n[MONITOR] Shutting down gracefully...")
@@ -753,28 +1035,64 @@ Please investigate immediately and take appropriate action.
                 print(f"[MONITOR] Error in monitoring loop: {e}")
                 time.sleep(10)  # Wait before retrying
     
+    def wait_for_attempts(self):
+        """Block until new attempts are logged, or for monitoring_interval at most.
+        
+        A burst of writes is given event_debounce seconds of quiet to
+        finish, but is never held back more than event_max_latency.
+        """
+        interval = self.config['monitoring_interval']
+        if self.log_watcher is None:
+            time.sleep(interval)
+            return
+        # Wake in time for the next housekeeping pass even if nothing is logged
+        idle = max(0, self.last_housekeeping + interval - time.time())
+        if not self.log_watcher.wait(idle):
+            return
+        deadline = time.monotonic() + self.config.get('event_max_latency', 0.05)
+        debounce = self.config.get('event_debounce', 0.01)
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0 or not self.log_watcher.wait(min(debounce, remaining)):
+                return
+    
     def shutdown(self):
         """Graceful shutdown"""
         print("[MONITOR] Shutting down Enhanced Defense Monitor...")
         self.running = False
+        self.log_tailer.close()
+        if self.log_watcher is not None:
+            self.log_watcher.close()
+        self.threat_intel.close()
+        
+        # Flush queued defense events and notifications before exiting
+        self.event_writer.close()
+        self.notifier.close()
         
         # Generate final report
         final_report = self.generate_defense_report()
         with open("../data/final_defense_report.json", 'w') as f:
             json.dump(final_report, f, indent=2)
+        self.ban_table.close()
         
         print("[MONITOR] Shutdown complete.")
 
+def handle_sigterm(signum, frame):
+    """Turn SIGTERM from the dashboard into the graceful shutdown path"""
+    raise KeyboardInterrupt
+
 def main():
     """Main entry point"""
     monitor = EnhancedDefenseMonitor()
+    signal.signal(signal.SIGTERM, handle_sigterm)
     
     try:
         monitor.monitor()
     except KeyboardInterrupt:
-        monitor.shutdown()
+        pass
     except Exception as e:
         print(f"[MAIN] Fatal error: {e}")
+    finally:
         monitor.shutdown()
 
 if __name__ == "__main__":
@@ -0,0 +1,142 @@
+import asyncio
+import importlib
+import time
+
+
+class TokenBucket:
+    """Token bucket that hands out send times instead of sleeping per token.
+
+    ``reserve`` always takes a token, letting the balance go negative, and
+    returns how long the caller has to wait for it. Because every
+    reservation is derived from the bucket state rather than from the
+    previous sleep, oversleeping on one attempt is made up on the next
+    ones and the long-run rate stays at ``rate``.
+    """
+
+    def __init__(self, rate, burst):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, not {rate}")
+        self.rate = float(rate)
+        self.burst = max(1.0, float(burst))
+        self.tokens = self.burst
+        self.updated = time.monotonic()
+
+    def reserve(self, now=None):
+        """Take one token; returns the delay in seconds before it may be used"""
+        now = time.monotonic() if now is None else now
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        self.tokens -= 1
+        return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+
+class LocalTarget:
+    """In-process login target checking valid_creds, with optional latency"""
+
+    def __init__(self, valid_creds, latency=0.0):
+        self.valid_creds = valid_creds
+        self.latency = latency
+
+    async def try_login(self, user, pwd, ip):
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        return self.valid_creds.get(user) == pwd
+
+
+def load_target(spec, valid_creds, latency=0.0):
+    """Build the target named by ``local`` or ``package.module:factory``.
+
+    A factory is called with ``valid_creds`` and ``latency`` and must return
+    an object with an ``async try_login(user, pwd, ip)`` method that
+    returns True for a successful login.
+    """
+    if spec == "local":
+        return LocalTarget(valid_creds, latency)
+    module_name, _, attr = spec.partition(":")
+    factory = getattr(importlib.import_module(module_name), attr or "Target")
+    return factory(valid_creds=valid_creds, latency=latency)
+
+
+class AsyncAttackDriver:
+    """Feeds candidates to an async attempt function at a controlled rate.
+
+    Sends are paced by a ``TokenBucket`` (``rate`` attempts/s with bursts
+    of ``burst``) and at most ``concurrency`` attempts are in flight; each
+    attempt runs as its own task so slow targets do not hold back the
+    schedule. Waits shorter than ``min_sleep`` are not slept on their own,
+    the next longer wait covers them, which keeps the event loop from
+    spinning on sub-millisecond timers at high rates.
+    """
+
+    def __init__(self, attempt, rate, burst, concurrency, min_sleep=0.001):
+        self.attempt = attempt
+        self.rate = rate
+        self.burst = burst
+        self.concurrency = concurrency
+        self.min_sleep = min_sleep
+        self.stats = {"started": 0, "completed": 0, "errors": 0, "peak_in_flight": 0}
+        self.in_flight = 0
+        self.started_at = None
+        self.sending_until = None
+
+    def measured_rate(self):
+        """Attempts sent per second while the driver was sending"""
+        if not self.started_at:
+            return 0.0
+        elapsed = (self.sending_until or time.monotonic()) - self.started_at
+        return self.stats["started"] / elapsed if elapsed > 0 else 0.0
+
+    async def _run_one(self, semaphore, candidate):
+        try:
+            await self.attempt(*candidate)
+        except Exception as e:
+            self.stats["errors"] += 1
+            if self.stats["errors"] <= 10:
+                print(f"[ASYNC] Attempt failed: {e}")
+        finally:
+            self.stats["completed"] += 1
+            self.in_flight -= 1
+            semaphore.release()
+
+    async def run(self, candidates, duration=None, report_interval=5, report=print):
+        """Drive candidates until they run out or duration seconds pass"""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        bucket = TokenBucket(self.rate, self.burst)
+        tasks = set()
+        self.started_at = time.monotonic()
+        self.sending_until = None
+        deadline = self.started_at + duration if duration else None
+        next_report = self.started_at + report_interval
+
+        for candidate in candidates:
+            now = time.monotonic()
+            if deadline and now >= deadline:
+                break
+            if now >= next_report:
+                report(self.summary())
+                next_report = now + report_interval
+
+            owed = bucket.reserve(now)
+            if owed >= self.min_sleep:
+                await asyncio.sleep(owed)
+            await semaphore.acquire()
+
+            self.in_flight += 1
+            self.stats["started"] += 1
+            self.stats["peak_in_flight"] = max(self.stats["peak_in_flight"], self.in_flight)
+            task = asyncio.ensure_future(self._run_one(semaphore, candidate))
+            tasks.add(task)
+            task.add_done_callback(tasks.discard)
+            if owed < self.min_sleep:
+                # Let finished attempts run their callbacks between sends
+                await asyncio.sleep(0)
+
+        self.sending_until = time.monotonic()
+        if tasks:
+            await asyncio.gather(*tasks)
+        return self.summary()
+
+    def summary(self):
+        return (f"[RATE] {self.stats['completed']}/{self.stats['started']} attempts done, configured {self.rate:g}/s "
+                f"(burst {self.burst:g}), measured {self.measured_rate():.1f}/s, "
+                f"in flight {self.in_flight} (peak {self.stats['peak_in_flight']})")
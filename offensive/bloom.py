@@ -0,0 +1,84 @@
+import hashlib
+import math
+import os
+import struct
+
+MAGIC = b"CDBLM1\0\0"
+# magic, size in bits, hash count, items added
+HEADER = struct.Struct("<8sQIQ")
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter for "already tried" sets.
+
+    Sized for ``capacity`` items at ``fp_rate``, but never larger than
+    ``max_bytes``; when the budget is what limits it the filter still
+    works at a higher false-positive rate (``expected_fp_rate``). The k
+    bit positions are k 64-bit words of a single shake_128 digest, which
+    costs less than deriving them in a Python loop. A false positive only
+    ever means a new key is reported as seen.
+    """
+
+    def __init__(self, capacity, fp_rate=0.001, max_bytes=32 << 20):
+        capacity = max(1, capacity)
+        wanted = math.ceil(-capacity * math.log(fp_rate) / math.log(2) ** 2)
+        self.size = max(64, min(wanted, max_bytes * 8))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+        self._unpack = struct.Struct(f"<{self.hashes}Q").unpack
+
+    def _positions(self, key):
+        size = self.size
+        return [word % size for word in self._unpack(hashlib.shake_128(key).digest(8 * self.hashes))]
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def add(self, key):
+        """Insert key; returns False if it was (probably) already present"""
+        bits = self.bits
+        new = False
+        for p in self._positions(key):
+            mask = 1 << (p & 7)
+            if not bits[p >> 3] & mask:
+                bits[p >> 3] |= mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+    def expected_fp_rate(self):
+        """False-positive rate at the current number of items"""
+        return (1 - math.exp(-self.hashes * self.count / self.size)) ** self.hashes
+
+    def save(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(HEADER.pack(MAGIC, self.size, self.hashes, self.count))
+            f.write(self.bits)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore bits saved by a filter of the same geometry; returns False otherwise"""
+        try:
+            with open(path, "rb") as f:
+                magic, size, hashes, count = HEADER.unpack(f.read(HEADER.size))
+                if (magic, size, hashes) != (MAGIC, self.size, self.hashes):
+                    return False
+                bits = f.read()
+        except (OSError, struct.error):
+            return False
+        if len(bits) != len(self.bits):
+            return False
+        self.bits[:] = bits
+        self.count = count
+        return True
+
+    def __len__(self):
+        return self.count
+
+    def stats(self):
+        return (f"{self.count} pairs in {len(self.bits) / (1 << 20):.1f} MB, "
+                f"{self.hashes} hashes, expected FP rate {self.expected_fp_rate():.2e}")
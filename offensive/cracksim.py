@@ -1,10 +1,29 @@
 
+import argparse
+import asyncio
+import itertools
+import multiprocessing
 import random
+import signal
 import time
 import os
-import smtplib
+import sys
 from email.mime.text import MIMEText
 
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.mailer import MailOutbox
+from common.bantable import BanTable
+from common.linewriter import GroupCommitLogWriter, FSYNC_POLICIES
+from common.credstore import CredentialStore
+from async_driver import AsyncAttackDriver, load_target
+from hashcrack import HashCracker, load_hashes
+from digestindex import DigestIndex, build_index, INDEXED_ALGOS
+from wordlist import Wordlist
+from mangler import RulePipeline, load_rules
+from maskattack import Mask, parse_custom_charsets, format_eta
+from session import AttackSession, PasswordSource
+from bloom import BloomFilter
+
 DATA_DIR = "../data"
 USERNAMES_FILE = os.path.join(DATA_DIR, "usernames.txt")
 PASSWORDS_FILE = os.path.join(DATA_DIR, "passwords.txt")
@@ -14,17 +33,46 @@ DEFENSE_LOG = os.path.join(DATA_DIR, "defense_log.csv")
 BLOCKED_FILE = os.path.join(DATA_DIR, "blocked.txt")
 WHITELIST_FILE = os.path.join(DATA_DIR, "whitelist.txt")
 CONFIG_FILE = os.path.join(DATA_DIR, "attack_speed.cfg")
+MAIL_SPOOL = os.path.join(DATA_DIR, "mail_spool.jsonl")
+HASHES_FILE = os.path.join(DATA_DIR, "hashes.txt")
+ROCKYOU_FILE = os.path.join(DATA_DIR, "rockyou.txt")
+BAN_TABLE = os.path.join(DATA_DIR, "bans.tbl")
+SESSION_FILE = os.path.join(DATA_DIR, "cracksim-{mode}.session")
+# Random (user, password) picks before scanning for an untried pair, and the
+# largest user x password space that is worth scanning
+MAX_PICKS = 100
+MAX_SCAN = 100_000
+
+# Alerts go through a background outbox so MailHog latency never slows attacks
+outbox = None
+
+def get_outbox():
+    global outbox
+    if outbox is None:
+        outbox = MailOutbox('localhost', 1025, timeout=3, spool_path=MAIL_SPOOL)
+    return outbox
 
 def send_mailhog_email(to_addr, subject, body):
     msg = MIMEText(body)
     msg['Subject'] = subject
     msg['From'] = 'lab@crackdefend.local'
     msg['To'] = to_addr
-    try:
-        with smtplib.SMTP('localhost', 1025, timeout=3) as server:
-            server.sendmail(msg['From'], [msg['To']], msg.as_string())
-    except Exception as e:
-        print(f"[MailHog ERROR] Could not send mail: {e}")
+    get_outbox().send(msg)
+
+# Attempts are buffered and group-committed instead of one open/write/close each
+attack_log = None
+
+def log_attempt(line):
+    attack_log.write_line(line)
+
+# Ban state published by the defender, mapped read-only once it exists
+ban_table = None
+
+def get_ban_table():
+    global ban_table
+    if ban_table is None:
+        ban_table = BanTable.open_reader(BAN_TABLE)
+    return ban_table
 
 def load_list(path):
     with open(path) as f:
@@ -39,7 +87,11 @@ def load_valid_creds(path):
                 valid[email] = pwd
     return valid
 
-def is_blocked(user):
+def is_blocked(user, ip=None):
+    table = get_ban_table()
+    if table is not None:
+        return table.is_user_banned(user) or (ip is not None and table.is_ip_banned(ip))
+    # No defender or dashboard has published a table yet, replay the files
     blocked = set()
     if os.path.exists(DEFENSE_LOG):
         with open(DEFENSE_LOG) as f:
@@ -57,7 +109,7 @@ def is_blocked(user):
             for line in f:
                 if line.strip() in blocked:
                     blocked.discard(line.strip())
-    return user in blocked
+    return user in blocked or ip in blocked
 
 def generate_ip():
     return f"192.168.{random.randint(0, 255)}.{random.randint(1, 254)}"
@@ -71,52 +123,490 @@ def get_attack_speed():
         pass
     return 1.0
 
-def main():
+def attempt_login(user, pwd, ip, valid_creds, verbose=True):
+    """Try one credential pair, log it and return its status"""
+    now = int(time.time())
+    if is_blocked(user, ip):
+        status = "BLOCKED"
+        log_attempt(f"{now},{user},{pwd},{ip},{status}")
+        if verbose:
+            print(f"User {user} or IP {ip} is blocked. Attempt BLOCKED.")
+        return status
+    return record_result(user, pwd, ip, valid_creds.get(user) == pwd, now, verbose)
+
+async def attempt_login_async(target, user, pwd, ip):
+    """attempt_login against a pluggable async target"""
+    now = int(time.time())
+    if is_blocked(user, ip):
+        log_attempt(f"{now},{user},{pwd},{ip},BLOCKED")
+        return "BLOCKED"
+    is_valid = await target.try_login(user, pwd, ip)
+    return record_result(user, pwd, ip, is_valid, now, verbose=False)
+
+def record_result(user, pwd, ip, is_valid, now, verbose=True):
+    status = "SUCCESS" if is_valid else "FAIL"
+    log_attempt(f"{now},{user},{pwd},{ip},{status}")
+    if verbose:
+        print(f"Trying {user} with {pwd} from {ip} ... {status}")
+    if is_valid:
+        send_mailhog_email(
+            user,
+            "Login Alert",
+            f"Hi {user},\n\nYour account was logged into at {time.ctime(now)} from IP {ip}. If this wasn't you, please change your password!\n"
+        )
+    return status
+
+def load_mask(args):
+    """Mask from --mask and --charset, or None for dictionary attacks"""
+    if not args.mask:
+        return None
+    return Mask(args.mask, parse_custom_charsets(args.charset))
+
+def password_source(worker_id=0, workers=1, rules=None, mask=None, mask_start=0):
+    """Resumable rockyou.txt words, or this worker's contiguous share of them or of the mask keyspace"""
+    if mask is not None:
+        ranges = mask.partition(workers, mask_start)
+        start, end = ranges[worker_id] if worker_id < len(ranges) else (mask.keyspace, mask.keyspace)
+        return PasswordSource(mask=mask, rules=rules, offset=start, end=end)
+    # Same byte ranges as Wordlist.shard
+    step = -(-os.path.getsize(ROCKYOU_FILE) // workers) if os.path.exists(ROCKYOU_FILE) else 0
+    return PasswordSource(ROCKYOU_FILE, rules=rules, offset=worker_id * step, end=(worker_id + 1) * step)
+
+def password_stream(source, worker_id=0, workers=1):
+    """Source passwords first, then (for dictionary attacks) the lab password list"""
+    yield from source
+    if source.mask is None:
+        passwords = load_list(PASSWORDS_FILE)[worker_id::workers]
+        yield from source.pipeline(passwords) if source.pipeline else passwords
+
+def open_session(args, mode, **identity):
+    """Checkpoint for this attack, or None when --checkpoint-s is 0"""
+    if args.checkpoint_s <= 0:
+        return None
+    identity.update(mode=mode, rules=args.rules, mask=args.mask, charset=args.charset, mask_start=args.mask_start)
+    return AttackSession(args.session or SESSION_FILE.format(mode=mode), identity, args.checkpoint_s)
+
+def dictionary_identity(path):
+    return {"wordlist": os.path.abspath(path), "wordlist_size": os.path.getsize(path) if os.path.exists(path) else 0}
+
+def open_tried_filter(args, workers=1):
+    """Bloom filter of tried (user, password) pairs, split evenly between workers, or None"""
+    if args.tried_capacity <= 0:
+        return None
+    return BloomFilter(args.tried_capacity // workers, args.tried_fp, int(args.tried_mb * (1 << 20)) // workers)
+
+def pair_key(user, pwd):
+    return f"{user}\n{pwd}".encode("utf-8", errors="surrogateescape")
+
+def run_attack(args):
     print("CrackSim: Starting brute-force simulation. Press Ctrl+C to stop.")
     # Try to use rockyou.txt for dictionary attacks if exists
-    rockyou_path = os.path.join(DATA_DIR, "rockyou.txt")
-    use_dict = os.path.exists(rockyou_path)
-    dict_pwds = []
-    if use_dict:
-        with open(rockyou_path, encoding='latin-1') as f:
-            dict_pwds = [line.strip() for line in f if line.strip()]
-    dict_idx = 0
-    while True:
-        usernames = load_list(USERNAMES_FILE)
-        passwords = load_list(PASSWORDS_FILE)
-        valid_creds = load_valid_creds(VALID_CREDS_FILE)
-        if not usernames or not passwords:
-            print("No usernames or passwords to test. Waiting...")
-            time.sleep(2)
-            continue
-        user = random.choice(usernames)
-        # Dictionary attack: try rockyou.txt first
-        if use_dict and dict_idx < len(dict_pwds):
-            pwd = dict_pwds[dict_idx]
-            dict_idx += 1
+    source = password_source(rules=load_rules(args.rules) if args.rules else None,
+                             mask=load_mask(args), mask_start=args.mask_start)
+    session = open_session(args, "attack", **dictionary_identity(ROCKYOU_FILE))
+    tried = open_tried_filter(args)
+    counts = {"attempts": 0, "successes": 0, "skipped": 0}
+    state = session.load() if session is not None and args.resume else None
+    if state:
+        source.offset, source.rule = state["offset"], state["rule"]
+        counts.update(state["counts"])
+        print(f"[SESSION] Resuming at offset {source.offset} (rule {source.rule}) "
+              f"after {counts['attempts']} attempts, {counts['successes']} successes")
+        if tried is not None and not tried.load(f"{session.path}.tried"):
+            print("[TRIED] Saved filter missing or sized differently, starting with an empty one")
+
+    def checkpoint():
+        session.save(dict(source.position(), counts=counts))
+        if tried is not None:
+            tried.save(f"{session.path}.tried")
+
+    # Reference lists stay in memory and only pick up what the dashboard appends
+    store = CredentialStore(USERNAMES_FILE, PASSWORDS_FILE, VALID_CREDS_FILE)
+    usernames, passwords, valid_creds = store.usernames, store.passwords, store.valid_creds
+    delay = get_attack_speed()
+    delay_checked = time.time()
+    dictionary = iter(source)
+    try:
+        while True:
+            changes = store.refresh()
+            if changes:
+                print("[CREDS] Picked up " + ", ".join(f"{count} {name}" for name, count in changes.items()))
+            if not usernames or not passwords:
+                print("No usernames or passwords to test. Waiting...")
+                time.sleep(2)
+                continue
+            # Dictionary attack: try rockyou.txt first, on a user that hasn't had the word yet
+            pwd = next(dictionary, None)
+            if pwd is not None:
+                picks = [(user, pwd) for user in random.sample(usernames, len(usernames))]
+            else:
+                picks = [(random.choice(usernames), random.choice(passwords)) for _ in range(MAX_PICKS)]
+                if tried is not None and len(usernames) * len(passwords) <= MAX_SCAN:
+                    picks = itertools.chain(picks, itertools.product(usernames, passwords))
+            user = None
+            for pick in picks:
+                if tried is None or pair_key(*pick) not in tried:
+                    user, pwd = pick
+                    break
+                counts["skipped"] += 1
+            if user is None:
+                if pwd is None:
+                    print("[TRIED] No untried pair left, waiting for new usernames or passwords")
+                    time.sleep(2)
+                continue
+            status = attempt_login(user, pwd, generate_ip(), valid_creds)
+            counts["attempts"] += 1
+            counts["successes"] += status == "SUCCESS"
+            # A blocked attempt never tested the password, so it stays untried
+            if tried is not None and status != "BLOCKED":
+                tried.add(pair_key(user, pwd))
+            if session is not None and session.due():
+                checkpoint()
+            if time.time() - delay_checked >= 1:
+                delay = get_attack_speed()
+                delay_checked = time.time()
+            time.sleep(delay)
+    finally:
+        store.close()
+        if tried is not None:
+            print(f"[TRIED] Skipped {counts['skipped']} already-tried pairs ({tried.stats()})")
+        if session is not None:
+            checkpoint()
+            print(f"[SESSION] Saved offset {source.offset} (rule {source.rule}) to {session.path}")
+
+def open_attack_log(args):
+    global attack_log
+    attack_log = GroupCommitLogWriter(
+        ATTACK_LOG,
+        flush_records=args.flush_records,
+        flush_interval=args.flush_ms / 1000,
+        fsync=args.fsync,
+        fsync_interval=args.fsync_ms / 1000
+    )
+
+def run_worker(worker_id, workers, usernames, valid_creds, counters, skipped, positions, args):
+    """Attack this worker's share of the passwords against every user"""
+    # Ctrl+C reaches every worker and the parent follows up with SIGTERM, so
+    # signals only set a flag and the log is always flushed exactly once
+    stop = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+    signal.signal(signal.SIGINT, lambda signum, frame: stop.append(signum))
+    open_attack_log(args)
+    delay = get_attack_speed()
+    delay_checked = time.time()
+    source = password_source(worker_id, workers, load_rules(args.rules) if args.rules else None,
+                             load_mask(args), args.mask_start)
+    # The parent seeds positions with a resumed checkpoint, -1 meaning start of shard
+    if positions[2 * worker_id] >= 0:
+        source.offset, source.rule = positions[2 * worker_id], positions[2 * worker_id + 1]
+    # Catches words repeated in the wordlist or between it and passwords.txt
+    tried = open_tried_filter(args, workers)
+    try:
+        # Password-major order sprays each password across all users
+        for pwd in password_stream(source, worker_id, workers):
+            for user in usernames:
+                if stop:
+                    return
+                if tried is not None and not tried.add(pair_key(user, pwd)):
+                    skipped[worker_id] += 1
+                    continue
+                attempt_login(user, pwd, generate_ip(), valid_creds, verbose=False)
+                counters[worker_id] += 1
+                if delay > 0:
+                    time.sleep(delay)
+                if time.time() - delay_checked >= 1:
+                    delay = get_attack_speed()
+                    delay_checked = time.time()
+            # Every user has seen this password, so a restart can skip past it
+            with positions.get_lock():
+                positions[2 * worker_id] = source.offset
+                positions[2 * worker_id + 1] = source.rule
+    finally:
+        attack_log.close()
+        if outbox is not None:
+            outbox.close()
+
+def run_workers(args):
+    """Split the candidate space across worker processes and report throughput"""
+    usernames = load_list(USERNAMES_FILE)
+    valid_creds = load_valid_creds(VALID_CREDS_FILE)
+    if not usernames:
+        print("No usernames to test.")
+        return
+    
+    # Each worker gets a byte range of rockyou.txt and a slice of passwords.txt,
+    # or a contiguous range of the mask keyspace
+    workers = args.workers
+    mask = load_mask(args)
+    if mask is None:
+        print(f"CrackSim: {workers} workers over {len(usernames)} users x rockyou.txt + passwords.txt")
+        total = None
+    else:
+        total = (mask.keyspace - min(args.mask_start, mask.keyspace)) * len(usernames)
+        print(f"CrackSim: {workers} workers over {len(usernames)} users x mask {mask.mask} "
+              f"({mask.keyspace:,} passwords from index {args.mask_start})")
+    
+    # One slot per worker so increments never contend
+    ctx = multiprocessing.get_context("fork")
+    counters = ctx.Array('q', workers, lock=False)
+    skipped = ctx.Array('q', workers, lock=False)
+    # (offset, rule) per worker, updated together under the lock once a password is done
+    positions = ctx.Array('q', [-1, 0] * workers)
+    session = open_session(args, "workers", workers=workers, **dictionary_identity(ROCKYOU_FILE))
+    previous = 0
+    state = session.load() if session is not None and args.resume else None
+    if state:
+        positions[:] = [value for position in state["positions"] for value in position]
+        previous = state["attempts"]
+        print(f"[SESSION] Resuming {workers} workers after {previous} attempts")
+
+    def checkpoint():
+        with positions.get_lock():
+            saved = [positions[i:i + 2] for i in range(0, 2 * workers, 2)]
+        session.save({"positions": saved, "attempts": previous + sum(counters)})
+
+    procs = [
+        ctx.Process(target=run_worker,
+                    args=(i, workers, usernames, valid_creds, counters, skipped, positions, args), daemon=True)
+        for i in range(workers)
+    ]
+    started = time.time()
+    for proc in procs:
+        proc.start()
+    
+    last_count, last_time = 0, started
+    try:
+        while any(proc.is_alive() for proc in procs):
+            time.sleep(args.report_interval)
+            now, count = time.time(), sum(counters)
+            average = count / (now - started)
+            progress = ""
+            if total and not args.rules:
+                eta = (total - previous - count) / average if average else None
+                progress = f", {(previous + count) / total:.2%} of keyspace, ETA {format_eta(eta)}"
+            print(f"[RATE] {count} attempts, {(count - last_count) / (now - last_time):.0f}/s "
+                  f"(avg {average:.0f}/s{progress})")
+            last_count, last_time = count, now
+            if session is not None and session.due(now):
+                checkpoint()
+    except KeyboardInterrupt:
+        print("CrackSim: Stopping workers.")
+    finally:
+        for proc in procs:
+            if proc.is_alive():
+                proc.terminate()
+        for proc in procs:
+            proc.join()
+        elapsed = time.time() - started
+        count = sum(counters)
+        print(f"[RATE] Total {count} attempts in {elapsed:.1f}s ({count / elapsed:.0f} attempts/s across {workers} workers), "
+              f"{sum(skipped)} already-tried pairs skipped")
+        if session is not None:
+            checkpoint()
+            print(f"[SESSION] Saved {workers} worker positions to {session.path}")
+
+def run_async(args):
+    """Drive the candidate space from one event loop at a token-bucket rate"""
+    usernames = load_list(USERNAMES_FILE)
+    valid_creds = load_valid_creds(VALID_CREDS_FILE)
+    if not usernames:
+        print("No usernames to test.")
+        return
+    target = load_target(args.target, valid_creds, args.target_latency_ms / 1000)
+    rules = load_rules(args.rules) if args.rules else None
+    tried = open_tried_filter(args)
+    skipped = 0
+    
+    def candidates():
+        nonlocal skipped
+        # Same password-major order as the worker mode
+        for pwd in password_stream(password_source(rules=rules, mask=load_mask(args), mask_start=args.mask_start)):
+            for user in usernames:
+                # Marked when scheduled, since the attempt itself may still be in flight
+                if tried is not None and not tried.add(pair_key(user, pwd)):
+                    skipped += 1
+                    continue
+                yield (target, user, pwd, generate_ip())
+    
+    driver = AsyncAttackDriver(attempt_login_async, args.rate, args.burst, args.concurrency)
+    print(f"CrackSim: async driver at {args.rate:g}/s (burst {args.burst:g}, "
+          f"{args.concurrency} in flight) against {args.target}")
+    try:
+        print(asyncio.run(driver.run(candidates(), args.duration, args.report_interval)))
+    except KeyboardInterrupt:
+        print("CrackSim: Stopping.")
+        print(driver.summary())
+    if tried is not None:
+        print(f"[TRIED] Skipped {skipped} already-tried pairs ({tried.stats()})")
+
+def run_hash_crack(args):
+    """Offline dictionary or mask attack on a hash dump"""
+    targets = load_hashes(args.hashes)
+    if not targets:
+        print(f"No recognised hashes in {args.hashes}.")
+        return
+    counts = ", ".join(f"{len(digests)} {algo}" for algo, digests in sorted(targets.items()))
+    rules = load_rules(args.rules) if args.rules else None
+    cracker = HashCracker(targets, args.workers or None, int(args.chunk_mb * (1 << 20)), rules)
+    mask = load_mask(args)
+    identity = {"hashes": os.path.abspath(args.hashes)}
+    if mask is None:
+        identity.update(dictionary_identity(args.wordlist))
+    session = open_session(args, "crack", **identity)
+    start = args.mask_start if mask is not None else 0
+    state = session.load() if session is not None and args.resume else None
+    if state:
+        start = state["position"]
+        for key, word in state["cracked"].items():
+            algo, digest = key.split(":")
+            cracker.cracked[(algo, bytes.fromhex(digest))] = word.encode("latin-1")
+        print(f"[SESSION] Resuming at {start} with {len(cracker.cracked)} hashes already cracked")
+
+    def checkpoint(cracker, force=False):
+        if session is not None and (force or session.due()):
+            cracked = {f"{algo}:{digest.hex()}": word.decode("latin-1")
+                       for (algo, digest), word in cracker.cracked.items()}
+            session.save({"position": cracker.position, "cracked": cracked})
+
+    try:
+        if mask is not None:
+            print(f"CrackSim: cracking {counts} hashes with mask {mask.mask} ({mask.keyspace:,} candidates)")
+            cracker.run_mask(mask, start, report_interval=args.report_interval, on_done=checkpoint)
         else:
-            pwd = random.choice(passwords)
-        ip = generate_ip()
-        now = int(time.time())
-        if is_blocked(user):
-            status = "BLOCKED"
-            with open(ATTACK_LOG, "a") as f:
-                f.write(f"{now},{user},{pwd},{ip},{status}\n")
-            print(f"User {user} is blocked. Attempt BLOCKED.")
-            time.sleep(get_attack_speed())
+            print(f"CrackSim: cracking {counts} hashes with {args.wordlist}")
+            # Precomputed indexes answer their algorithms without a wordlist pass
+            for algo in targets:
+                index = DigestIndex.open(args.wordlist, algo) if algo in INDEXED_ALGOS else None
+                if index is not None:
+                    cracker.use_index(index, final=not rules)
+                    index.close()
+            cracker.run(args.wordlist, start, on_done=checkpoint)
+    except KeyboardInterrupt:
+        print(f"CrackSim: Stopping at {cracker.position}.")
+    finally:
+        checkpoint(cracker, force=True)
+    print(cracker.summary())
+
+def run_build_index(args):
+    """Hash the wordlist once per algorithm into sorted digest indexes"""
+    for algo in args.index_algos.split(","):
+        if algo not in INDEXED_ALGOS:
+            print(f"Unsupported index algorithm {algo!r}, choose from {', '.join(INDEXED_ALGOS)}")
             continue
-        is_valid = valid_creds.get(user) == pwd
-        status = "SUCCESS" if is_valid else "FAIL"
-        with open(ATTACK_LOG, "a") as f:
-            f.write(f"{now},{user},{pwd},{ip},{status}\n")
-        print(f"Trying {user} with {pwd} from {ip} ... {status}")
-        if is_valid:
-            send_mailhog_email(
-                user,
-                "Login Alert",
-                f"Hi {user},\n\nYour account was logged into at {time.ctime(now)} from IP {ip}. If this wasn't you, please change your password!\n"
-            )
-        time.sleep(get_attack_speed())
+        build_index(args.wordlist, algo)
+
+def run_rule_benchmark(args):
+    """Measure candidates/s of a rule set over the wordlist"""
+    pipeline = RulePipeline(load_rules(args.rules or "best"))
+    reader = Wordlist(args.wordlist)
+    rate = pipeline.benchmark(reader.decoded(), args.bench_seconds)
+    reader.close()
+    stats = pipeline.stats
+    print(f"[RULES] {args.rules or 'best'}: {len(pipeline.rules)} rules, {stats['words']} words -> "
+          f"{stats['candidates']} candidates ({stats['duplicates']} duplicates dropped), {rate:,.0f} candidates/s")
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="CrackDefend brute-force simulator")
+    parser.add_argument("--workers", type=int, default=0,
+                        help="split the user x password space (or --crack-hashes wordlist) across N processes")
+    parser.add_argument("--async", dest="use_async", action="store_true",
+                        help="drive attempts from an asyncio loop with token-bucket pacing")
+    parser.add_argument("--rate", type=float, default=100,
+                        help="attempts per second in async mode")
+    parser.add_argument("--burst", type=float, default=10,
+                        help="token bucket size in async mode")
+    parser.add_argument("--concurrency", type=int, default=1000,
+                        help="maximum attempts in flight in async mode")
+    parser.add_argument("--target", default="local",
+                        help="async login target: local or package.module:factory")
+    parser.add_argument("--target-latency-ms", type=float, default=0,
+                        help="simulated response time of the local target")
+    parser.add_argument("--duration", type=float, default=None,
+                        help="stop the async run after this many seconds")
+    parser.add_argument("--crack-hashes", action="store_true",
+                        help="crack the digests in --hashes offline instead of attacking logins")
+    parser.add_argument("--hashes", default=HASHES_FILE,
+                        help="hash dump of label:digest lines (type detected by length)")
+    parser.add_argument("--wordlist", default=ROCKYOU_FILE,
+                        help="wordlist for --crack-hashes")
+    parser.add_argument("--build-index", action="store_true",
+                        help="precompute sorted digest indexes of --wordlist for --crack-hashes")
+    parser.add_argument("--index-algos", default=",".join(INDEXED_ALGOS),
+                        help="comma-separated algorithms for --build-index")
+    parser.add_argument("--rules", default=None,
+                        help="mangle words with a rule file or built-in set (basic, digits, leet, best)")
+    parser.add_argument("--mask", default=None,
+                        help="brute-force a hashcat-style mask such as ?u?l?l?l?d?d instead of the wordlist")
+    parser.add_argument("--charset", action="append", default=[],
+                        help="custom mask charset ?1-?4, e.g. 1:?l?d (repeatable)")
+    parser.add_argument("--mask-start", type=int, default=0,
+                        help="keyspace index to start (or resume) the mask attack from")
+    parser.add_argument("--resume", action="store_true",
+                        help="continue from the last checkpoint of the same attack")
+    parser.add_argument("--session", default=None,
+                        help="checkpoint file (default ../data/cracksim-<mode>.session)")
+    parser.add_argument("--checkpoint-s", type=float, default=30,
+                        help="seconds between checkpoints, 0 to disable them")
+    parser.add_argument("--tried-capacity", type=int, default=10_000_000,
+                        help="(user, password) pairs the tried-pair filter is sized for, 0 to disable it")
+    parser.add_argument("--tried-fp", type=float, default=0.001,
+                        help="target false-positive rate of the tried-pair filter")
+    parser.add_argument("--tried-mb", type=float, default=32,
+                        help="memory budget of the tried-pair filter (MB, shared between workers)")
+    parser.add_argument("--bench-rules", action="store_true",
+                        help="measure candidates/s of --rules over --wordlist and exit")
+    parser.add_argument("--bench-seconds", type=float, default=5,
+                        help="duration of --bench-rules")
+    parser.add_argument("--chunk-mb", type=float, default=4,
+                        help="wordlist bytes per pool task for --crack-hashes")
+    parser.add_argument("--report-interval", type=float, default=5,
+                        help="seconds between throughput reports in worker and async mode")
+    parser.add_argument("--flush-records", type=int, default=256,
+                        help="write the attack log after this many attempts")
+    parser.add_argument("--flush-ms", type=float, default=200,
+                        help="write the attack log at least this often (milliseconds)")
+    parser.add_argument("--fsync", choices=FSYNC_POLICIES, default="never",
+                        help="when to fsync the attack log")
+    parser.add_argument("--fsync-ms", type=float, default=1000,
+                        help="fsync period for --fsync interval (milliseconds)")
+    args = parser.parse_args()
+    if args.rate <= 0:
+        parser.error("--rate must be greater than 0")
+    return args
+
+def handle_sigterm(signum, frame):
+    """Let the dashboard's stop button run the normal flush-and-exit path"""
+    raise KeyboardInterrupt
+
+def main():
+    args = parse_args()
+    signal.signal(signal.SIGTERM, handle_sigterm)
+    if args.bench_rules:
+        run_rule_benchmark(args)
+        return
+    if args.build_index:
+        run_build_index(args)
+        return
+    if args.crack_hashes:
+        run_hash_crack(args)
+        return
+    if args.workers > 0:
+        run_workers(args)
+        return
+    open_attack_log(args)
+    try:
+        if args.use_async:
+            run_async(args)
+        else:
+            run_attack(args)
+    except KeyboardInterrupt:
+        print("CrackSim: Stopping.")
+    finally:
+        attack_log.close()
+        print(f"[LOG] Attack log: {attack_log.stats}")
+        if outbox is not None:
+            outbox.close()
+            print(f"[MailHog] Outbox: {outbox.stats}")
 
 if __name__ == "__main__":
     main()
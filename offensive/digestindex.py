@@ -0,0 +1,197 @@
+import hashlib
+import heapq
+import mmap
+import os
+import struct
+import sys
+import tempfile
+import time
+from array import array
+
+from wordlist import Wordlist
+
+MAGIC = b"CDIDX1\0\0"
+# magic, algorithm, digest size, record size, record count, wordlist size, wordlist mtime
+HEADER = struct.Struct("<8s8sIIQQd")
+HEADER_SIZE = 64
+FANOUT_ENTRIES = 1 << 16
+FANOUT_SIZE = FANOUT_ENTRIES * 8
+OFFSET = struct.Struct(">Q")  # big-endian so equal digests sort by wordlist position
+INDEXED_ALGOS = ("md5", "sha1")
+
+
+def index_path(wordlist, algo):
+    return f"{wordlist}.{algo}.idx"
+
+
+def _write_run(records, directory):
+    records.sort()
+    run = tempfile.TemporaryFile(dir=directory)
+    run.write(b"".join(records))
+    run.seek(0)
+    return run
+
+
+def _read_run(run, record_size, block_records=8192):
+    while True:
+        block = run.read(record_size * block_records)
+        if not block:
+            return
+        for start in range(0, len(block), record_size):
+            yield block[start:start + record_size]
+
+
+def build_index(wordlist, algo, path=None, run_records=1_000_000, report=print):
+    """Hash a wordlist once and write a sorted (digest, offset) index for algo.
+
+    Records are sorted in runs of ``run_records`` and merged, so memory
+    stays bounded for rockyou-sized lists. Duplicate words keep their first
+    offset. The file starts with a 64-byte header and a 65536-entry fanout
+    table (cumulative record counts per leading 16 bits of digest),
+    followed by the fixed-width records.
+    """
+    path = path or index_path(wordlist, algo)
+    new_hash = getattr(hashlib, algo)
+    digest_size = new_hash().digest_size
+    record_size = digest_size + OFFSET.size
+    directory = os.path.dirname(os.path.abspath(path))
+    started = time.time()
+
+    runs = []
+    records = []
+    words = 0
+    reader = Wordlist(wordlist)
+    for offset, word in reader.entries():
+        records.append(new_hash(word).digest() + OFFSET.pack(offset))
+        words += 1
+        if len(records) >= run_records:
+            runs.append(_write_run(records, directory))
+            records = []
+    if records or not runs:
+        runs.append(_write_run(records, directory))
+    reader.close()
+
+    stat = os.stat(wordlist)
+    fanout = array("Q", bytes(FANOUT_SIZE))
+    count = 0
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as out:
+        out.write(bytes(HEADER_SIZE + FANOUT_SIZE))
+        previous = None
+        pending = []
+        for record in heapq.merge(*(_read_run(run, record_size) for run in runs)):
+            digest = record[:digest_size]
+            if digest == previous:
+                continue
+            previous = digest
+            fanout[(digest[0] << 8) | digest[1]] += 1
+            pending.append(record)
+            count += 1
+            if len(pending) >= 65536:
+                out.write(b"".join(pending))
+                pending = []
+        out.write(b"".join(pending))
+
+        # Turn per-prefix counts into cumulative end positions
+        total = 0
+        for prefix in range(FANOUT_ENTRIES):
+            total += fanout[prefix]
+            fanout[prefix] = total
+        if sys.byteorder == "big":
+            fanout.byteswap()
+        out.seek(0)
+        header = HEADER.pack(MAGIC, algo.encode(), digest_size, record_size, count, stat.st_size, stat.st_mtime)
+        out.write(header.ljust(HEADER_SIZE, b"\0"))
+        out.write(fanout.tobytes())
+    for run in runs:
+        run.close()
+    os.replace(tmp_path, path)
+    report(f"[INDEX] {algo}: {count} digests from {words} words in {time.time() - started:.1f}s -> {path}")
+    return path
+
+
+class DigestIndex:
+    """Memory-mapped lookup of digests in an index written by build_index.
+
+    The fanout table narrows a lookup to the records sharing the digest's
+    first two bytes (a few hundred even for rockyou), a slice of a few KB
+    that is searched with ``bytes.find``; the matching offset is used to
+    read the word back from the wordlist.
+    """
+
+    def __init__(self, path, wordlist):
+        self.path = path
+        self.wordlist = wordlist
+        with open(path, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, algo, self.digest_size, self.record_size, self.count, size, mtime = \
+            HEADER.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{path} is not a digest index")
+        self.algo = algo.rstrip(b"\0").decode()
+        self.fanout = array("Q", self._map[HEADER_SIZE:HEADER_SIZE + FANOUT_SIZE])
+        if sys.byteorder == "big":
+            self.fanout.byteswap()
+        self._records = HEADER_SIZE + FANOUT_SIZE
+        stat = os.stat(wordlist)
+        self.stale = (stat.st_size, stat.st_mtime) != (size, mtime)
+        with open(wordlist, "rb") as f:
+            self._words = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) if stat.st_size else None
+
+    @classmethod
+    def open(cls, wordlist, algo):
+        """Index for wordlist and algo if one exists and is up to date, else None"""
+        path = index_path(wordlist, algo)
+        if not os.path.exists(path):
+            return None
+        try:
+            index = cls(path, wordlist)
+        except (OSError, ValueError) as e:
+            print(f"[INDEX] Ignoring {path}: {e}")
+            return None
+        if index.stale:
+            print(f"[INDEX] Ignoring {path}: {wordlist} changed since it was built")
+            index.close()
+            return None
+        return index
+
+    def find_offset(self, digest):
+        """Wordlist offset of the first word hashing to digest, or None"""
+        prefix = (digest[0] << 8) | digest[1]
+        lo = self.fanout[prefix - 1] if prefix else 0
+        hi = self.fanout[prefix]
+        if lo == hi:
+            return None
+        width = self.record_size
+        bucket = self._map[self._records + lo * width:self._records + hi * width]
+        # Search the bucket in C, ignoring hits that straddle two records
+        pos = bucket.find(digest)
+        while pos != -1 and pos % width:
+            pos = bucket.find(digest, pos + 1)
+        if pos == -1:
+            return None
+        return OFFSET.unpack_from(bucket, pos + self.digest_size)[0]
+
+    def word_at(self, offset):
+        end = self._words.find(b"\n", offset)
+        return self._words[offset:end if end != -1 else len(self._words)].rstrip(b"\r")
+
+    def lookup(self, digest):
+        """Plaintext word for digest, or None"""
+        offset = self.find_offset(digest)
+        return None if offset is None else self.word_at(offset)
+
+    def lookup_many(self, digests):
+        """{digest: word} for every digest found in the index"""
+        found = {}
+        for digest in digests:
+            offset = self.find_offset(digest)
+            if offset is not None:
+                found[digest] = self.word_at(offset)
+        return found
+
+    def close(self):
+        self._map.close()
+        if self._words is not None:
+            self._words.close()
@@ -0,0 +1,282 @@
+import hashlib
+import itertools
+import multiprocessing
+import os
+import queue
+import signal
+import time
+
+from wordlist import Wordlist
+from mangler import RulePipeline
+from maskattack import Mask, format_eta
+
+# Hex digest length -> hashlib algorithm
+HASH_TYPES = {
+    32: "md5",
+    40: "sha1",
+    56: "sha224",
+    64: "sha256",
+    96: "sha384",
+    128: "sha512",
+}
+
+# Per-process target sets, rule pipeline and mask, installed once by the pool initializer
+_targets = {}
+_rules = None
+_mask = None
+
+
+def detect_hash_type(digest):
+    """Algorithm name for a hex digest, or None if the length is unknown"""
+    if len(digest) not in HASH_TYPES:
+        return None
+    try:
+        bytes.fromhex(digest)
+    except ValueError:
+        return None
+    return HASH_TYPES[len(digest)]
+
+
+def load_hashes(path):
+    """Parse ``label:digest`` (or bare digest) lines into {algo: {digest: [labels]}}"""
+    targets = {}
+    skipped = 0
+    with open(path) as f:
+        for line in f:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            label, _, digest = line.rpartition(":")
+            digest = digest.lower()
+            algo = detect_hash_type(digest)
+            if algo is None:
+                skipped += 1
+                continue
+            targets.setdefault(algo, {}).setdefault(bytes.fromhex(digest), []).append(label)
+    if skipped:
+        print(f"[HASH] Skipped {skipped} lines with unrecognised digests")
+    return targets
+
+
+def split_ranges(path, chunk_size, start=0):
+    """Byte ranges covering the file from start; lines are assigned to the range they start in"""
+    size = os.path.getsize(path)
+    return [(lo, min(lo + chunk_size, size)) for lo in range(start, size, chunk_size)]
+
+
+def _init_worker(targets, rules=None, mask=None):
+    global _targets, _rules, _mask
+    _targets = targets
+    _rules = RulePipeline(rules) if rules else None
+    _mask = Mask(*mask) if mask else None
+    # The parent handles Ctrl+C and stops the pool with SIGTERM
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+
+def crack_range(path, start, end):
+    """Hash every word in a wordlist byte range against the target sets"""
+    reader = Wordlist(path, start, end)
+    result = crack_words(reader)
+    reader.close()
+    return (start, end) + result
+
+
+def crack_mask_range(start, end):
+    """Hash every mask candidate with an index in [start, end) against the target sets"""
+    return (start, end) + crack_words(_mask.iter_range(start, end, as_bytes=True))
+
+
+def crack_words(words, batch_size=4096):
+    """Hash candidates once per algorithm and look the digests up in the target sets.
+
+    Candidates (after rules) are streamed in small batches, each hashed
+    for every algorithm before the next is generated, so memory does not
+    grow with the chunk or the rule set.
+    """
+    candidates = iter(_rules.apply_bytes(words) if _rules else words)
+    hashers = [(algo, getattr(hashlib, algo), digests) for algo, digests in _targets.items()]
+    count = 0
+    found = []
+    timings = dict.fromkeys(_targets, 0.0)
+    while True:
+        batch = list(itertools.islice(candidates, batch_size))
+        if not batch:
+            break
+        count += len(batch)
+        for algo, new_hash, digests in hashers:
+            began = time.perf_counter()
+            for word in batch:
+                digest = new_hash(word).digest()
+                if digest in digests:
+                    found.append((algo, digest, word))
+            timings[algo] += time.perf_counter() - began
+    return count, timings, found
+
+
+def _crack_job(job):
+    return crack_range(*job)
+
+
+def _crack_mask_job(job):
+    return crack_mask_range(*job)
+
+
+class HashCracker:
+    """Dictionary attack on a hash dump, spread over a process pool.
+
+    The wordlist is cut into byte ranges that workers read themselves, so
+    candidates are never pickled across processes. Each worker hashes a
+    word once per algorithm present in the dump and checks the digest
+    against a set of every target of that type, so the cost does not grow
+    with the number of hashes. Mask attacks work the same way over
+    contiguous ranges of keyspace indexes.
+
+    Tasks finish out of order, so ``position`` tracks the lowest wordlist
+    offset (or mask index) not yet fully tried; an interrupted run resumes
+    from there without gaps.
+    """
+
+    def __init__(self, targets, workers=None, chunk_size=4 << 20, rules=None):
+        self.targets = targets
+        self.rules = rules
+        self.workers = workers or os.cpu_count() or 1
+        self.chunk_size = chunk_size
+        self.cracked = {}
+        self.indexed = set()
+        self.position = 0
+        self.words = 0
+        self.hash_time = {algo: 0.0 for algo in targets}
+        self.elapsed = 0.0
+
+    def remaining(self):
+        return sum(len(digests) for digests in self.targets.values()) - len(self.cracked)
+
+    def _record(self, algo, digest, word, report):
+        if (algo, digest) not in self.cracked:
+            self.cracked[(algo, digest)] = word
+            labels = ",".join(label for label in self.targets[algo][digest] if label)
+            report(f"[CRACKED] {algo} {digest.hex()} ({labels or 'no label'}) = {word.decode('latin-1')}")
+
+    def pending(self):
+        """Targets still worth a wordlist pass, grouped by algorithm"""
+        pending = {}
+        for algo, digests in self.targets.items():
+            if algo in self.indexed:
+                continue
+            left = {digest for digest in digests if (algo, digest) not in self.cracked}
+            if left:
+                pending[algo] = left
+        return pending
+
+    def use_index(self, index, final=True, report=print):
+        """Resolve this algorithm's targets from a precomputed DigestIndex"""
+        digests = self.pending().get(index.algo, ())
+        started = time.time()
+        found = index.lookup_many(digests)
+        elapsed = time.time() - started
+        for digest, word in found.items():
+            self._record(index.algo, digest, word, report)
+        # The index covers every literal word, so without rules misses are final
+        if final:
+            self.indexed.add(index.algo)
+        report(f"[INDEX] {index.algo}: {len(found)}/{len(digests)} found in {elapsed * 1000:.1f}ms")
+
+    def _crack(self, job, tasks, initargs, on_done=None, report=print):
+        """Run crack tasks on the pool until they finish or every target is cracked.
+
+        Tasks are drawn lazily from the iterable, at most two per worker
+        in flight, so even a mask with billions of chunks never has them
+        all queued at once.
+        """
+        started = time.time()
+        finished = {}
+        results = queue.Queue()
+        tasks = iter(tasks)
+        in_flight = 0
+        ctx = multiprocessing.get_context("fork")
+        try:
+            with ctx.Pool(self.workers, initializer=_init_worker, initargs=initargs) as pool:
+                while True:
+                    for task in itertools.islice(tasks, 2 * self.workers - in_flight):
+                        pool.apply_async(job, (task,), callback=results.put, error_callback=results.put)
+                        in_flight += 1
+                    if not in_flight:
+                        break
+                    result = results.get()
+                    in_flight -= 1
+                    if isinstance(result, BaseException):
+                        raise result
+                    start, end, words, timings, found = result
+                    self.words += words
+                    for algo, seconds in timings.items():
+                        self.hash_time[algo] += seconds
+                    for algo, digest, word in found:
+                        self._record(algo, digest, word, report)
+                    finished[start] = end
+                    while self.position in finished:
+                        self.position = finished.pop(self.position)
+                    if on_done:
+                        on_done(self)
+                    if not self.remaining():
+                        pool.terminate()
+                        break
+        finally:
+            self.elapsed += time.time() - started
+
+    def run(self, wordlist, start=0, on_done=None, report=print):
+        """Crack as many targets as possible from wordlist offset start; returns {(algo, digest): word}"""
+        pending = self.pending()
+        self.position = start
+        if pending:
+            tasks = split_ranges(wordlist, self.chunk_size, start)
+            self._crack(_crack_job, ((wordlist, lo, hi) for lo, hi in tasks),
+                        (pending, self.rules), on_done, report)
+        return self.cracked
+
+    def run_mask(self, mask, start=0, chunk=1 << 18, report_interval=5, on_done=None, report=print):
+        """Brute-force the mask keyspace from index start, reporting progress and ETA"""
+        pending = self.pending()
+        self.position = start
+        if not pending or start >= mask.keyspace:
+            return self.cracked
+        tasks = ((lo, min(lo + chunk, mask.keyspace)) for lo in range(start, mask.keyspace, chunk))
+        began = time.time()
+        last_report = began
+
+        def progress(cracker):
+            nonlocal last_report
+            now = time.time()
+            if now - last_report >= report_interval:
+                last_report = now
+                report(self.mask_progress(mask, start, now - began))
+            if on_done:
+                on_done(cracker)
+
+        self._crack(_crack_mask_job, tasks, (pending, self.rules, (mask.mask, mask.custom)), progress, report)
+        report(self.mask_progress(mask, start, time.time() - began))
+        return self.cracked
+
+    def mask_progress(self, mask, start, elapsed):
+        done = self.position - start
+        rate = done / elapsed if elapsed else 0
+        eta = (mask.keyspace - self.position) / rate if rate else None
+        return (f"[MASK] {self.position / mask.keyspace:.2%} of {mask.keyspace:,} "
+                f"({rate:,.0f} candidates/s, ETA {format_eta(eta)}, resume at {self.position})")
+
+    def summary(self):
+        hashes = self.words * sum(1 for seconds in self.hash_time.values() if seconds)
+        overall = hashes / self.elapsed if self.elapsed else 0
+        unit = "candidates" if self.rules else "words"
+        lines = [f"[HASH] {len(self.cracked)} cracked, {self.remaining()} left, {self.words} {unit} "
+                 f"in {self.elapsed:.2f}s on {self.workers} workers ({overall:,.0f} H/s overall)"]
+        total_time = sum(self.hash_time.values())
+        for algo, seconds in sorted(self.hash_time.items()):
+            if not seconds:
+                continue
+            per_worker = self.words / seconds if seconds else 0
+            # Wall-clock rate, charging each algorithm its share of the run
+            share = self.elapsed * seconds / total_time if total_time else 0
+            pooled = self.words / share if share else 0
+            lines.append(f"[HASH] {algo}: {pooled:,.0f} H/s ({per_worker:,.0f} H/s per worker)")
+        return "\n".join(lines)
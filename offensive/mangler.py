@@ -0,0 +1,229 @@
+import os
+import time
+from collections import deque
+
+DIGITS = "0123456789"
+
+# Small built-in rule sets; anything else passed to --rules is read as a rule file
+BUILTIN_RULES = {
+    "basic": [":", "l", "u", "c", "C", "t", "r", "d", "f", "$1", "$!", "c $1", "c $!", "$1 $2 $3", "^1"],
+    "digits": [f"${a}" for a in DIGITS] + [f"${a} ${b}" for a in DIGITS for b in DIGITS]
+              + [f"$1 $9 ${a} ${b}" for a in "89" for b in DIGITS] + [f"$2 $0 ${a} ${b}" for a in "012" for b in DIGITS],
+    "leet": ["sa@", "sa4", "se3", "si1", "si!", "so0", "ss$", "ss5", "st7", "sa@ se3 si1 so0 ss$",
+             "c sa@ se3 si1 so0", "sa4 se3 si1 so0 ss5 st7"],
+}
+BUILTIN_RULES["best"] = (
+    BUILTIN_RULES["basic"] + BUILTIN_RULES["leet"]
+    + [f"${a}" for a in DIGITS] + [f"c ${a}" for a in DIGITS] + ["$1 $2", "$2 $3", "c $1 $2 $3", "$1 $2 $3 $!"]
+)
+
+# Functions and how many argument characters follow them
+ARITY = {
+    ":": 0, "l": 0, "u": 0, "c": 0, "C": 0, "t": 0, "r": 0, "d": 0, "f": 0,
+    "{": 0, "}": 0, "[": 0, "]": 0,
+    "$": 1, "^": 1, "@": 1, "T": 1, "D": 1, "'": 1, "s": 2,
+}
+
+SIMPLE = {
+    "l": str.lower,
+    "u": str.upper,
+    "c": str.capitalize,
+    "C": lambda w: w[:1].lower() + w[1:].upper(),
+    "t": str.swapcase,
+    "r": lambda w: w[::-1],
+    "d": lambda w: w + w,
+    "f": lambda w: w + w[::-1],
+    "{": lambda w: w[1:] + w[:1],
+    "}": lambda w: w[-1:] + w[:-1],
+    "[": lambda w: w[1:],
+    "]": lambda w: w[:-1],
+}
+
+
+def _position(char, rule):
+    """hashcat positions: 0-9 then A-Z for 10-35"""
+    if char.isdigit():
+        return int(char)
+    if "A" <= char <= "Z":
+        return ord(char) - ord("A") + 10
+    raise ValueError(f"Bad position {char!r} in rule {rule!r}")
+
+
+def parse_rule(rule):
+    """Split a rule line into (function, args) operations"""
+    ops = []
+    i = 0
+    while i < len(rule):
+        name = rule[i]
+        i += 1
+        if name == " ":
+            continue
+        if name not in ARITY:
+            raise ValueError(f"Unsupported rule function {name!r} in {rule!r}")
+        args = rule[i:i + ARITY[name]]
+        if len(args) < ARITY[name]:
+            raise ValueError(f"Missing argument for {name!r} in {rule!r}")
+        i += ARITY[name]
+        ops.append((name, args))
+    return ops
+
+
+def compile_rule(rule):
+    """Turn one rule line into a single str -> str function.
+
+    Runs of substitutions are folded into one ``str.translate`` table and
+    runs of appends/prepends into one concatenation, so a rule such as
+    ``sa@ se3 si1 so0 $1 $2 $3`` costs two C calls per word.
+    """
+    steps = []
+    table = None
+    prefix = suffix = ""
+
+    def close_runs():
+        nonlocal table, prefix, suffix
+        if table is not None:
+            steps.append(lambda w, t=str.maketrans(table): w.translate(t))
+            table = None
+        if prefix or suffix:
+            steps.append(lambda w, p=prefix, s=suffix: p + w + s)
+            prefix = suffix = ""
+
+    for name, args in parse_rule(rule):
+        if name == "s":
+            if prefix or suffix:
+                close_runs()
+            old, new = args
+            # Compose with earlier substitutions so they still apply in order
+            table = dict(table or {})
+            for key, value in table.items():
+                if value == old:
+                    table[key] = new
+            table.setdefault(old, new)
+            continue
+        if name in "$^":
+            if table is not None:
+                close_runs()
+            if name == "$":
+                suffix += args
+            else:
+                prefix = args + prefix
+            continue
+        close_runs()
+        if name == ":":
+            continue
+        if name in SIMPLE:
+            steps.append(SIMPLE[name])
+        elif name == "@":
+            steps.append(lambda w, c=args: w.replace(c, ""))
+        elif name == "T":
+            n = _position(args, rule)
+            steps.append(lambda w, n=n: w[:n] + w[n:n + 1].swapcase() + w[n + 1:])
+        elif name == "D":
+            n = _position(args, rule)
+            steps.append(lambda w, n=n: w[:n] + w[n + 1:])
+        elif name == "'":
+            n = _position(args, rule)
+            steps.append(lambda w, n=n: w[:n])
+    close_runs()
+
+    if not steps:
+        return lambda w: w
+    if len(steps) == 1:
+        return steps[0]
+
+    def apply(word):
+        for step in steps:
+            word = step(word)
+        return word
+    return apply
+
+
+def load_rules(spec):
+    """Rule lines for a built-in set name (or comma-separated names) or a rule file"""
+    if os.path.exists(spec):
+        with open(spec, encoding="latin-1") as f:
+            return [line.rstrip("\r\n") for line in f if line.strip() and not line.startswith("#")]
+    rules = []
+    for name in spec.split(","):
+        if name not in BUILTIN_RULES:
+            raise ValueError(f"No rule file {spec!r} and no built-in rule set {name!r} "
+                             f"(built-ins: {', '.join(sorted(BUILTIN_RULES))})")
+        rules.extend(BUILTIN_RULES[name])
+    return rules
+
+
+class RulePipeline:
+    """Lazy word -> candidates stage applying compiled rules.
+
+    Every rule is applied to each incoming word in turn (word-major, like
+    hashcat), and candidates already produced within the last
+    ``dedup_window`` outputs are dropped, so memory stays bounded however
+    long the wordlist is. Works on str words, or on bytes with
+    ``encoding`` round-tripping them (latin-1 by default, which is
+    lossless). ``expand`` mangles a single word starting from a given
+    rule, for callers that checkpoint their position.
+    """
+
+    def __init__(self, rules, dedup_window=65536):
+        self.rules = list(rules)
+        self.transforms = [compile_rule(rule) for rule in self.rules]
+        self.dedup_window = dedup_window
+        self.stats = {"words": 0, "candidates": 0, "duplicates": 0}
+        self._seen = set()
+        self._recent = deque()
+
+    def expand(self, word, first_rule=0):
+        """(rule index, candidate) for each rule from first_rule on that yields something new"""
+        seen = self._seen
+        recent = self._recent
+        window = self.dedup_window
+        stats = self.stats
+        stats["words"] += 1
+        for index in range(first_rule, len(self.transforms)):
+            candidate = self.transforms[index](word)
+            if not candidate or candidate in seen:
+                stats["duplicates"] += 1
+                continue
+            seen.add(candidate)
+            recent.append(candidate)
+            if len(recent) > window:
+                seen.discard(recent.popleft())
+            stats["candidates"] += 1
+            yield index, candidate
+
+    def __call__(self, words):
+        # Same as expand, inlined because this is the hot path for whole wordlists
+        seen = self._seen
+        recent = self._recent
+        transforms = self.transforms
+        window = self.dedup_window
+        stats = self.stats
+        for word in words:
+            stats["words"] += 1
+            for transform in transforms:
+                candidate = transform(word)
+                if not candidate or candidate in seen:
+                    stats["duplicates"] += 1
+                    continue
+                seen.add(candidate)
+                recent.append(candidate)
+                if len(recent) > window:
+                    seen.discard(recent.popleft())
+                stats["candidates"] += 1
+                yield candidate
+
+    def apply_bytes(self, words, encoding="latin-1"):
+        for candidate in self((word.decode(encoding) for word in words)):
+            yield candidate.encode(encoding)
+
+    def benchmark(self, words, seconds=5):
+        """Candidates/s over at most seconds of the given words"""
+        started = time.perf_counter()
+        deadline = started + seconds
+        produced = 0
+        for _ in self(words):
+            produced += 1
+            if not produced % 4096 and time.perf_counter() >= deadline:
+                break
+        elapsed = time.perf_counter() - started
+        return produced / elapsed if elapsed else 0.0
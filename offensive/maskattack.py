@@ -0,0 +1,137 @@
+import string
+
+# hashcat built-in charsets
+CHARSETS = {
+    "l": string.ascii_lowercase,
+    "u": string.ascii_uppercase,
+    "d": string.digits,
+    "s": " !\"#$%&'()*+,-./:;<=>?@[\\]^_`{|}~",
+    "h": "0123456789abcdef",
+    "H": "0123456789ABCDEF",
+}
+CHARSETS["a"] = CHARSETS["l"] + CHARSETS["u"] + CHARSETS["d"] + CHARSETS["s"]
+
+
+def expand_charset(spec, custom=None):
+    """Characters of a charset spec such as ``?l?d_`` (placeholders expanded)"""
+    chars = []
+    i = 0
+    while i < len(spec):
+        if spec[i] == "?" and i + 1 < len(spec):
+            key = spec[i + 1]
+            if key == "?":
+                chars.append("?")
+            elif key in CHARSETS:
+                chars.extend(CHARSETS[key])
+            elif custom and key in custom:
+                chars.extend(custom[key])
+            else:
+                raise ValueError(f"Unknown charset ?{key} in {spec!r}")
+            i += 2
+        else:
+            chars.append(spec[i])
+            i += 1
+    # Keep first occurrences so the keyspace has no repeated candidates
+    return list(dict.fromkeys(chars))
+
+
+class Mask:
+    """Keyspace of a hashcat-style mask such as ``?l?l?l?d?d``.
+
+    Positions are digits of a mixed-radix number with the last position
+    changing fastest, so ``candidate(index)`` maps any index straight to
+    its password and ``iter_range`` walks a contiguous slice of the
+    keyspace like an odometer, no recursion involved. Contiguous ranges
+    make it trivial to split the keyspace between workers and to resume
+    from an exact index. Custom charsets ``?1``..``?4`` come from
+    ``custom`` ({"1": "?l?d", ...}).
+    """
+
+    def __init__(self, mask, custom=None):
+        self.mask = mask
+        self.custom = dict(custom or {})
+        custom = {key: expand_charset(spec) for key, spec in self.custom.items()}
+        self.charsets = []
+        i = 0
+        while i < len(mask):
+            if mask[i] == "?" and i + 1 < len(mask):
+                self.charsets.append(expand_charset(mask[i:i + 2], custom))
+                i += 2
+            else:
+                self.charsets.append([mask[i]])
+                i += 1
+        if not self.charsets:
+            raise ValueError("Empty mask")
+        self.keyspace = 1
+        for charset in self.charsets:
+            self.keyspace *= len(charset)
+        self._byte_sets = [[c.encode("latin-1") for c in charset] for charset in self.charsets]
+
+    def __len__(self):
+        return self.keyspace
+
+    def _digits(self, index):
+        digits = [0] * len(self.charsets)
+        for position in range(len(self.charsets) - 1, -1, -1):
+            index, digits[position] = divmod(index, len(self.charsets[position]))
+        return digits
+
+    def candidate(self, index):
+        """Password at a keyspace index"""
+        if not 0 <= index < self.keyspace:
+            raise IndexError(index)
+        return "".join(charset[d] for charset, d in zip(self.charsets, self._digits(index)))
+
+    def iter_range(self, start=0, end=None, as_bytes=False):
+        """Candidates for indexes [start, end) in keyspace order"""
+        end = self.keyspace if end is None else min(end, self.keyspace)
+        if start >= end:
+            return
+        sets = self._byte_sets if as_bytes else self.charsets
+        join = b"".join if as_bytes else "".join
+        digits = self._digits(start)
+        last = sets[-1]
+        head = len(sets) - 1
+        index = start
+        while index < end:
+            prefix = join([sets[p][digits[p]] for p in range(head)])
+            first = digits[head]
+            count = min(len(last) - first, end - index)
+            for char in last[first:first + count]:
+                yield prefix + char
+            index += count
+            # Carry into the next position to the left
+            digits[head] = 0
+            position = head - 1
+            while position >= 0:
+                digits[position] += 1
+                if digits[position] < len(sets[position]):
+                    break
+                digits[position] = 0
+                position -= 1
+
+    def partition(self, parts, start=0):
+        """Split [start, keyspace) into at most parts contiguous (start, end) ranges"""
+        remaining = self.keyspace - start
+        step = max(1, -(-remaining // parts))
+        return [(lo, min(lo + step, self.keyspace)) for lo in range(start, self.keyspace, step)]
+
+
+def parse_custom_charsets(values):
+    """``["1:?l?d", "2:abc"]`` -> {"1": "?l?d", "2": "abc"}"""
+    custom = {}
+    for value in values or []:
+        key, sep, spec = value.partition(":")
+        if not sep or key not in "1234" or len(key) != 1:
+            raise ValueError(f"Custom charset must look like 1:?l?d, not {value!r}")
+        custom[key] = spec
+    return custom
+
+
+def format_eta(seconds):
+    if seconds is None or seconds == float("inf"):
+        return "unknown"
+    seconds = int(seconds)
+    hours, seconds = divmod(seconds, 3600)
+    minutes, seconds = divmod(seconds, 60)
+    return f"{hours}h{minutes:02d}m{seconds:02d}s" if hours else f"{minutes}m{seconds:02d}s"
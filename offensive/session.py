@@ -0,0 +1,107 @@
+import json
+import os
+import time
+
+from wordlist import Wordlist
+from mangler import RulePipeline
+
+SESSION_VERSION = 1
+
+
+class PasswordSource:
+    """Dictionary or mask passwords, optionally mangled, with a resumable position.
+
+    ``offset`` is a wordlist byte offset (or a mask index) and ``rule`` the
+    next rule to apply to the word at that offset. Both are updated before
+    each candidate is yielded, so ``position()`` taken between candidates
+    resumes right after the last one handed out; pass it back as
+    ``offset``/``rule`` to carry on. ``end`` limits a source to one
+    worker's shard.
+    """
+
+    def __init__(self, wordlist=None, mask=None, rules=None, offset=0, end=None, rule=0):
+        self.wordlist = wordlist
+        self.mask = mask
+        self.pipeline = RulePipeline(rules) if rules else None
+        self.offset = offset
+        self.end = end
+        self.rule = rule
+
+    def _words(self):
+        """(offset of the word, offset after it, word) from the current position"""
+        if self.mask is not None:
+            index = self.offset
+            for word in self.mask.iter_range(self.offset, self.end):
+                yield index, index + 1, word
+                index += 1
+        elif self.wordlist and os.path.exists(self.wordlist):
+            reader = Wordlist(self.wordlist, self.offset, self.end)
+            try:
+                for offset, word in reader.entries():
+                    yield offset, reader.position, word.decode("latin-1", errors="replace")
+            finally:
+                reader.close()
+
+    def __iter__(self):
+        for start, after, word in self._words():
+            if self.pipeline is None:
+                self.offset = after
+                yield word
+                continue
+            first_rule = self.rule
+            self.offset = start
+            for index, candidate in self.pipeline.expand(word, first_rule):
+                self.rule = index + 1
+                yield candidate
+            self.offset = after
+            self.rule = 0
+
+    def position(self):
+        return {"offset": self.offset, "rule": self.rule}
+
+
+class AttackSession:
+    """Small JSON checkpoint of an attack's progress.
+
+    ``identity`` describes what is being attacked (wordlist and its size,
+    mask, rules, worker count); a checkpoint is only resumed when it
+    matches, so a changed wordlist or rule set starts over instead of
+    skipping candidates. Saves go through a temporary file and
+    ``os.replace`` so a crash mid-write leaves the previous checkpoint.
+    """
+
+    def __init__(self, path, identity, interval=30.0):
+        self.path = path
+        self.identity = identity
+        self.interval = interval
+        self.last_saved = time.time()
+        self.saves = 0
+
+    def load(self):
+        """Saved state if the checkpoint exists and matches this attack, else None"""
+        try:
+            with open(self.path) as f:
+                saved = json.load(f)
+        except FileNotFoundError:
+            print(f"[SESSION] No checkpoint at {self.path}, starting fresh")
+            return None
+        except (OSError, ValueError) as e:
+            print(f"[SESSION] Ignoring unreadable checkpoint {self.path}: {e}")
+            return None
+        if saved.get("version") != SESSION_VERSION or saved.get("identity") != self.identity:
+            print(f"[SESSION] Checkpoint {self.path} is for a different attack, starting fresh")
+            return None
+        return saved.get("state", {})
+
+    def save(self, state):
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": SESSION_VERSION, "identity": self.identity,
+                       "saved_at": time.time(), "state": state}, f)
+        os.replace(tmp_path, self.path)
+        self.last_saved = time.time()
+        self.saves += 1
+
+    def due(self, now=None):
+        now = time.time() if now is None else now
+        return now - self.last_saved >= self.interval
@@ -0,0 +1,90 @@
+import mmap
+import os
+
+
+class Wordlist:
+    """Lazy, memory-mapped reader for newline-separated wordlists.
+
+    Words are produced straight from the mapping a block at a time, so
+    nothing is materialised up front and the first candidate is available
+    immediately even for rockyou-sized files. A reader covers the lines
+    whose first byte falls in ``[start, end)``; ``position`` is the offset
+    of the next unread line, which can be saved and passed back as
+    ``start`` to resume, and ``shards`` splits a file into byte ranges for
+    parallel workers. Blank lines are skipped and ``\\r`` is stripped;
+    words are bytes unless read through ``decoded``.
+    """
+
+    def __init__(self, path, start=0, end=None, block_size=1 << 20):
+        self.path = path
+        self.block_size = block_size
+        self.size = os.path.getsize(path)
+        self.end = self.size if end is None else min(end, self.size)
+        self._map = None
+        if self.size:
+            with open(path, "rb") as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self.position = self._align(start)
+
+    def _align(self, offset):
+        """First line start at or after offset"""
+        if offset <= 0 or self._map is None:
+            return 0
+        if offset >= self.size:
+            return self.size
+        if self._map[offset - 1] == 0x0A:
+            return offset
+        newline = self._map.find(b"\n", offset)
+        return self.size if newline == -1 else newline + 1
+
+    @classmethod
+    def shard(cls, path, index, count, **kwargs):
+        """Reader for the index-th of count contiguous byte ranges of the file"""
+        step = -(-os.path.getsize(path) // count)
+        return cls(path, index * step, (index + 1) * step, **kwargs)
+
+    @classmethod
+    def shards(cls, path, count, **kwargs):
+        """count readers that together cover the file"""
+        return [cls.shard(path, index, count, **kwargs) for index in range(count)]
+
+    def entries(self):
+        """(offset, word) for every remaining word in the range"""
+        mm = self._map
+        while mm is not None and self.position < self.end:
+            start = self.position
+            # Blocks always end on a line boundary
+            stop = min(start + self.block_size, self.size)
+            if stop < self.size:
+                newline = mm.find(b"\n", stop - 1)
+                stop = self.size if newline == -1 else newline + 1
+            block = mm[start:stop]
+            lines = block.split(b"\n")
+            if block.endswith(b"\n"):
+                lines.pop()
+            offset = start
+            for line in lines:
+                if offset >= self.end:
+                    self.position = offset
+                    return
+                next_offset = offset + len(line) + 1
+                # Updated before yielding so a saved position resumes after this word
+                self.position = min(next_offset, self.size)
+                word = line.rstrip(b"\r")
+                if word.strip():
+                    yield offset, word
+                offset = next_offset
+            self.position = stop
+
+    def __iter__(self):
+        for _, word in self.entries():
+            yield word
+
+    def decoded(self, encoding="latin-1"):
+        for word in self:
+            yield word.decode(encoding, errors="replace")
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
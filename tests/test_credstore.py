@@ -0,0 +1,44 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.credstore import CredentialStore
+
+
+def make_store(tmp_path, usernames="", passwords="", valid_creds=""):
+    paths = []
+    for name, text in (("usernames", usernames), ("passwords", passwords), ("valid_creds", valid_creds)):
+        path = tmp_path / f"{name}.txt"
+        path.write_text(text)
+        paths.append(str(path))
+    return CredentialStore(*paths, check_interval=0), paths
+
+
+def test_last_line_without_newline_is_loaded(tmp_path):
+    store, _ = make_store(tmp_path, usernames="alice\nbob", valid_creds="alice:secret")
+    assert store.usernames == ["alice", "bob"]
+    assert store.valid_creds == {"alice": "secret"}
+
+
+def test_unfinished_line_follows_later_appends(tmp_path):
+    store, (usernames, _, valid_creds) = make_store(
+        tmp_path, usernames="alice\nbo", valid_creds="alice:old\nalice:ne")
+    assert store.usernames == ["alice", "bo"]
+    assert store.valid_creds == {"alice": "ne"}
+    with open(usernames, "a") as f:
+        f.write("b\ncarol")
+    with open(valid_creds, "a") as f:
+        f.write("w\n")
+    assert store.refresh() == {"usernames": 2, "valid_creds": 1}
+    assert store.usernames == ["alice", "bob", "carol"]
+    assert store.valid_creds == {"alice": "new"}
+    assert store.refresh() == {}
+    assert store.usernames == ["alice", "bob", "carol"]
+
+
+def test_unfinished_line_after_truncation(tmp_path):
+    store, (usernames, _, _) = make_store(tmp_path, usernames="alice\nbob\ncarol\n")
+    with open(usernames, "w") as f:
+        f.write("dave")
+    store.refresh()
+    assert store.usernames == ["dave"]
@@ -0,0 +1,34 @@
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from common.patterns import PatternMatcher
+
+CASES = [
+    (r"\x27\s*or", "' or 1=1"),
+    (r"\x41dmin", "Admin"),
+    (r"Admin", "admin"),
+    (r"\101dmin", "admin"),
+    (r".*?admin", "xadmin"),
+    (r".*+admin", "xadmin"),
+    (r"\N{LATIN SMALL LETTER A}dmin", "ADMIN"),
+    (r".*union.*select.*", "1 UNION SELECT 2"),
+]
+
+
+@pytest.mark.parametrize("pattern,text", CASES)
+def test_matches_like_re_search(pattern, text):
+    matcher = PatternMatcher([pattern])
+    assert not matcher.invalid
+    expected = [pattern] if re.search(pattern, text, re.IGNORECASE) else []
+    assert matcher.matches(text) == expected
+
+
+def test_matches_like_re_search_together():
+    matcher = PatternMatcher([pattern for pattern, _ in CASES])
+    for _, text in CASES:
+        expected = [p for p, _ in CASES if re.search(p, text, re.IGNORECASE)]
+        assert matcher.matches(text) == expected
@@ -0,0 +1,35 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "defensive"))
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), ".."))
+from defendmonitor import RateLimiter
+
+
+def test_burst_then_block():
+    limiter = RateLimiter(block_seconds=300)
+    results = [limiter.is_rate_limited("10.0.0.1", now=0.0) for _ in range(11)]
+    assert results == [False] * 10 + [True]
+    assert limiter.is_rate_limited("10.0.0.1", now=299.0)
+    assert not limiter.is_rate_limited("10.0.0.1", now=300.0)
+
+
+def test_constant_rate_client_is_let_through_after_each_block():
+    limiter = RateLimiter(block_seconds=300)
+    allowed = [t for t in range(2000) if not limiter.is_rate_limited("10.0.0.1", now=float(t))]
+    # A burst at the start, then another burst as each block ends
+    assert allowed[:10] == list(range(10))
+    assert any(t >= 300 for t in allowed)
+    assert any(t >= 1500 for t in allowed)
+    gaps = [b - a for a, b in zip(allowed, allowed[1:]) if b - a > 1]
+    assert gaps and all(gap <= 301 for gap in gaps)
+
+
+def test_evict_idle_keeps_blocked_keys():
+    limiter = RateLimiter(block_seconds=300)
+    for _ in range(11):
+        limiter.is_rate_limited("10.0.0.1", now=0.0)
+    limiter.is_rate_limited("10.0.0.2", now=0.0)
+    assert limiter.evict_idle(100.0) == 1
+    assert len(limiter) == 1
+    assert limiter.evict_idle(301.0) == 1